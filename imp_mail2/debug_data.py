@@ -10,7 +10,11 @@ import asyncio
 import sys
 import os
 import json
+import io
+import sqlite3
+from functools import partial
 from pathlib import Path
+from typing import Callable, Optional, Tuple
 
 # Add the current directory to Python path
 sys.path.insert(0, str(Path(__file__).parent))
@@ -18,149 +22,300 @@ sys.path.insert(0, str(Path(__file__).parent))
 from sqlite_client import SQLiteEmailClient
 import httpx
 
-async def check_database_status():
-    """Check current database state"""
-    print("🔍 Checking SQLite Database Status")
-    print("=" * 50)
+API_URL = "http://localhost:8000"
+
+# Resolved once relative to this file, so the tool works from any CWD
+DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / "data" / "emails.db"
+
+# SQL used by check_database_status. Kept as constants so the text is
+# identical across calls and sqlite3's statement cache can reuse the plans.
+_Q_CREATE_DEBUG_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_emails_importance_labeled_user
+    ON emails(importance, user_labeled, user_id)
+"""
+
+# Minimum user labels before the AI classifier can be trained
+MIN_TRAINING_LABELS = 10
+
+# Database totals and the importance histogram in a single pass
+_Q_DATABASE_STATS = """
+    SELECT COUNT(*) AS total,
+           COALESCE(SUM(user_labeled = 1), 0) AS labeled,
+           COALESCE(SUM(importance = 'important'), 0) AS important,
+           COALESCE(SUM(importance = 'not_important'), 0) AS not_important,
+           COALESCE(SUM(importance = 'unclassified'), 0) AS unclassified,
+           COUNT(DISTINCT user_id) AS users
+    FROM emails
+"""
+
+# Per-user label counts. Only the top ready users are returned; users
+# still below the threshold are summarized as a single 'pending' row.
+_Q_LABEL_AGGREGATES = f"""
+    WITH labeled AS (
+        SELECT user_id, COUNT(*) AS count
+        FROM emails
+        WHERE user_labeled = 1 AND importance != 'unclassified'
+        GROUP BY user_id
+    )
+    SELECT * FROM (
+        SELECT 'user' AS kind, substr(user_id, 1, 8) || '...' AS key, count
+        FROM labeled
+        WHERE count >= {MIN_TRAINING_LABELS}
+        ORDER BY count DESC
+        LIMIT 20
+    )
+    UNION ALL
+    SELECT 'pending' AS kind, NULL AS key, COUNT(*) AS count
+    FROM labeled
+    WHERE count < {MIN_TRAINING_LABELS}
+"""
+
+# Sample unclassified emails via an index seek, not a scan
+_Q_UNCLASSIFIED_SAMPLE = """
+    SELECT substr(id, 1, 8) || '...' AS short_id,
+           substr(subject, 1, 50) AS short_subject
+    FROM emails INDEXED BY idx_emails_importance_labeled_user
+    WHERE importance = 'unclassified'
+    LIMIT 5
+"""
+
+# Shared HTTP client, reused across all FastAPI probes
+_HTTP: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared pooled HTTP client, creating it on first use"""
+    global _HTTP
+    if _HTTP is None:
+        # Explicit HTTP/1.1 pooled transport for the concurrent probe path
+        transport = httpx.AsyncHTTPTransport(
+            http2=False,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+        )
+        _HTTP = httpx.AsyncClient(base_url=API_URL, timeout=5.0, transport=transport)
+    return _HTTP
+
+def _section_buffer() -> Tuple[io.StringIO, Callable[..., None]]:
+    """Create a per-check output buffer so concurrent checks don't interleave"""
+    out = io.StringIO()
+    return out, partial(print, file=out)
+
+def _tune_connection(connection):
+    """Apply read-friendly PRAGMAs for repeated debug runs"""
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA cache_size=-65536")
+    connection.execute("PRAGMA temp_store=MEMORY")
+    try:
+        connection.execute("PRAGMA mmap_size=268435456")
+    except sqlite3.Error:
+        # Some platforms refuse mmap; regular page reads still work
+        pass
+
+def _check_database_status_sync(db_path: str) -> str:
+    """Check current database state (blocking SQLite work)"""
+    out, emit = _section_buffer()
+
+    emit("🔍 Checking SQLite Database Status")
+    emit("=" * 50)
     
     # Connect to database
-    db_path = '../data/emails.db'
     client = SQLiteEmailClient(db_path)
     
     if not client.connect():
-        print("❌ Failed to connect to database")
-        return
+        emit("❌ Failed to connect to database")
+        return out.getvalue()
+    
+    _tune_connection(client.connection)
     
     try:
-        # Get database stats
-        stats = client.get_database_stats()
-        print(f"📊 Database Statistics:")
-        print(f"   Total emails: {stats.get('total_emails', 0)}")
-        print(f"   Labeled emails: {stats.get('labeled_emails', 0)}")
-        print(f"   Important emails: {stats.get('important_emails', 0)}")
-        print(f"   Total users: {stats.get('total_users', 0)}")
-        print()
+        # Bail out early if the database is damaged; the aggregates are meaningless then
+        integrity = client.connection.execute("PRAGMA quick_check(1)").fetchone()[0]
+        if integrity != 'ok':
+            emit(f"❌ Integrity: {integrity}")
+            return out.getvalue()
+        
+        # Covering index for the aggregates below (no-op if already present)
+        client.connection.execute(_Q_CREATE_DEBUG_INDEX)
+        client.connection.commit()
         
-        # Check importance distribution
         cursor = client.connection.cursor()
-        cursor.execute("""
-            SELECT importance, COUNT(*) as count 
-            FROM emails 
-            GROUP BY importance
-        """)
+        cursor.arraysize = 512
+        # Plain tuples are cheaper than sqlite3.Row for these small loops
+        cursor.row_factory = None
         
-        print("📈 Importance Distribution:")
-        for row in cursor.fetchall():
-            print(f"   {row['importance']}: {row['count']} emails")
-        print()
+        # Read everything in one transaction so the page cache stays warm
+        with client.connection:
+            cursor.execute("BEGIN")
+            
+            # Stats and importance histogram (replaces get_database_stats here)
+            cursor.execute(_Q_DATABASE_STATS)
+            total, labeled, important, not_important, unclassified_count, users = cursor.fetchone()
+            
+            cursor.execute(_Q_LABEL_AGGREGATES)
+            
+            users_with_labels = []
+            pending_users = 0
+            # Fetch in bounded chunks; the per-user half grows with user count
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                for kind, key, count in rows:
+                    if kind == 'user':
+                        users_with_labels.append((key, count))
+                    else:
+                        pending_users = count
+            
+            # Get sample unclassified emails
+            cursor.execute(_Q_UNCLASSIFIED_SAMPLE)
+            unclassified = cursor.fetchall()
+        
+        emit(f"📊 Database Statistics:")
+        emit(f"   Total emails: {total}")
+        emit(f"   Labeled emails: {labeled}")
+        emit(f"   Important emails: {important}")
+        emit(f"   Total users: {users}")
+        emit()
         
-        # Get sample unclassified emails
-        cursor.execute("""
-            SELECT id, subject, sender, importance, user_labeled
-            FROM emails 
-            WHERE importance = 'unclassified'
-            LIMIT 5
-        """)
+        emit("📈 Importance Distribution:")
+        emit(f"   important: {important} emails")
+        emit(f"   not_important: {not_important} emails")
+        emit(f"   unclassified: {unclassified_count} emails")
+        other = total - important - not_important - unclassified_count
+        if other:
+            emit(f"   other: {other} emails")
+        emit()
         
-        unclassified = cursor.fetchall()
         if unclassified:
-            print("📝 Sample Unclassified Emails:")
-            for email in unclassified:
-                print(f"   ID: {email['id'][:8]}... | Subject: {email['subject'][:50]}...")
+            emit("📝 Sample Unclassified Emails:")
+            for short_id, short_subject in unclassified:
+                emit(f"   ID: {short_id} | Subject: {short_subject}...")
         else:
-            print("✅ No unclassified emails found!")
-        print()
+            emit("✅ No unclassified emails found!")
+        emit()
         
         # Check if we have any user with enough training data
-        cursor.execute("""
-            SELECT user_id, COUNT(*) as labeled_count
-            FROM emails 
-            WHERE user_labeled = 1 AND importance != 'unclassified'
-            GROUP BY user_id
-        """)
-        
-        users_with_labels = cursor.fetchall()
-        print("👤 Users with Training Data:")
-        if users_with_labels:
-            for user in users_with_labels:
-                user_id = user['user_id'][:8] + "..."
-                count = user['labeled_count']
-                status = "✅ Ready for AI" if count >= 10 else f"❌ Need {10-count} more"
-                print(f"   User {user_id}: {count} labels | {status}")
+        emit("👤 Users with Training Data:")
+        if users_with_labels or pending_users:
+            for short_user_id, count in users_with_labels:
+                emit(f"   User {short_user_id}: {count} labels | ✅ Ready for AI")
+            if pending_users:
+                emit(f"   ❌ {pending_users} user(s) with fewer than {MIN_TRAINING_LABELS} labels")
         else:
-            print("   ❌ No users have labeled emails yet!")
+            emit("   ❌ No users have labeled emails yet!")
             
     finally:
         client.disconnect()
+    
+    return out.getvalue()
+
+async def check_database_status(db_path: str = str(DEFAULT_DB_PATH)):
+    """Check current database state without blocking the event loop"""
+    return await asyncio.to_thread(_check_database_status_sync, db_path)
 
 async def check_fastapi_status():
     """Check if FastAPI service is running and has trained models"""
-    print("\n🤖 Checking FastAPI Service Status")
-    print("=" * 50)
+    out, emit = _section_buffer()
+
+    emit("\n🤖 Checking FastAPI Service Status")
+    emit("=" * 50)
     
-    api_url = "http://localhost:8000"
+    client = get_http_client()
     
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            # Health check
-            response = await client.get(f"{api_url}/health")
+        # Health check (HEAD skips building and reading the body)
+        response = await client.head("/health")
+        if response.status_code == 200:
+            emit("✅ FastAPI service is running")
+        else:
+            emit(f"❌ FastAPI health check failed: {response.status_code}")
+            return out.getvalue()
+        
+        # Check for trained models (this will fail, but we can see the error)
+        try:
+            response = await client.get("/stats/test_user")
             if response.status_code == 200:
-                print("✅ FastAPI service is running")
+                stats = response.json()
+                emit(f"📊 Sample Model Stats: {stats}")
+            elif response.status_code == 404:
+                emit("❌ No trained models found")
             else:
-                print(f"❌ FastAPI health check failed: {response.status_code}")
-                return
+                emit(f"❌ Error checking model stats: {response.status_code}")
+        except Exception as e:
+            emit(f"❌ Error checking model stats: {e}")
             
-            # Check for trained models (this will fail, but we can see the error)
-            try:
-                response = await client.get(f"{api_url}/stats/test_user")
-                if response.status_code == 200:
-                    stats = response.json()
-                    print(f"📊 Sample Model Stats: {stats}")
-                elif response.status_code == 404:
-                    print("❌ No trained models found")
-                else:
-                    print(f"❌ Error checking model stats: {response.status_code}")
-            except Exception as e:
-                print(f"❌ Error checking model stats: {e}")
-                
     except Exception as e:
-        print(f"❌ FastAPI service not accessible: {e}")
+        emit(f"❌ FastAPI service not accessible: {e}")
+    
+    return out.getvalue()
 
 async def check_qdrant_status():
     """Check if Qdrant is accessible"""
-    print("\n🔍 Checking Qdrant Status")
-    print("=" * 50)
+    out, emit = _section_buffer()
+
+    emit("\n🔍 Checking Qdrant Status")
+    emit("=" * 50)
     
     try:
         from vector_store_client import QdrantClient
         
-        client = QdrantClient(host="localhost", port=6333, collection_name="email_embeddings")
+        # qdrant-client is synchronous; build it off the event loop
+        client = await asyncio.to_thread(
+            QdrantClient, host="localhost", port=6333, collection_name="email_embeddings"
+        )
         
         # Try to get collection info
         try:
-            info = client.client.get_collection("email_embeddings")
-            print(f"✅ Qdrant is running")
-            print(f"📊 Collection info: {info.points_count} points")
+            # Approximate count is far lighter than full collection metadata
+            info = await asyncio.to_thread(
+                client.client.count, collection_name="email_embeddings", exact=False
+            )
+            emit(f"✅ Qdrant is running")
+            emit(f"📊 Collection info: {info.count} points")
         except Exception as e:
-            print(f"❌ Qdrant collection error: {e}")
+            emit(f"❌ Qdrant collection error: {e}")
             
     except Exception as e:
-        print(f"❌ Qdrant not accessible: {e}")
+        emit(f"❌ Qdrant not accessible: {e}")
+    
+    return out.getvalue()
 
 async def main():
     """Run all checks"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Email Classification Debug Tool")
+    parser.add_argument(
+        "--db-path",
+        default=os.getenv("SQLITE_DB_PATH", str(DEFAULT_DB_PATH)),
+        help="SQLite database path"
+    )
+    args = parser.parse_args()
+    
     print("🔧 Email Classification Debug Tool")
     print("=" * 50)
     
-    await check_database_status()
-    await check_fastapi_status()
-    await check_qdrant_status()
+    try:
+        # Checks hit independent subsystems, so run them concurrently
+        sections = await asyncio.gather(
+            check_database_status(args.db_path),
+            check_fastapi_status(),
+            check_qdrant_status()
+        )
+    finally:
+        if _HTTP is not None:
+            await _HTTP.aclose()
+    
+    recommendations = [
+        "\n💡 Recommendations:",
+        f"1. Make sure you have labeled at least {MIN_TRAINING_LABELS} emails via bulk labeling",
+        "2. Ensure FastAPI service is running: python email_classifier_service.py",
+        "3. Ensure Qdrant is running on localhost:6333",
+        "4. Run the classifier: python run_classifier.py",
+    ]
     
-    print("\n💡 Recommendations:")
-    print("1. Make sure you have labeled at least 10 emails via bulk labeling")
-    print("2. Ensure FastAPI service is running: python email_classifier_service.py")
-    print("3. Ensure Qdrant is running on localhost:6333")
-    print("4. Run the classifier: python run_classifier.py")
+    # One write for the whole report instead of a syscall per line
+    sys.stdout.write("".join(sections) + "\n".join(recommendations) + "\n")
+    sys.stdout.flush()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -7,18 +7,27 @@ using few-shot learning and vector similarity search.
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Literal, Any
+from typing import List, Dict, Optional, Literal, Any, Tuple
+from collections import OrderedDict
 from datetime import datetime
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
 import joblib
 import logging
 import uuid
+import time
+import asyncio
 import pickle
 import os
-import json
+import shutil
+import orjson
+
+from kernels import similarity_features, to_device, SIMILARITY_FEATURE_COUNT, EMBEDDING_DTYPE
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -64,6 +73,10 @@ class LabeledExample(BaseModel):
     email_id: str
     is_important: bool
     confidence: Optional[float] = None
+    # Optional embedding and payload the caller already holds; /train uses them
+    # instead of fetching the email from the vector store
+    vector: Optional[List[float]] = None
+    metadata: Optional[Dict[str, Any]] = None
 
 class TrainingRequest(BaseModel):
     """Request to train/update the classifier"""
@@ -118,8 +131,13 @@ class ModelStats(BaseModel):
     last_trained: datetime
     model_version: str
 
+class BulkStatsRequest(BaseModel):
+    """Users to fetch training example counts for"""
+    user_ids: List[str]
+
 # Global state (in production, use Redis/database)
 user_models: Dict[str, Dict] = {}
+saved_user_ids = set()  # Users with state on disk, loaded on first use
 vector_store_client = None  # Will be injected
 sqlite_client = None  # Will be injected
 persistence_manager = None  # Will be injected
@@ -142,7 +160,12 @@ def initialize_clients():
             "qdrant",
             host=os.getenv("QDRANT_HOST", "localhost"),
             port=int(os.getenv("QDRANT_PORT", "6333")),
-            collection_name=os.getenv("QDRANT_COLLECTION", "email_embeddings")
+            collection_name=os.getenv("QDRANT_COLLECTION", "email_embeddings"),
+            # gRPC with a wide channel pool so concurrent requests don't queue behind one connection
+            grpc_port=int(os.getenv("QDRANT_GRPC_PORT", "6334")),
+            prefer_grpc=os.getenv("QDRANT_PREFER_GRPC", "true").lower() == "true",
+            pool_size=int(os.getenv("QDRANT_POOL_SIZE", "100")),
+            timeout=int(os.getenv("QDRANT_TIMEOUT", "60"))
         )
     else:
         raise ValueError(f"Unsupported vector store type: {store_type}")
@@ -151,7 +174,8 @@ def initialize_clients():
     
     # Initialize SQLite client
     db_path = os.getenv("SQLITE_DB_PATH", "../data/emails.db")
-    sqlite_client = SQLiteEmailClient(db_path)
+    # The service never writes emails; read-only mode keeps it off the ingest writer's locks
+    sqlite_client = SQLiteEmailClient(db_path, read_only=True)
     if sqlite_client.connect():
         logger.info(f"Initialized SQLite client: {db_path}")
     else:
@@ -162,9 +186,110 @@ def initialize_clients():
     persistence_manager = PersistenceManager(data_dir)
     logger.info(f"Initialized persistence manager: {data_dir}")
     
-    # Load existing models on startup
+    # Register saved models; each is loaded on first use
     load_all_user_models()
 
+# Minimum interval between background saves of one classifier
+SAVE_DEBOUNCE_SECONDS = 5.0
+
+# How long /persistence/status reuses its models directory walk
+PERSISTENCE_STATUS_TTL = 5.0  # seconds
+
+# Per-email cache in front of the vector store. Stored embeddings don't
+# change, so a short TTL is enough; the size bound keeps memory in check
+# (each cached email carries its full embedding).
+EMAIL_CACHE_SIZE = 2000
+EMAIL_CACHE_TTL = 300  # seconds
+
+class EmailCache:
+    """LRU/TTL cache of vector store emails by ID with coalesced fetches"""
+    
+    def __init__(self, max_size: int = EMAIL_CACHE_SIZE, ttl: float = EMAIL_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._store: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Fetches in progress, so concurrent requests for an ID share one call
+        self._inflight: Dict[str, asyncio.Future] = {}
+    
+    async def get(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """Get emails by ID, fetching only the misses in a single batch"""
+        now = time.monotonic()
+        found: Dict[str, Optional[Dict[str, Any]]] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        misses = []
+        
+        unique_ids = list(dict.fromkeys(ids))
+        for email_id in unique_ids:
+            entry = self._store.get(email_id)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._store.move_to_end(email_id)
+                found[email_id] = entry[1]
+            elif email_id in self._inflight:
+                waiting[email_id] = self._inflight[email_id]
+            else:
+                misses.append(email_id)
+        
+        if misses:
+            loop = asyncio.get_running_loop()
+            pending = {email_id: loop.create_future() for email_id in misses}
+            self._inflight.update(pending)
+            fetched_by_id = {}
+            try:
+                fetched = await vector_store_client.get_emails_by_ids(misses)
+                fetched_by_id = {email.get('email_id'): email for email in fetched}
+            finally:
+                # Missing emails aren't cached; they may just not be indexed yet
+                for email_id, future in pending.items():
+                    email = fetched_by_id.get(email_id)
+                    if email is not None:
+                        self._put(email_id, email, now)
+                    found[email_id] = email
+                    future.set_result(email)
+                    self._inflight.pop(email_id, None)
+        
+        for email_id, future in waiting.items():
+            found[email_id] = await future
+        
+        return [found[email_id] for email_id in unique_ids if found.get(email_id) is not None]
+    
+    def invalidate(self, ids: List[str]):
+        """Drop cached emails so the next get refetches them"""
+        for email_id in ids:
+            self._store.pop(email_id, None)
+    
+    def _put(self, email_id: str, email: Dict[str, Any], now: float):
+        """Insert an email, evicting the least recently used beyond max_size"""
+        self._store[email_id] = (now, email)
+        self._store.move_to_end(email_id)
+        while len(self._store) > self.max_size:
+            self._store.popitem(last=False)
+
+email_cache = EmailCache()
+
+# Downstream model: "logistic" (default) or "random_forest"
+CLASSIFIER_MODEL = os.getenv("CLASSIFIER_MODEL", "logistic").lower()
+
+# Width of the feature vector built by EmailClassifier.extract_features_batch:
+# 8 similarity statistics, embedding magnitude, 3 temporal, user, model
+FEATURE_COUNT = 14
+
+class LabelCache:
+    """L2-normalized labeled embeddings split by label, built for one labeled_version"""
+    
+    def __init__(self, imp_mat: np.ndarray, unimp_mat: np.ndarray, label_by_id: Dict[str, bool],
+                 version: int, label_rows: Optional[Dict[str, int]] = None,
+                 source: Optional[List[Dict[str, Any]]] = None):
+        self.imp_mat = imp_mat
+        self.unimp_mat = unimp_mat
+        # GPU copies of the label matrices (None without a CUDA/MPS device)
+        self.imp_mat_t = to_device(imp_mat)
+        self.unimp_mat_t = to_device(unimp_mat)
+        self.label_by_id = label_by_id
+        # Row of each email in the stacked [imp; unimp] matrix
+        self.label_rows = label_rows or {}
+        self.source = source
+        self.version = version
+
 class EmailClassifier:
     """Email classification engine"""
     
@@ -180,67 +305,150 @@ class EmailClassifier:
         }
         self.model_version = str(uuid.uuid4())[:8]
         self.last_trained = datetime.now()
+        
+        # Label matrices. The cache is current while its version matches
+        # _labeled_version, which is bumped whenever the labeled set changes.
+        # Always replaced as a whole, so a concurrent classify never sees a
+        # half-built cache.
+        self._labels: Optional[LabelCache] = None
+        self._labeled_version = 0
+        # Unsaved changes, written by save_dirty (see _maybe_save)
+        self._examples_dirty = False
+        self._model_dirty = False
+        self._save_pending = False
+        self._last_saved = 0.0
     
     def add_training_examples(self, examples: List[LabeledExample]):
         """Add new training examples"""
         self.labeled_examples.extend(examples)
+        self._labeled_version += 1
+        self._examples_dirty = True
         logger.info(f"Added {len(examples)} training examples for user {self.user_id}")
-        # Auto-save after adding examples
-        self.save_to_disk()
     
-    def save_to_disk(self):
-        """Save classifier state to disk"""
+    def is_dirty(self) -> bool:
+        """Whether there is state that hasn't been written to disk yet"""
+        return self._examples_dirty or self._model_dirty
+    
+    def _user_dir(self) -> str:
+        """Create and return this user's model directory"""
+        user_dir = os.path.join(persistence_manager.data_dir, "models", self.user_id)
+        os.makedirs(user_dir, exist_ok=True)
+        return user_dir
+    
+    def save_examples(self) -> bool:
+        """Save labeled examples and the label matrices built from them"""
         if not persistence_manager:
             return False
         
+        # Cleared up front so labels added while writing mark it dirty again
+        self._examples_dirty = False
         try:
-            # Create user-specific directory
-            user_dir = os.path.join(persistence_manager.data_dir, "models", self.user_id)
-            os.makedirs(user_dir, exist_ok=True)
+            user_dir = self._user_dir()
             
-            # Save labeled examples
-            examples_data = [
-                {
-                    "email_id": ex.email_id,
-                    "is_important": ex.is_important,
-                    "confidence": ex.confidence
-                }
-                for ex in self.labeled_examples
-            ]
+            # Labels as flat arrays: fixed-width ID strings, uint8 labels and
+            # float64 confidences (NaN for None), with no per-example dicts
+            count = len(self.labeled_examples)
+            email_ids = np.array([ex.email_id for ex in self.labeled_examples], dtype=str)
+            labels = np.fromiter((ex.is_important for ex in self.labeled_examples), dtype=np.uint8, count=count)
+            confidences = np.fromiter(
+                (np.nan if ex.confidence is None else ex.confidence for ex in self.labeled_examples),
+                dtype=np.float64, count=count
+            )
+            np.savez_compressed(
+                os.path.join(user_dir, "labels.npz"),
+                ids=email_ids, labels=labels, confidences=confidences
+            )
             
-            examples_file = os.path.join(user_dir, "labeled_examples.json")
-            with open(examples_file, 'w') as f:
-                json.dump({
-                    "examples": examples_data,
-                    "count": len(examples_data),
-                    "last_updated": datetime.now().isoformat()
-                }, f, indent=2)
+            # Superseded by labels.npz
+            legacy_file = os.path.join(user_dir, "labeled_examples.json")
+            if os.path.exists(legacy_file):
+                os.remove(legacy_file)
             
-            # Save model if it exists
-            if self.model:
-                model_file = os.path.join(user_dir, "model.pkl")
-                joblib.dump(self.model, model_file)
+            # Save the normalized label matrices as raw .npy; drop stale ones.
+            # After a load they are memmaps of these very files, so each is
+            # written to a temp file and swapped in rather than overwritten
+            labels = self._labels
+            cache_is_current = self._is_current(labels)
+            for name, attr in (("imp_mat.npy", "imp_mat"), ("unimp_mat.npy", "unimp_mat")):
+                matrix_file = os.path.join(user_dir, name)
+                if cache_is_current:
+                    matrix = getattr(labels, attr)
+                    tmp_file = f"{matrix_file}.tmp"
+                    with open(tmp_file, 'wb') as f:
+                        np.save(f, matrix)
+                    os.replace(tmp_file, matrix_file)
+                elif os.path.exists(matrix_file):
+                    os.remove(matrix_file)
             
-            # Save metadata
-            metadata = {
-                "user_id": self.user_id,
-                "model_version": self.model_version,
-                "last_trained": self.last_trained.isoformat(),
-                "feature_weights": self.feature_weights,
-                "examples_count": len(self.labeled_examples)
-            }
+            self._save_metadata(user_dir)
+            return True
             
-            metadata_file = os.path.join(user_dir, "metadata.json")
-            with open(metadata_file, 'w') as f:
-                json.dump(metadata, f, indent=2)
+        except Exception as e:
+            self._examples_dirty = True
+            logger.error(f"Failed to save labeled examples for user {self.user_id}: {e}")
+            return False
+    
+    def save_model(self) -> bool:
+        """Save the trained model, if there is one"""
+        if not persistence_manager:
+            return False
+        
+        self._model_dirty = False
+        try:
+            user_dir = self._user_dir()
             
-            logger.info(f"Saved classifier state for user {self.user_id}")
+            # Left uncompressed so it can be memory-mapped. Written to a temp
+            # file and swapped in, since a loaded model may still be mapped
+            # from model.pkl and rewriting it in place would fault that mapping
+            if self.model:
+                model_file = os.path.join(user_dir, "model.pkl")
+                tmp_file = f"{model_file}.tmp"
+                joblib.dump(self.model, tmp_file)
+                os.replace(tmp_file, model_file)
+            
+            self._save_metadata(user_dir)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to save classifier state for user {self.user_id}: {e}")
+            self._model_dirty = True
+            logger.error(f"Failed to save model for user {self.user_id}: {e}")
             return False
     
+    def _save_metadata(self, user_dir: str):
+        """Save model version, training time and example count"""
+        metadata = {
+            "user_id": self.user_id,
+            "model_version": self.model_version,
+            "last_trained": self.last_trained.isoformat(),
+            "feature_weights": self.feature_weights,
+            "examples_count": len(self.labeled_examples)
+        }
+        
+        metadata_file = os.path.join(user_dir, "metadata.json")
+        with open(metadata_file, 'wb') as f:
+            f.write(orjson.dumps(metadata, option=orjson.OPT_SERIALIZE_NUMPY))
+        
+        self._last_saved = time.monotonic()
+    
+    def save_dirty(self) -> bool:
+        """Save only the parts of the classifier state that changed"""
+        success = True
+        if self._examples_dirty:
+            success = self.save_examples() and success
+        if self._model_dirty:
+            success = self.save_model() and success
+        return success
+    
+    def save_to_disk(self):
+        """Save classifier state to disk"""
+        if not persistence_manager:
+            return False
+        
+        if self.save_examples() and self.save_model():
+            logger.info(f"Saved classifier state for user {self.user_id}")
+            return True
+        return False
+    
     @classmethod
     def load_from_disk(cls, user_id: str):
         """Load classifier state from disk"""
@@ -260,8 +468,8 @@ class EmailClassifier:
             # Load metadata
             metadata_file = os.path.join(user_dir, "metadata.json")
             if os.path.exists(metadata_file):
-                with open(metadata_file, 'r') as f:
-                    metadata = json.load(f)
+                with open(metadata_file, 'rb') as f:
+                    metadata = orjson.loads(f.read())
                 
                 classifier.model_version = metadata.get("model_version", classifier.model_version)
                 classifier.feature_weights = metadata.get("feature_weights", classifier.feature_weights)
@@ -270,14 +478,31 @@ class EmailClassifier:
                 if last_trained_str:
                     classifier.last_trained = datetime.fromisoformat(last_trained_str)
             
-            # Load labeled examples
+            # Load labeled examples. Both formats were written by save_examples,
+            # so skip re-validating every example.
+            labels_file = os.path.join(user_dir, "labels.npz")
             examples_file = os.path.join(user_dir, "labeled_examples.json")
-            if os.path.exists(examples_file):
-                with open(examples_file, 'r') as f:
-                    examples_data = json.load(f)
+            if os.path.exists(labels_file):
+                with np.load(labels_file) as labels_data:
+                    email_ids = labels_data["ids"].tolist()
+                    labels = labels_data["labels"].tolist()
+                    confidences = labels_data["confidences"].tolist()
+                
+                classifier.labeled_examples = [
+                    LabeledExample.model_construct(
+                        email_id=email_id,
+                        is_important=bool(label),
+                        confidence=None if confidence != confidence else confidence  # NaN -> None
+                    )
+                    for email_id, label, confidence in zip(email_ids, labels, confidences)
+                ]
+            elif os.path.exists(examples_file):
+                # Older JSON format; rewritten as labels.npz on the next save
+                with open(examples_file, 'rb') as f:
+                    examples_data = orjson.loads(f.read())
                 
                 classifier.labeled_examples = [
-                    LabeledExample(
+                    LabeledExample.model_construct(
                         email_id=ex["email_id"],
                         is_important=ex["is_important"],
                         confidence=ex.get("confidence", 1.0)
@@ -288,9 +513,26 @@ class EmailClassifier:
             # Load model
             model_file = os.path.join(user_dir, "model.pkl")
             if os.path.exists(model_file):
-                classifier.model = joblib.load(model_file)
+                # Memory-mapped: the model's arrays are paged in on demand
+                classifier.model = joblib.load(model_file, mmap_mode='r')
                 logger.info(f"Loaded trained model for user {user_id}")
             
+            # Load label matrices memory-mapped; pages are read only when touched
+            imp_file = os.path.join(user_dir, "imp_mat.npy")
+            unimp_file = os.path.join(user_dir, "unimp_mat.npy")
+            if os.path.exists(imp_file) and os.path.exists(unimp_file):
+                imp_mat = np.load(imp_file, mmap_mode='r')
+                unimp_mat = np.load(unimp_file, mmap_mode='r')
+                if imp_mat.dtype != EMBEDDING_DTYPE or unimp_mat.dtype != EMBEDDING_DTYPE:
+                    # Saved with a different precision; convert once rather than per query
+                    imp_mat = imp_mat.astype(EMBEDDING_DTYPE)
+                    unimp_mat = unimp_mat.astype(EMBEDDING_DTYPE)
+                
+                # Matrices are only saved while current for the saved labels
+                classifier._labels = LabelCache(
+                    imp_mat, unimp_mat, classifier._index_labels(), classifier._labeled_version
+                )
+            
             logger.info(f"Loaded classifier for user {user_id} with {len(classifier.labeled_examples)} examples")
             return classifier
             
@@ -300,20 +542,33 @@ class EmailClassifier:
     
 
     
-    async def train(self, email_data_list: List[Dict[str, Any]]) -> bool:
-        """Train the classification model with Qdrant email data"""
+    def train(self, email_data_list: List[Dict[str, Any]], cache_labels: bool = True) -> bool:
+        """
+        Train the classification model with Qdrant email data.
+        
+        cache_labels=False when email_data_list is not the vector store's data
+        for the full labeled set (a /train that only adds examples, or one with
+        client-supplied vectors): the label matrices built here are then not kept,
+        so /classify refetches every labeled email instead of trusting them.
+        """
         if len(self.labeled_examples) < 2:
             logger.warning(f"Insufficient training data for user {self.user_id}")
             return False
         
         try:
+            # Labels added while this runs leave the new matrices stale
+            version = self._labeled_version
+            
             # Get labeled email data
             labeled_emails = []
             labels = []
             
+            # Index email data once so each example is a hash lookup
+            by_id = {e['email_id']: e for e in email_data_list if 'email_id' in e}
+            
             for example in self.labeled_examples:
                 # Find corresponding email data
-                email_data = next((e for e in email_data_list if e.get('email_id') == example.email_id), None)
+                email_data = by_id.get(example.email_id)
                 if email_data:
                     labeled_emails.append(email_data)
                     labels.append(1 if example.is_important else 0)
@@ -323,23 +578,50 @@ class EmailClassifier:
                 return False
             
             # Extract features using the improved method
-            X = np.array([self.extract_features_with_labels(email_data, labeled_emails) for email_data in labeled_emails])
+            # The linear model needs each example's similarity to itself left out
+            # (a perfect self-match never happens at prediction time); the forest
+            # keeps the features it was always trained on. Logistic regression
+            # can't fit a single class, so a user who has labeled only one kind
+            # of email gets the forest.
             y = np.array(labels)
+            use_forest = CLASSIFIER_MODEL == "random_forest" or len(np.unique(y)) < 2
+            label_cache = self._build_label_cache(labeled_emails, version)
+            X = self._extract_features(labeled_emails, label_cache, exclude_self=not use_forest)
             
-            # Train model
-            self.model = RandomForestClassifier(
-                n_estimators=50,
-                max_depth=10,
-                random_state=42,
-                class_weight='balanced'
-            )
-            self.model.fit(X, y)
+            # Train model. A linear model over the similarity features predicts
+            # with a single dot product; the forest remains available as opt-in.
+            # The new model and label matrices are built locally and swapped in
+            # once fitted, so a concurrent classify or save keeps using the old ones.
+            if use_forest:
+                model = RandomForestClassifier(
+                    n_estimators=50,
+                    max_depth=10,
+                    random_state=42,
+                    class_weight='balanced',
+                    n_jobs=-1  # trees fit/predict on threads; train/classify already run off the event loop
+                )
+            else:
+                # Features live on very different scales (cosines vs. norms vs.
+                # 0/1 flags); standardize so regularization treats them evenly
+                model = make_pipeline(
+                    StandardScaler(),
+                    LogisticRegression(
+                        class_weight='balanced',
+                        max_iter=200,
+                        solver='liblinear'
+                    )
+                )
+            model.fit(X, y)
             
+            if cache_labels:
+                self._labels = label_cache
+            self.model = model
             self.last_trained = datetime.now()
             self.model_version = str(uuid.uuid4())[:8]
             
-            # Save the updated model to disk
-            self.save_to_disk()
+            # Training also rebuilt the label matrices, so both parts need saving
+            self._model_dirty = True
+            self._examples_dirty = True
             
             logger.info(f"Model trained for user {self.user_id} with {len(labeled_emails)} examples")
             return True
@@ -348,7 +630,7 @@ class EmailClassifier:
             logger.error(f"Training failed for user {self.user_id}: {str(e)}")
             return False
     
-    async def classify(self, email_data_list: List[Dict[str, Any]], labeled_email_data: List[Dict[str, Any]]) -> List[ClassificationResult]:
+    def classify(self, email_data_list: List[Dict[str, Any]], labeled_email_data: Optional[List[Dict[str, Any]]] = None) -> List[ClassificationResult]:
         """Classify emails as important/non-important using Qdrant data"""
         results = []
         
@@ -358,16 +640,21 @@ class EmailClassifier:
         if len(self.labeled_examples) < 2:
             raise ValueError("Insufficient training examples. Need at least 2 labeled examples.")
         
-        for email_data in email_data_list:
-            features = self.extract_features_with_labels(email_data, labeled_email_data).reshape(1, -1)
-            
-            # Get prediction and confidence
-            prediction = self.model.predict(features)[0]
-            probabilities = self.model.predict_proba(features)[0]
-            confidence = max(probabilities)
-            
+        if not email_data_list:
+            return results
+        
+        # Parse send times once; both the features and the reasoning use them
+        sent_times = [self._sent_time(email_data) for email_data in email_data_list]
+        
+        # Features, predictions and confidences for the whole batch at once
+        features = self.extract_features_batch(email_data_list, labeled_email_data, sent_times=sent_times)
+        probabilities = self.model.predict_proba(features)
+        predictions = self.model.classes_[probabilities.argmax(axis=1)]
+        confidences = probabilities.max(axis=1)
+        
+        for email_data, sent_time, prediction, confidence in zip(email_data_list, sent_times, predictions, confidences):
             # Generate reasoning
-            reasoning = self._generate_reasoning(email_data, prediction, confidence)
+            reasoning = self._generate_reasoning(email_data, prediction, confidence, sent_time)
             
             results.append(ClassificationResult(
                 email_id=email_data.get('email_id', 'unknown'),
@@ -378,106 +665,192 @@ class EmailClassifier:
         
         return results
     
-    def extract_features_with_labels(self, email_data: Dict[str, Any], labeled_email_data: List[Dict[str, Any]]) -> np.ndarray:
-        """Extract features knowing which labeled examples are important/unimportant"""
-        features = []
+    @staticmethod
+    def _normalize_rows(embeddings: List[List[float]]) -> np.ndarray:
+        """Stack embeddings into an EMBEDDING_DTYPE matrix with unit-length rows"""
+        if not embeddings:
+            return np.empty((0, 0), dtype=EMBEDDING_DTYPE)
         
-        email_embedding = email_data.get('embedding', [])
+        matrix = np.asarray(embeddings, dtype=EMBEDDING_DTYPE)
+        norms = EmailClassifier._row_norms(matrix)[:, None]
+        norms[norms == 0] = 1.0
+        return matrix / norms
+    
+    @staticmethod
+    def _row_norms(matrix: np.ndarray) -> np.ndarray:
+        """L2 norm of each row via a direct dot product (skips linalg.norm dispatch)"""
+        return np.sqrt(np.einsum('ij,ij->i', matrix, matrix))
+    
+    @staticmethod
+    def _has_embedding(email_data: Dict[str, Any]) -> bool:
+        """Whether an email carries a non-empty embedding (a list or an ndarray row)"""
+        embedding = email_data.get('embedding')
+        return embedding is not None and len(embedding) > 0
+    
+    def _index_labels(self) -> Dict[str, bool]:
+        """Map email ID to label; the first label recorded for an email wins"""
+        label_by_id = {}
+        for example in self.labeled_examples:
+            label_by_id.setdefault(example.email_id, example.is_important)
+        return label_by_id
+    
+    def _is_current(self, labels: Optional[LabelCache]) -> bool:
+        """Whether a label cache reflects the current labeled examples"""
+        return labels is not None and labels.version == self._labeled_version
+    
+    def _label_cache_is_current(self) -> bool:
+        """Whether the label matrices reflect the current labeled examples"""
+        return self._is_current(self._labels)
+    
+    def _build_label_cache(self, labeled_email_data: List[Dict[str, Any]], version: int) -> LabelCache:
+        """Split labeled embeddings into important/unimportant matrices in one walk"""
+        label_by_id = self._index_labels()
         
-        if not email_embedding or not labeled_email_data:
-            return np.array([0.0] * 15)
-        
-        # Separate examples by their actual labels
         important_embeddings = []
         unimportant_embeddings = []
+        important_ids = []
+        unimportant_ids = []
         
         for labeled_email in labeled_email_data:
             email_id = labeled_email.get('email_id')
-            embedding = labeled_email.get('embedding', [])
+            embedding = labeled_email.get('embedding')
             
-            if embedding and email_id:
-                # Find the corresponding label
-                label_example = next((ex for ex in self.labeled_examples if ex.email_id == email_id), None)
-                if label_example:
-                    if label_example.is_important:
-                        important_embeddings.append(embedding)
-                    else:
-                        unimportant_embeddings.append(embedding)
-        
-        # Calculate similarities to important examples
-        important_similarities = []
-        if important_embeddings:
-            for imp_embedding in important_embeddings:
-                sim = cosine_similarity([email_embedding], [imp_embedding])[0][0]
-                important_similarities.append(sim)
-        
-        # Calculate similarities to unimportant examples  
-        unimportant_similarities = []
-        if unimportant_embeddings:
-            for unimp_embedding in unimportant_embeddings:
-                sim = cosine_similarity([email_embedding], [unimp_embedding])[0][0]
-                unimportant_similarities.append(sim)
-        
-        # Semantic similarity features (most important)
-        avg_important_sim = np.mean(important_similarities) if important_similarities else 0.0
-        max_important_sim = np.max(important_similarities) if important_similarities else 0.0
-        avg_unimportant_sim = np.mean(unimportant_similarities) if unimportant_similarities else 0.0
-        max_unimportant_sim = np.max(unimportant_similarities) if unimportant_similarities else 0.0
-        
-        features.extend([
-            avg_important_sim,
-            max_important_sim,
-            avg_unimportant_sim,
-            max_unimportant_sim,
-            avg_important_sim - avg_unimportant_sim  # Key discriminative feature
-        ])
-        
-        # Overall similarity statistics
-        all_similarities = important_similarities + unimportant_similarities
-        if all_similarities:
-            features.extend([
-                np.mean(all_similarities),
-                np.std(all_similarities),
-                np.max(all_similarities)
-            ])
-        else:
-            features.extend([0.0, 0.0, 0.0])
+            if email_id and self._has_embedding(labeled_email):
+                is_important = label_by_id.get(email_id)
+                if is_important is None:
+                    continue
+                if is_important:
+                    important_embeddings.append(embedding)
+                    important_ids.append(email_id)
+                else:
+                    unimportant_embeddings.append(embedding)
+                    unimportant_ids.append(email_id)
+        
+        # Row of each email in the stacked [imp; unimp] matrix (first wins)
+        label_rows = {}
+        for row, email_id in enumerate(important_ids + unimportant_ids):
+            label_rows.setdefault(email_id, row)
+        
+        return LabelCache(
+            self._normalize_rows(important_embeddings),
+            self._normalize_rows(unimportant_embeddings),
+            label_by_id, version, label_rows=label_rows, source=labeled_email_data
+        )
+    
+    def extract_features_with_labels(self, email_data: Dict[str, Any], labeled_email_data: List[Dict[str, Any]]) -> np.ndarray:
+        """Extract features knowing which labeled examples are important/unimportant"""
+        return self.extract_features_batch([email_data], labeled_email_data)[0]
+    
+    def extract_features_batch(self, email_data_list: List[Dict[str, Any]], labeled_email_data: Optional[List[Dict[str, Any]]],
+                               exclude_self: bool = False,
+                               sent_times: Optional[List[Optional[Tuple[int, int]]]] = None) -> np.ndarray:
+        """
+        Extract a (len(email_data_list), FEATURE_COUNT) feature matrix in one pass.
+        
+        With exclude_self, an email that is itself a labeled example is compared
+        against the other examples only, so training features don't see a
+        perfect self-match that never happens at prediction time. sent_times
+        optionally passes in _sent_time results already computed by the caller.
+        """
+        # labeled_email_data=None means "use the cached label matrices"
+        labels = self._labels
+        if labeled_email_data is None:
+            if not self._is_current(labels):
+                labels = None
+        elif not labeled_email_data:
+            labels = None
+        elif not self._is_current(labels) or labels.source is not labeled_email_data:
+            labels = self._build_label_cache(labeled_email_data, self._labeled_version)
+            self._labels = labels
+        
+        return self._extract_features(email_data_list, labels, exclude_self=exclude_self, sent_times=sent_times)
+    
+    def _extract_features(self, email_data_list: List[Dict[str, Any]], labels: Optional[LabelCache],
+                          exclude_self: bool = False,
+                          sent_times: Optional[List[Optional[Tuple[int, int]]]] = None) -> np.ndarray:
+        """Feature matrix against the given label matrices (all zeros without them)"""
+        features = np.zeros((len(email_data_list), FEATURE_COUNT))
+        
+        # Emails without an embedding keep an all-zero feature row
+        rows = [i for i, email_data in enumerate(email_data_list) if self._has_embedding(email_data)]
+        if not rows or labels is None:
+            return features
+        
+        # Unit-length queries, so dot products against the label matrices
+        # are cosine similarities
+        queries = np.asarray([email_data_list[i]['embedding'] for i in rows], dtype=EMBEDDING_DTYPE)
+        query_norms = self._row_norms(queries)
+        queries = queries / np.where(query_norms == 0, 1, query_norms)[:, None].astype(EMBEDDING_DTYPE)
+        
+        # Fill the output directly when every email has an embedding (the
+        # common case); otherwise fill a block and scatter it into place
+        all_rows = len(rows) == len(email_data_list)
+        block = features if all_rows else np.empty((len(rows), FEATURE_COUNT))
+        
+        # Semantic similarity features (most important): avg/max per label
+        # class, their difference, and mean/std/max over all examples
+        block[:, :SIMILARITY_FEATURE_COUNT] = similarity_features(
+            queries, labels.imp_mat, labels.unimp_mat, labels.imp_mat_t, labels.unimp_mat_t,
+            exclude=self._self_rows(email_data_list, rows, labels.label_rows) if exclude_self else None
+        )
         
         # Embedding magnitude
-        embedding_magnitude = np.linalg.norm(email_embedding) if email_embedding else 0.0
-        features.append(embedding_magnitude)
+        block[:, 8] = query_norms
         
         # Metadata features (less important now)
+        if sent_times is None:
+            sent_times = [self._sent_time(email_data) if self._has_embedding(email_data) else None
+                          for email_data in email_data_list]
+        for j, i in enumerate(rows):
+            self._metadata_features(email_data_list[i], sent_times[i], block[j, 9:])
+        
+        if not all_rows:
+            features[rows] = block
+        return features
+    
+    @staticmethod
+    def _self_rows(email_data_list: List[Dict[str, Any]], rows: List[int], label_rows: Dict[str, int]) -> np.ndarray:
+        """Label matrix row of each email in rows, or -1 if it isn't a labeled example"""
+        return np.array(
+            [label_rows.get(email_data_list[i].get('email_id'), -1) for i in rows],
+            dtype=np.int64
+        )
+    
+    @staticmethod
+    def _sent_time(email_data: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+        """(hour, weekday) from the email's createdAt, or None if missing/unparseable"""
+        created_at = email_data.get('metadata', {}).get('createdAt')
+        if not created_at:
+            return None
+        try:
+            dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        except (ValueError, TypeError, AttributeError):
+            return None
+        return dt.hour, dt.weekday()
+    
+    def _metadata_features(self, email_data: Dict[str, Any], sent_time: Optional[Tuple[int, int]], out: np.ndarray):
+        """Write temporal, user and embedding-model features into the 5-slot out row"""
         metadata = email_data.get('metadata', {})
-        created_at = metadata.get('createdAt')
-        if created_at:
-            try:
-                from datetime import datetime
-                dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                hour = dt.hour
-                is_business_hours = 1.0 if 9 <= hour <= 17 else 0.0
-                is_weekend = 1.0 if dt.weekday() >= 5 else 0.0
-                is_urgent_time = 1.0 if hour < 8 or hour > 18 else 0.0
-                features.extend([is_business_hours, is_weekend, is_urgent_time])
-            except:
-                features.extend([0.5, 0.5, 0.0])
+        
+        if sent_time is not None:
+            hour, weekday = sent_time
+            out[0] = 1.0 if 9 <= hour <= 17 else 0.0  # business hours
+            out[1] = 1.0 if weekday >= 5 else 0.0  # weekend
+            out[2] = 1.0 if hour < 8 or hour > 18 else 0.0  # urgent time
         else:
-            features.extend([0.5, 0.5, 0.0])
+            out[0] = 0.5
+            out[1] = 0.5
+            out[2] = 0.0
         
         # User and model consistency
         user_id = metadata.get('userId', '')
-        is_same_user = 1.0 if user_id == self.user_id else 0.0
-        features.append(is_same_user)
+        out[3] = 1.0 if user_id == self.user_id else 0.0
         
         embedding_model = metadata.get('embeddingModel', '')
-        is_consistent_model = 1.0 if 'text-embedding' in embedding_model else 0.0
-        features.append(is_consistent_model)
-        
-        return np.array(features)
-    
-
+        out[4] = 1.0 if 'text-embedding' in embedding_model else 0.0
     
-    def _generate_reasoning(self, email_data: Dict[str, Any], prediction: bool, confidence: float) -> str:
+    def _generate_reasoning(self, email_data: Dict[str, Any], prediction: bool, confidence: float,
+                            sent_time: Optional[Tuple[int, int]] = None) -> str:
         """Generate human-readable reasoning for classification"""
         reasons = []
         metadata = email_data.get('metadata', {})
@@ -493,21 +866,15 @@ class EmailClassifier:
             reasons.append("same user context")
         
         # Check temporal features
-        created_at = metadata.get('createdAt')
-        if created_at:
-            try:
-                from datetime import datetime
-                dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                hour = dt.hour
-                if 9 <= hour <= 17:
-                    reasons.append("sent during business hours")
-                if dt.weekday() < 5:
-                    reasons.append("sent on weekday")
-            except:
-                pass
+        if sent_time is not None:
+            hour, weekday = sent_time
+            if 9 <= hour <= 17:
+                reasons.append("sent during business hours")
+            if weekday < 5:
+                reasons.append("sent on weekday")
         
         # Check if we have good embedding
-        if email_data.get('embedding'):
+        if self._has_embedding(email_data):
             reasons.append("semantic content analysis")
         
         label = "important" if prediction else "not important"
@@ -517,7 +884,7 @@ class EmailClassifier:
 
 # Persistence utility functions
 def load_all_user_models():
-    """Load all saved user models on startup"""
+    """Register saved user models on startup; each is loaded on first use"""
     if not persistence_manager:
         logger.warning("Persistence manager not initialized, skipping model loading")
         return
@@ -528,22 +895,26 @@ def load_all_user_models():
             logger.info("No saved models directory found")
             return
         
-        loaded_count = 0
-        for user_id in os.listdir(models_dir):
-            user_dir = os.path.join(models_dir, user_id)
-            if os.path.isdir(user_dir):
-                try:
-                    classifier = EmailClassifier.load_from_disk(user_id)
-                    user_models[user_id] = classifier
-                    loaded_count += 1
-                    logger.info(f"Loaded model for user {user_id}")
-                except Exception as e:
-                    logger.error(f"Failed to load model for user {user_id}: {e}")
+        for entry in os.scandir(models_dir):
+            if entry.is_dir():
+                saved_user_ids.add(entry.name)
         
-        logger.info(f"Loaded {loaded_count} user models from disk")
+        logger.info(f"Found {len(saved_user_ids)} saved user models on disk")
         
     except Exception as e:
-        logger.error(f"Failed to load user models: {e}")
+        logger.error(f"Failed to list saved user models: {e}")
+
+def get_loaded_classifier(user_id: str) -> Optional[EmailClassifier]:
+    """Get a user's classifier if it is in memory or saved on disk, else None"""
+    if user_id not in user_models and user_id in saved_user_ids:
+        try:
+            user_models[user_id] = EmailClassifier.load_from_disk(user_id)
+            logger.info(f"Loaded model for user {user_id}")
+        except Exception as e:
+            logger.error(f"Failed to load model for user {user_id}: {e}")
+            return None
+    
+    return user_models.get(user_id)
 
 def get_or_create_classifier(user_id: str) -> EmailClassifier:
     """Get existing classifier or create/load new one"""
@@ -555,6 +926,25 @@ def get_or_create_classifier(user_id: str) -> EmailClassifier:
     
     return user_models[user_id]
 
+async def _maybe_save(classifier: EmailClassifier):
+    """Background task: save dirty classifier state at most once per SAVE_DEBOUNCE_SECONDS"""
+    if classifier._save_pending or not classifier.is_dirty():
+        return
+    
+    # Changes made while this save waits are picked up by it
+    classifier._save_pending = True
+    try:
+        wait = classifier._last_saved + SAVE_DEBOUNCE_SECONDS - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        # A /reset while this waited dropped the classifier; saving it would
+        # bring the deleted model back on disk
+        if user_models.get(classifier.user_id) is not classifier:
+            return
+        await run_in_threadpool(classifier.save_dirty)
+    finally:
+        classifier._save_pending = False
+
 # API Endpoints
 
 @app.post("/train", response_model=Dict[str, Any])
@@ -564,22 +954,48 @@ async def train_classifier(request: TrainingRequest, background_tasks: Backgroun
     if not vector_store_client:
         raise HTTPException(status_code=500, detail="Vector store not initialized")
     
+    labeled_examples = request.labeled_examples
+    if not labeled_examples and sqlite_client and sqlite_client.connection:
+        # No examples supplied: train on the labels the user set in the app
+        rows = await run_in_threadpool(sqlite_client.get_labeled_training_rows, request.user_id)
+        labeled_examples = [
+            LabeledExample(email_id=email_id, is_important=importance == 'important')
+            for email_id, importance in rows
+        ]
+    
     classifier = get_or_create_classifier(request.user_id)
     
     if request.retrain:
         classifier.labeled_examples = []
     
-    classifier.add_training_examples(request.labeled_examples)
-    
-    # Fetch email data from Qdrant
-    email_ids = [example.email_id for example in request.labeled_examples]
-    email_data_list = await vector_store_client.get_emails_by_ids(email_ids)
+    # Keep only the labels; supplied vectors are used for this call and not held on to
+    classifier.add_training_examples([
+        LabeledExample(email_id=example.email_id, is_important=example.is_important, confidence=example.confidence)
+        for example in labeled_examples
+    ])
+    background_tasks.add_task(_maybe_save, classifier)
+    
+    # Fetch email data from Qdrant, except for examples that brought their own vector
+    email_ids = [example.email_id for example in labeled_examples]
+    supplied = {
+        example.email_id: {'email_id': example.email_id, 'embedding': example.vector, 'metadata': example.metadata or {}}
+        for example in labeled_examples if example.vector is not None
+    }
+    if supplied:
+        fetched = await email_cache.get([email_id for email_id in email_ids if email_id not in supplied])
+        email_by_id = {**{email['email_id']: email for email in fetched}, **supplied}
+        email_data_list = [email_by_id[email_id] for email_id in dict.fromkeys(email_ids) if email_id in email_by_id]
+    else:
+        email_data_list = await email_cache.get(email_ids)
     
     if not email_data_list:
         raise HTTPException(status_code=404, detail="No email data found for provided IDs")
     
-    # Train the model
-    training_success = await classifier.train(email_data_list)
+    # Train the model. Without retrain the request holds only the new labels,
+    # and supplied vectors are the client's rather than the store's, so in
+    # either case the label matrices built from it can't serve /classify.
+    cache_labels = request.retrain and not supplied
+    training_success = await run_in_threadpool(classifier.train, email_data_list, cache_labels)
     
     if not training_success:
         raise HTTPException(status_code=400, detail="Training failed - insufficient data or error")
@@ -587,7 +1003,7 @@ async def train_classifier(request: TrainingRequest, background_tasks: Backgroun
     return {
         "status": "training_completed",
         "user_id": request.user_id,
-        "examples_count": len(request.labeled_examples),
+        "examples_count": len(labeled_examples),
         "model_version": classifier.model_version,
         "emails_found": len(email_data_list)
     }
@@ -602,19 +1018,22 @@ async def classify_emails(request: ClassificationRequest):
     results = []
     
     # Use AI for all emails if user has a trained model
-    if request.user_id in user_models:
-        classifier = user_models[request.user_id]
+    classifier = get_loaded_classifier(request.user_id)
+    if classifier is not None:
         
         # Fetch emails to classify from vector store
-        email_data_list = await vector_store_client.get_emails_by_ids(request.email_ids)
+        email_data_list = await email_cache.get(request.email_ids)
         
         if email_data_list:
-            # Get labeled email data for feature extraction
-            labeled_email_ids = [ex.email_id for ex in classifier.labeled_examples]
-            labeled_email_data = await vector_store_client.get_emails_by_ids(labeled_email_ids)
+            # Labeled email data is only needed when the classifier's label
+            # matrices are stale; otherwise classify reuses the cached ones
+            labeled_email_data = None
+            if not classifier._label_cache_is_current():
+                labeled_email_ids = [ex.email_id for ex in classifier.labeled_examples]
+                labeled_email_data = await email_cache.get(labeled_email_ids)
             
-            # Classify emails
-            ai_results = await classifier.classify(email_data_list, labeled_email_data)
+            # Classify emails off the event loop; NumPy/sklearn release the GIL
+            ai_results = await run_in_threadpool(classifier.classify, email_data_list, labeled_email_data)
             results.extend(ai_results)
     
     # For emails that couldn't be classified (no model or no data), return default
@@ -630,8 +1049,8 @@ async def classify_emails(request: ClassificationRequest):
     
     # Determine model version
     model_version = "no_model"
-    if request.user_id in user_models:
-        model_version = user_models[request.user_id].model_version
+    if classifier is not None:
+        model_version = classifier.model_version
     
     return ClassificationResponse(
         user_id=request.user_id,
@@ -641,14 +1060,13 @@ async def classify_emails(request: ClassificationRequest):
     )
 
 @app.post("/feedback")
-async def submit_feedback(request: FeedbackRequest):
+async def submit_feedback(request: FeedbackRequest, background_tasks: BackgroundTasks):
     """Submit feedback on classification results for model improvement"""
     
-    if request.user_id not in user_models:
+    classifier = get_loaded_classifier(request.user_id)
+    if classifier is None:
         raise HTTPException(status_code=404, detail="User model not found")
     
-    classifier = user_models[request.user_id]
-    
     # Add as new training example if prediction was wrong
     if request.actual_label != request.predicted_label:
         new_example = LabeledExample(
@@ -657,19 +1075,21 @@ async def submit_feedback(request: FeedbackRequest):
             confidence=1.0  # User feedback is high confidence
         )
         classifier.add_training_examples([new_example])
+        email_cache.invalidate([request.email_id])
+        background_tasks.add_task(_maybe_save, classifier)
         
         # Retrain if we have enough examples
         if len(classifier.labeled_examples) >= 10:
             # Fetch updated email data and retrain
             email_ids = [ex.email_id for ex in classifier.labeled_examples]
-            email_data_list = await vector_store_client.get_emails_by_ids(email_ids)
+            email_data_list = await email_cache.get(email_ids)
             if email_data_list:
-                await classifier.train(email_data_list)
+                await run_in_threadpool(classifier.train, email_data_list)
     
     return {"status": "feedback_recorded", "user_id": request.user_id}
 
 @app.post("/label")
-async def label_emails(request: LabelRequest):
+async def label_emails(request: LabelRequest, background_tasks: BackgroundTasks):
     """Directly label emails as important/not important"""
     
     if not vector_store_client:
@@ -688,13 +1108,14 @@ async def label_emails(request: LabelRequest):
     
     # Add to training examples
     classifier.add_training_examples(labeled_examples)
+    background_tasks.add_task(_maybe_save, classifier)
     
     # If we have enough examples, retrain the model
     if len(classifier.labeled_examples) >= 10:
         email_ids = [ex.email_id for ex in classifier.labeled_examples]
-        email_data_list = await vector_store_client.get_emails_by_ids(email_ids)
+        email_data_list = await email_cache.get(email_ids)
         if email_data_list:
-            training_success = await classifier.train(email_data_list)
+            training_success = await run_in_threadpool(classifier.train, email_data_list)
             if training_success:
                 return {
                     "status": "labeled_and_retrained",
@@ -712,7 +1133,7 @@ async def label_emails(request: LabelRequest):
     }
 
 @app.post("/bulk-label")
-async def bulk_label_emails(request: BulkLabelRequest):
+async def bulk_label_emails(request: BulkLabelRequest, background_tasks: BackgroundTasks):
     """Bulk label emails - separate lists for important and unimportant"""
     
     if not vector_store_client:
@@ -720,35 +1141,28 @@ async def bulk_label_emails(request: BulkLabelRequest):
     
     classifier = get_or_create_classifier(request.user_id)
     
-    # Convert to training examples
-    labeled_examples = []
-    
-    # Add important emails
-    for email_id in request.important_email_ids:
-        labeled_examples.append(LabeledExample(
-            email_id=email_id,
-            is_important=True,
-            confidence=1.0
-        ))
-    
-    # Add unimportant emails
-    for email_id in request.unimportant_email_ids:
-        labeled_examples.append(LabeledExample(
-            email_id=email_id,
-            is_important=False,
-            confidence=1.0
-        ))
+    # Convert to training examples. The ID lists were validated with the
+    # request, so construct the examples without validating them again.
+    labeled_examples = [
+        LabeledExample.model_construct(email_id=email_id, is_important=True, confidence=1.0)
+        for email_id in request.important_email_ids
+    ]
+    labeled_examples.extend(
+        LabeledExample.model_construct(email_id=email_id, is_important=False, confidence=1.0)
+        for email_id in request.unimportant_email_ids
+    )
     
     # Add to training examples
     classifier.add_training_examples(labeled_examples)
+    background_tasks.add_task(_maybe_save, classifier)
     
     # Train if we have enough examples
     total_examples = len(classifier.labeled_examples)
     if total_examples >= 10:
         email_ids = [ex.email_id for ex in classifier.labeled_examples]
-        email_data_list = await vector_store_client.get_emails_by_ids(email_ids)
+        email_data_list = await email_cache.get(email_ids)
         if email_data_list:
-            training_success = await classifier.train(email_data_list)
+            training_success = await run_in_threadpool(classifier.train, email_data_list)
             if training_success:
                 return {
                     "status": "bulk_labeled_and_trained",
@@ -771,11 +1185,10 @@ async def bulk_label_emails(request: BulkLabelRequest):
 async def get_model_stats(user_id: str):
     """Get model statistics for a user"""
     
-    if user_id not in user_models:
+    classifier = get_loaded_classifier(user_id)
+    if classifier is None:
         raise HTTPException(status_code=404, detail="User model not found")
     
-    classifier = user_models[user_id]
-    
     return ModelStats(
         user_id=user_id,
         total_examples=len(classifier.labeled_examples),
@@ -784,7 +1197,37 @@ async def get_model_stats(user_id: str):
         model_version=classifier.model_version
     )
 
-@app.get("/health")
+def _load_classifiers(user_ids: List[str]) -> Dict[str, EmailClassifier]:
+    """Load saved classifiers from disk (blocking); the caller registers them in user_models"""
+    loaded = {}
+    for user_id in user_ids:
+        try:
+            loaded[user_id] = EmailClassifier.load_from_disk(user_id)
+        except Exception as e:
+            logger.error(f"Failed to load model for user {user_id}: {e}")
+    return loaded
+
+@app.post("/stats/bulk")
+async def get_bulk_model_stats(request: BulkStatsRequest) -> Dict[str, int]:
+    """Get training example counts for many users in one call"""
+    # Disk loads run off the event loop, but user_models is only touched here
+    # on the loop, like every other endpoint
+    to_load = [user_id for user_id in dict.fromkeys(request.user_ids)
+               if user_id not in user_models and user_id in saved_user_ids]
+    if to_load:
+        loaded = await run_in_threadpool(_load_classifiers, to_load)
+        for user_id, classifier in loaded.items():
+            # Keep a classifier another request loaded meanwhile; skip users reset meanwhile
+            if user_id in saved_user_ids:
+                user_models.setdefault(user_id, classifier)
+    
+    counts = {}
+    for user_id in request.user_ids:
+        classifier = user_models.get(user_id)
+        counts[user_id] = len(classifier.labeled_examples) if classifier is not None else 0
+    return counts
+
+@app.api_route("/health", methods=["GET", "HEAD"])
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.now()}
@@ -797,13 +1240,13 @@ async def reset_user_model(user_id: str):
         # Clear the user's model and training examples
         del user_models[user_id]
         logger.info(f"Reset model for user {user_id}")
+    saved_user_ids.discard(user_id)
     
     # Also remove from disk
     if persistence_manager:
         try:
             user_dir = os.path.join(persistence_manager.data_dir, "models", user_id)
             if os.path.exists(user_dir):
-                import shutil
                 shutil.rmtree(user_dir)
                 logger.info(f"Removed saved model files for user {user_id}")
         except Exception as e:
@@ -815,35 +1258,53 @@ async def reset_user_model(user_id: str):
         "message": "Model training data cleared successfully"
     }
 
+def _walk_saved_models(models_dir: str) -> List[Dict[str, Any]]:
+    """Collect saved model metadata for every user directory (blocking filesystem walk)"""
+    users_with_saved_models = []
+    
+    if os.path.isdir(models_dir):
+        # scandir reuses the directory entry's type instead of a stat per isdir()
+        with os.scandir(models_dir) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                user_id = entry.name
+                try:
+                    with open(os.path.join(entry.path, "metadata.json"), 'rb') as f:
+                        metadata = orjson.loads(f.read())
+                    users_with_saved_models.append({
+                        "user_id": user_id,
+                        "examples_count": metadata.get("examples_count", 0),
+                        "model_version": metadata.get("model_version", "unknown"),
+                        "last_trained": metadata.get("last_trained"),
+                        "has_trained_model": os.path.exists(os.path.join(entry.path, "model.pkl"))
+                    })
+                except FileNotFoundError:
+                    continue
+                except Exception as e:
+                    logger.error(f"Failed to read metadata for user {user_id}: {e}")
+    
+    return users_with_saved_models
+
+# (timestamp, result) of the last saved-model walk, reused for polling dashboards
+_saved_models_cache: Optional[Tuple[float, List[Dict[str, Any]]]] = None
+
 @app.get("/persistence/status")
 async def get_persistence_status():
     """Get persistence status and statistics"""
+    global _saved_models_cache
     
     if not persistence_manager:
         return {"status": "disabled", "message": "Persistence manager not initialized"}
     
     try:
-        models_dir = os.path.join(persistence_manager.data_dir, "models")
-        users_with_saved_models = []
-        
-        if os.path.exists(models_dir):
-            for user_id in os.listdir(models_dir):
-                user_dir = os.path.join(models_dir, user_id)
-                if os.path.isdir(user_dir):
-                    metadata_file = os.path.join(user_dir, "metadata.json")
-                    if os.path.exists(metadata_file):
-                        try:
-                            with open(metadata_file, 'r') as f:
-                                metadata = json.load(f)
-                            users_with_saved_models.append({
-                                "user_id": user_id,
-                                "examples_count": metadata.get("examples_count", 0),
-                                "model_version": metadata.get("model_version", "unknown"),
-                                "last_trained": metadata.get("last_trained"),
-                                "has_trained_model": os.path.exists(os.path.join(user_dir, "model.pkl"))
-                            })
-                        except Exception as e:
-                            logger.error(f"Failed to read metadata for user {user_id}: {e}")
+        now = time.monotonic()
+        if _saved_models_cache and now - _saved_models_cache[0] < PERSISTENCE_STATUS_TTL:
+            users_with_saved_models = _saved_models_cache[1]
+        else:
+            models_dir = os.path.join(persistence_manager.data_dir, "models")
+            users_with_saved_models = await run_in_threadpool(_walk_saved_models, models_dir)
+            _saved_models_cache = (now, users_with_saved_models)
         
         return {
             "status": "enabled",
@@ -890,6 +1351,13 @@ async def startup_event():
     initialize_clients()
     logger.info("Email Classification Service started successfully")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush unsaved classifier state before exiting"""
+    for classifier in list(user_models.values()):
+        if classifier.is_dirty():
+            await run_in_threadpool(classifier.save_dirty)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -6,16 +6,104 @@ Assumes emails are already embedded and stored in Qdrant by your existing pipeli
 """
 
 import asyncio
+import hashlib
 import httpx
 import logging
-from typing import Dict, List, Set, Optional
+import numpy as np
+from typing import Any, AsyncIterator, Dict, Iterator, List, Set, Optional, Tuple
 from datetime import datetime
 import json
 import os
 
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Points fetched per Qdrant scroll request
+SCROLL_PAGE_SIZE = 1024
+
+# Only this payload field is needed from the per-user scroll
+SCROLL_PAYLOAD_FIELDS = ['emailId']
+
+# Scroll pages queued ahead (fetched on a worker thread) while the current one is handed out
+SCROLL_LOOKAHEAD_PAGES = 1
+
+# Labeled examples a user needs before their model is used
+MIN_TRAINING_EXAMPLES = 2
+
+# Users classified concurrently within one cycle
+USER_CONCURRENCY = 8
+
+# Classification POSTs kept in flight per user
+BATCH_PIPELINE_DEPTH = 4
+
+# Rows written per SQLite commit during a cycle
+CYCLE_COMMIT_ROWS = 1000
+
+# Backoff when the API signals overload (429/503)
+MAX_BACKOFF_RETRIES = 5
+MAX_BACKOFF_SECONDS = 30.0
+
+# Hashes buffered in a small set before being merged into the sorted array
+HASHED_ID_MERGE_THRESHOLD = 65536
+
+class HashedIdSet:
+    """
+    Compact set of string IDs stored as 64-bit hashes.
+    
+    Hashes live in a sorted uint64 array (8 bytes per ID versus ~100 for a
+    str in a set) plus a small pending set merged in bulk. A 64-bit hash
+    collision would report an unseen ID as present; at 10M IDs the odds of
+    any collision are around one in a million.
+    """
+    
+    def __init__(self):
+        self._sorted = np.empty(0, dtype=np.uint64)
+        self._pending: Set[int] = set()
+    
+    @staticmethod
+    def _hash(item: str) -> int:
+        return int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "little")
+    
+    def add(self, item: str):
+        """Add one ID"""
+        self._pending.add(self._hash(item))
+        if len(self._pending) >= HASHED_ID_MERGE_THRESHOLD:
+            self._merge()
+    
+    def update(self, items: List[str]):
+        """Add several IDs"""
+        for item in items:
+            self.add(item)
+    
+    def _merge(self):
+        """Fold pending hashes into the sorted array by insertion (one linear copy, no re-sort)"""
+        pending = np.fromiter(self._pending, dtype=np.uint64, count=len(self._pending))
+        pending.sort()
+        positions = np.searchsorted(self._sorted, pending)
+        # Drop hashes the array already holds
+        present = positions < len(self._sorted)
+        present[present] = self._sorted[positions[present]] == pending[present]
+        self._sorted = np.insert(self._sorted, positions[~present], pending[~present])
+        self._pending.clear()
+    
+    def __contains__(self, item: str) -> bool:
+        h = self._hash(item)
+        if h in self._pending:
+            return True
+        i = np.searchsorted(self._sorted, np.uint64(h))
+        return i < len(self._sorted) and int(self._sorted[i]) == h
+    
+    def __len__(self) -> int:
+        if self._pending:
+            self._merge()
+        return len(self._sorted)
+
 class IncrementalEmailClassifier:
     """Incrementally classify unclassified emails from Qdrant"""
     
@@ -24,21 +112,38 @@ class IncrementalEmailClassifier:
         api_base_url: str = "http://localhost:8000",
         qdrant_host: str = "localhost", 
         qdrant_port: int = 6333,
+        qdrant_grpc_port: int = 6334,
         collection_name: str = "email_embeddings",
         sqlite_db_path: str = "./data/email_filter.db",
         batch_size: int = 10,
-        check_interval: int = 60  # seconds
+        check_interval: int = 60,  # seconds
+        state_dir: Optional[str] = None
     ):
         self.api_base_url = api_base_url
         self.qdrant_host = qdrant_host
         self.qdrant_port = qdrant_port
+        self.qdrant_grpc_port = qdrant_grpc_port
         self.collection_name = collection_name
         self.sqlite_db_path = sqlite_db_path
         self.batch_size = batch_size
         self.check_interval = check_interval
+        self.state_dir = state_dir
         
         # Track what we've processed
-        self.processed_emails: Set[str] = set()
+        self.processed_emails = HashedIdSet()
+        
+        # Last Qdrant point scrolled per user; new points are read from here on
+        self.scroll_cursors: Dict[str, Any] = {}
+        self.persistence_manager = None
+        
+        # Bounds how many users are classified at once
+        self.user_concurrency = asyncio.Semaphore(USER_CONCURRENCY)
+        
+        # Importance updates queued for the single SQLite writer (set during a cycle)
+        self._write_queue: Optional[asyncio.Queue] = None
+        
+        # Users with a trained model, from the bulk stats call (set during a cycle)
+        self._trained_users: Optional[Set[str]] = None
         
         # Clients
         self.qdrant_client = None
@@ -49,24 +154,43 @@ class IncrementalEmailClassifier:
         """Initialize clients"""
         try:
             from vector_store_client import QdrantClient
-            from sqlite_client import SQLiteEmailClient
+            from sqlite_client import AsyncSQLiteEmailClient
             
             # Qdrant client
+            # gRPC skips JSON encoding/parsing on the scroll-heavy path
             self.qdrant_client = QdrantClient(
                 host=self.qdrant_host,
                 port=self.qdrant_port, 
-                collection_name=self.collection_name
+                collection_name=self.collection_name,
+                grpc_port=self.qdrant_grpc_port,
+                prefer_grpc=True
             )
+            self.initialize_collection()
+            
+            # Resume scroll cursors from the previous run
+            if self.state_dir:
+                from persistence_manager import PersistenceManager
+                self.persistence_manager = PersistenceManager(self.state_dir)
+                state = self.persistence_manager.load_classifier_state()
+                self.scroll_cursors = state.get('last_scroll_cursor', {})
             
             # SQLite client (for updating importance)
             if os.path.exists(self.sqlite_db_path):
-                self.sqlite_client = SQLiteEmailClient(self.sqlite_db_path)
-                if not self.sqlite_client.connect():
+                # Queries run on the client's own worker thread, off the event loop
+                self.sqlite_client = AsyncSQLiteEmailClient(self.sqlite_db_path)
+                if not await self.sqlite_client.connect():
                     logger.warning("Could not connect to SQLite - will skip database updates")
+                    await self.sqlite_client.disconnect()
                     self.sqlite_client = None
             
             # HTTP client for classification API
-            self.http_client = httpx.AsyncClient(timeout=60.0)
+            # HTTP/2 multiplexes the concurrent POSTs over one connection when h2 is
+            # installed; the connection cap throttles them instead of fixed sleeps
+            self.http_client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(60.0, connect=5.0),
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+            )
             
             logger.info("Incremental classifier initialized")
             return True
@@ -75,70 +199,170 @@ class IncrementalEmailClassifier:
             logger.error(f"Failed to initialize: {e}")
             return False
     
-    async def get_unclassified_emails(self) -> Dict[str, List[str]]:
-        """Get unclassified emails from Qdrant, grouped by user"""
+    def initialize_collection(self):
+        """Tune the Qdrant collection: INT8 quantization, on-disk vectors and payload indexes"""
+        try:
+            from qdrant_client import models
+        except ImportError:
+            logger.warning("qdrant-client models unavailable, skipping collection tuning")
+            return
+        
+        client = self.qdrant_client.client
         try:
-            # Get all emails from Qdrant
-            scroll_result = self.qdrant_client.client.scroll(
+            # Full-precision vectors go to disk; the INT8 copy stays in RAM (~4x smaller)
+            client.update_collection(
                 collection_name=self.collection_name,
-                limit=10000,  # Adjust based on your email volume
-                with_payload=True,
+                vectors_config={"": models.VectorParamsDiff(on_disk=True)},
+                quantization_config=models.ScalarQuantization(
+                    scalar=models.ScalarQuantizationConfig(
+                        type=models.ScalarType.INT8,
+                        always_ram=True
+                    )
+                )
+            )
+        except Exception as e:
+            logger.warning(f"Could not update collection {self.collection_name}: {e}")
+        
+        # Keyword indexes let emailId/userId filters skip full-collection scans
+        for field_name in ('emailId', 'userId'):
+            try:
+                client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=models.PayloadSchemaType.KEYWORD
+                )
+            except Exception as e:
+                logger.warning(f"Could not create payload index on {field_name}: {e}")
+    
+    def scroll_ids(self, user_id: Optional[str] = None, offset: Any = None) -> Iterator[Tuple[List[str], Any]]:
+        """
+        Page through email IDs in the collection (optionally one user's), projecting only emailId.
+        
+        Yields (email_ids, last_point_id) per page, starting at point offset if given.
+        """
+        from qdrant_client import models
+        
+        # Filtered on the userId keyword index, so Qdrant reads only this user's points
+        scroll_filter = None
+        if user_id is not None:
+            scroll_filter = models.Filter(must=[
+                models.FieldCondition(key='userId', match=models.MatchValue(value=user_id))
+            ])
+        with_payload = models.PayloadSelectorInclude(include=SCROLL_PAYLOAD_FIELDS)
+        
+        while True:
+            points, offset = self.qdrant_client.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=SCROLL_PAGE_SIZE,
+                offset=offset,
+                with_payload=with_payload,
                 with_vectors=False
             )
             
-            points, _ = scroll_result
-            unclassified_by_user = {}
+            page = [point.payload.get('emailId') for point in points]
+            last_point_id = points[-1].id if points else None
+            yield [email_id for email_id in page if email_id], last_point_id
             
-            for point in points:
-                email_id = point.payload.get('emailId')
-                user_id = point.payload.get('userId')
-                
-                if not email_id or not user_id:
-                    continue
-                
-                # Skip if already processed
-                if email_id in self.processed_emails:
-                    continue
-                
-                # Check if email is classified in SQLite
-                if await self.is_email_classified(email_id):
-                    self.processed_emails.add(email_id)
-                    continue
-                
-                # Add to unclassified list
-                if user_id not in unclassified_by_user:
-                    unclassified_by_user[user_id] = []
-                
-                unclassified_by_user[user_id].append(email_id)
-            
-            # Log summary
-            total_unclassified = sum(len(emails) for emails in unclassified_by_user.values())
-            logger.info(f"Found {total_unclassified} unclassified emails across {len(unclassified_by_user)} users")
-            
-            return unclassified_by_user
-            
-        except Exception as e:
-            logger.error(f"Error getting unclassified emails: {e}")
-            return {}
+            if offset is None:
+                break
     
-    async def is_email_classified(self, email_id: str) -> bool:
-        """Check if email is already classified in SQLite"""
-        if not self.sqlite_client:
-            return False
+    async def _prefetch_pages(self, pages: Iterator[Tuple[List[str], Any]]) -> AsyncIterator[Tuple[List[str], Any]]:
+        """Drive a blocking page iterator on a worker thread, fetching the next pages while the current one is used"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=SCROLL_LOOKAHEAD_PAGES)
+        done = object()
         
+        async def produce():
+            try:
+                while True:
+                    page = await loop.run_in_executor(None, next, pages, done)
+                    await queue.put(page)
+                    if page is done:
+                        return
+            except Exception as e:
+                await queue.put(e)
+        
+        producer = asyncio.create_task(produce())
         try:
-            cursor = self.sqlite_client.connection.cursor()
-            cursor.execute("""
-                SELECT importance FROM emails 
-                WHERE id = ? AND importance IS NOT NULL AND importance != 'unclassified'
-            """, (email_id,))
+            while True:
+                page = await queue.get()
+                if page is done:
+                    break
+                if isinstance(page, Exception):
+                    raise page
+                yield page
+        finally:
+            producer.cancel()
+    
+    async def get_unclassified_emails(self) -> AsyncIterator[Tuple[str, List[str]]]:
+        """Stream unclassified emails from Qdrant user by user, yielding (user_id, email_ids) per page"""
+        total_unclassified = 0
+        users = set()
+        
+        try:
+            if not self.sqlite_client:
+                logger.warning("No SQLite database - nothing to classify into")
+                return
+            
+            # Only users with an unclassified backlog are scrolled at all
+            candidates = await self.sqlite_client.get_unclassified_user_ids()
             
-            result = cursor.fetchone()
-            return result is not None
+            # ...and of those, only users with a trained model
+            self._trained_users = await self.get_trained_users(candidates)
+            if self._trained_users is not None:
+                skipped = [user_id for user_id in candidates if user_id not in self._trained_users]
+                if skipped:
+                    logger.info(f"Skipping {len(skipped)} users with no trained model")
+                candidates = [user_id for user_id in candidates if user_id in self._trained_users]
+            
+            for user_id in candidates:
+                # This user's classified IDs, one streamed query, so only one
+                # mailbox's IDs are held at a time rather than the whole database's
+                classified_ids = await self.sqlite_client.get_user_classified_ids(user_id)
+                
+                # Read only points past the saved cursor; if that finds nothing while SQLite
+                # still reports a backlog, wrap around and rescan this user from the start
+                cursor = self.scroll_cursors.get(user_id)
+                starts = [cursor, None] if cursor is not None else [None]
+                
+                for start in starts:
+                    found = False
+                    
+                    async for page, last_point_id in self._prefetch_pages(self.scroll_ids(user_id, start)):
+                        if last_point_id is not None:
+                            self.scroll_cursors[user_id] = last_point_id
+                        
+                        email_ids = []
+                        
+                        for email_id in page:
+                            # Skip if already processed (including failed batches, so they
+                            # aren't retried every cycle)
+                            if email_id in self.processed_emails:
+                                continue
+                            
+                            # Check if email is classified in SQLite
+                            if email_id in classified_ids:
+                                self.processed_emails.add(email_id)
+                                continue
+                            
+                            email_ids.append(email_id)
+                        
+                        # Hand this page over before fetching the next one
+                        if email_ids:
+                            found = True
+                            total_unclassified += len(email_ids)
+                            users.add(user_id)
+                            yield user_id, email_ids
+                    
+                    if found:
+                        break
             
         except Exception as e:
-            logger.error(f"Error checking if email {email_id} is classified: {e}")
-            return False
+            logger.error(f"Error getting unclassified emails: {e}")
+        
+        # Log summary
+        logger.info(f"Found {total_unclassified} unclassified emails across {len(users)} users")
     
     async def user_has_trained_model(self, user_id: str) -> bool:
         """Check if user has a trained classification model"""
@@ -146,23 +370,55 @@ class IncrementalEmailClassifier:
             response = await self.http_client.get(f"{self.api_base_url}/stats/{user_id}")
             if response.status_code == 200:
                 stats = response.json()
-                return stats.get('total_examples', 0) >= 2
+                return stats.get('total_examples', 0) >= MIN_TRAINING_EXAMPLES
             return False
         except Exception as e:
             logger.error(f"Error checking model for user {user_id}: {e}")
             return False
     
-    async def classify_email_batch(self, user_id: str, email_ids: List[str]) -> Optional[List[Dict]]:
-        """Classify a batch of emails"""
+    async def get_trained_users(self, user_ids: List[str]) -> Optional[Set[str]]:
+        """Users with a trained model via one bulk stats call, or None if the API doesn't support it"""
+        if not user_ids:
+            return set()
+        
         try:
             response = await self.http_client.post(
-                f"{self.api_base_url}/classify",
-                json={
-                    "user_id": user_id,
-                    "email_ids": email_ids,
-                    "return_confidence": True
-                }
+                f"{self.api_base_url}/stats/bulk",
+                json={"user_ids": user_ids}
             )
+            if response.status_code == 200:
+                counts = response.json()
+                return {user_id for user_id, count in counts.items() if count >= MIN_TRAINING_EXAMPLES}
+            
+            logger.warning(f"Bulk stats unavailable ({response.status_code}), checking users individually")
+            return None
+            
+        except Exception as e:
+            logger.error(f"Error fetching bulk stats: {e}")
+            return None
+    
+    async def classify_email_batch(self, user_id: str, email_ids: List[str]) -> Optional[List[Dict]]:
+        """Classify a batch of emails"""
+        try:
+            delay = 1.0
+            for attempt in range(MAX_BACKOFF_RETRIES + 1):
+                response = await self.http_client.post(
+                    f"{self.api_base_url}/classify",
+                    json={
+                        "user_id": user_id,
+                        "email_ids": email_ids,
+                        "return_confidence": True
+                    }
+                )
+                
+                # Only pause when the API actually signals pressure
+                if response.status_code not in (429, 503) or attempt == MAX_BACKOFF_RETRIES:
+                    break
+                
+                wait = self._retry_after(response, delay)
+                logger.warning(f"API busy ({response.status_code}) for user {user_id}, retrying in {wait:.1f}s")
+                await asyncio.sleep(wait)
+                delay = min(MAX_BACKOFF_SECONDS, delay * 2)
             
             if response.status_code == 200:
                 result = response.json()
@@ -175,89 +431,201 @@ class IncrementalEmailClassifier:
             logger.error(f"Error classifying batch for user {user_id}: {e}")
             return None
     
-    async def update_email_importance(self, email_id: str, is_important: bool, confidence: float):
-        """Update email importance in SQLite"""
-        if not self.sqlite_client:
+    def update_email_importance_batch(self, rows: List[Tuple[str, float, str]], commit: bool = True):
+        """
+        Update importance for a batch of (importance, confidence, email_id) rows.
+        
+        With commit=False the rows join the caller's open transaction under a
+        savepoint, so a failed batch is undone without losing earlier ones.
+        """
+        if not self.sqlite_client or not rows:
             return
         
+        connection = self.sqlite_client.connection
+        # Use correct column name and set user_labeled to 0 (AI-labeled)
+        update_sql = """
+            UPDATE emails 
+            SET importance = ?, importance_confidence = ?, user_labeled = 0
+            WHERE id = ?
+        """
+        
         try:
-            cursor = self.sqlite_client.connection.cursor()
-            importance = "important" if is_important else "not_important"
-            
-            # Use correct column name and set user_labeled to 0 (AI-labeled)
-            cursor.execute("""
-                UPDATE emails 
-                SET importance = ?, importance_confidence = ?, user_labeled = 0
-                WHERE id = ?
-            """, (importance, confidence, email_id))
-            
-            self.sqlite_client.connection.commit()
+            if commit:
+                # One transaction (and one commit) for the whole batch
+                with self.sqlite_client.client.transaction():
+                    connection.executemany(update_sql, rows)
+            else:
+                connection.execute("SAVEPOINT importance_batch")
+                try:
+                    connection.executemany(update_sql, rows)
+                except Exception:
+                    connection.execute("ROLLBACK TO importance_batch")
+                    raise
+                finally:
+                    connection.execute("RELEASE importance_batch")
             
-            logger.info(f"✅ Updated {email_id}: {importance} ({confidence:.3f}) [AI-labeled]")
+            logger.info(f"✅ Updated {len(rows)} emails [AI-labeled]")
             
         except Exception as e:
-            logger.error(f"❌ Error updating email {email_id}: {e}")
+            logger.error(f"❌ Error updating {len(rows)} emails: {e}")
+    
+    @staticmethod
+    def _retry_after(response: httpx.Response, default: float) -> float:
+        """Seconds to wait from a Retry-After header, or the default backoff"""
+        try:
+            return min(MAX_BACKOFF_SECONDS, float(response.headers.get('Retry-After', default)))
+        except ValueError:
+            # HTTP-date form; fall back to our own backoff
+            return default
+    
+    async def _classify_pipelined(self, user_id: str, batch: List[str], batch_number: int,
+                                  total_batches: int, inflight: asyncio.Semaphore):
+        """Classify one batch once a pipeline slot for this user is free"""
+        async with inflight:
+            logger.info(f"Processing batch {batch_number}/{total_batches} for user {user_id}")
+            results = await self.classify_email_batch(user_id, batch)
+            return batch, results
+    
+    async def _queue_importance_updates(self, rows: List[Tuple[str, float, str]]):
+        """Hand importance updates to the cycle's SQLite writer, or write directly outside a cycle"""
+        if self._write_queue is not None:
+            await self._write_queue.put(rows)
+        elif self.sqlite_client:
+            await self.sqlite_client.run(self.update_email_importance_batch, rows)
+    
+    def _begin_cycle_transaction(self):
+        """Open the cycle's SQLite transaction if one isn't already open"""
+        connection = self.sqlite_client.connection
+        if not connection.in_transaction:
+            connection.execute("BEGIN")
+    
+    def _commit_cycle_transaction(self, reopen: bool = False):
+        """Commit the cycle's SQLite transaction (rolling back on failure), optionally opening the next"""
+        connection = self.sqlite_client.connection
+        if connection.in_transaction:
+            try:
+                connection.commit()
+            except Exception as e:
+                logger.error(f"❌ Error committing classification cycle: {e}")
+                connection.rollback()
+            self.sqlite_client.invalidate_stats()
+        if reopen:
+            connection.execute("BEGIN")
+    
+    async def _sqlite_writer(self):
+        """Drain queued importance updates; the only task writing to SQLite during a cycle"""
+        db = self.sqlite_client
+        pending_rows = 0
+        
+        # Blocking executemany/fsync work runs on the client's worker thread, off the event loop
+        try:
+            # One transaction per cycle (or per CYCLE_COMMIT_ROWS rows) instead of a commit per batch
+            if db:
+                await db.run(self._begin_cycle_transaction)
+            
+            while True:
+                rows = await self._write_queue.get()
+                if rows is None:
+                    break
+                if not db:
+                    continue
+                await db.run(self.update_email_importance_batch, rows, False)
+                
+                pending_rows += len(rows)
+                if pending_rows >= CYCLE_COMMIT_ROWS:
+                    await db.run(self._commit_cycle_transaction, True)
+                    pending_rows = 0
+        finally:
+            if db:
+                await db.run(self._commit_cycle_transaction)
     
     async def process_user_emails(self, user_id: str, email_ids: List[str]):
         """Process all emails for a specific user"""
-        
-        # Check if user has a trained model
-        if not await self.user_has_trained_model(user_id):
-            logger.info(f"User {user_id} has no trained model, skipping {len(email_ids)} emails")
-            self.processed_emails.update(email_ids)
-            return
-        
-        logger.info(f"Classifying {len(email_ids)} emails for user {user_id}")
-        
-        # Process in batches
-        for i in range(0, len(email_ids), self.batch_size):
-            batch = email_ids[i:i + self.batch_size]
+        async with self.user_concurrency:
+            # Check if user has a trained model (cached for the cycle when bulk stats worked)
+            if self._trained_users is not None:
+                has_model = user_id in self._trained_users
+            else:
+                has_model = await self.user_has_trained_model(user_id)
             
-            logger.info(f"Processing batch {i//self.batch_size + 1}/{(len(email_ids)-1)//self.batch_size + 1} for user {user_id}")
+            if not has_model:
+                logger.info(f"User {user_id} has no trained model, skipping {len(email_ids)} emails")
+                self.processed_emails.update(email_ids)
+                return
             
-            # Classify batch
-            results = await self.classify_email_batch(user_id, batch)
+            logger.info(f"Classifying {len(email_ids)} emails for user {user_id}")
+            
+            # Process in batches, keeping the next POSTs in flight while results are stored
+            batches = [email_ids[i:i + self.batch_size] for i in range(0, len(email_ids), self.batch_size)]
+            inflight = asyncio.Semaphore(BATCH_PIPELINE_DEPTH)
+            pending = [
+                self._classify_pipelined(user_id, batch, n, len(batches), inflight)
+                for n, batch in enumerate(batches, 1)
+            ]
             
-            if results:
-                # Update database with results
-                for result in results:
-                    email_id = result['email_id']
-                    is_important = result['is_important']
-                    confidence = result['confidence']
+            for completed in asyncio.as_completed(pending):
+                batch, results = await completed
+                
+                if results:
+                    # Collect updates and write them to SQLite in one batch
+                    rows = []
+                    for result in results:
+                        email_id = result['email_id']
+                        is_important = result['is_important']
+                        confidence = result['confidence']
+                        
+                        importance = "important" if is_important else "not_important"
+                        rows.append((importance, confidence, email_id))
+                        
+                        # Log result
+                        status = "🔴 IMPORTANT" if is_important else "⚪ NOT IMPORTANT"
+                        logger.info(f"  {email_id}: {status} ({confidence:.3f})")
                     
-                    # Update SQLite
-                    await self.update_email_importance(email_id, is_important, confidence)
+                    await self._queue_importance_updates(rows)
                     
-                    # Log result
-                    status = "🔴 IMPORTANT" if is_important else "⚪ NOT IMPORTANT"
-                    logger.info(f"  {email_id}: {status} ({confidence:.3f})")
-                
-                # Mark as processed
-                self.processed_emails.update(batch)
-                
-            else:
-                logger.error(f"Failed to classify batch for user {user_id}")
-                # Still mark as processed to avoid infinite retries
-                self.processed_emails.update(batch)
-            
-            # Small delay between batches to avoid overwhelming the API
-            await asyncio.sleep(1)
+                    # Mark as processed
+                    self.processed_emails.update(batch)
+                    
+                else:
+                    logger.error(f"Failed to classify batch for user {user_id}")
+                    # Still mark as processed to avoid infinite retries
+                    self.processed_emails.update(batch)
     
     async def run_classification_cycle(self):
         """Run one complete classification cycle"""
         logger.info("Starting classification cycle...")
         
-        # Get unclassified emails
-        unclassified_by_user = await self.get_unclassified_emails()
+        # One writer task owns SQLite for the whole cycle
+        self._write_queue = asyncio.Queue()
+        writer = asyncio.create_task(self._sqlite_writer())
         
-        if not unclassified_by_user:
+        # Start each user's classification as the scroll yields them
+        tasks = []
+        try:
+            async for user_id, email_ids in self.get_unclassified_emails():
+                tasks.append(asyncio.create_task(self.process_user_emails(user_id, email_ids)))
+            
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            await self._write_queue.put(None)
+            await writer
+            self._write_queue = None
+            self._trained_users = None
+        
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error processing user emails: {result}")
+        
+        # Checkpoint the cursors so the next cycle (or restart) resumes from here
+        if self.persistence_manager:
+            state = self.persistence_manager.load_classifier_state()
+            state['last_scroll_cursor'] = self.scroll_cursors
+            self.persistence_manager.save_classifier_state(state)
+        
+        if not tasks:
             logger.info("No unclassified emails found")
             return
         
-        # Process each user's emails
-        for user_id, email_ids in unclassified_by_user.items():
-            await self.process_user_emails(user_id, email_ids)
-        
         logger.info("Classification cycle completed")
     
     async def run_continuously(self):
@@ -290,7 +658,10 @@ class IncrementalEmailClassifier:
             await self.http_client.aclose()
         
         if self.sqlite_client:
-            self.sqlite_client.disconnect()
+            await self.sqlite_client.disconnect()
+        
+        if self.persistence_manager:
+            self.persistence_manager.close()
         
         logger.info("Cleanup completed")
 
@@ -306,6 +677,7 @@ async def main():
     parser.add_argument("--db-path", default="./data/email_filter.db", help="SQLite database path")
     parser.add_argument("--batch-size", type=int, default=10, help="Batch size for classification")
     parser.add_argument("--interval", type=int, default=60, help="Check interval in seconds")
+    parser.add_argument("--state-dir", default=None, help="Directory for persisted classifier state (scroll cursors)")
     parser.add_argument("--once", action="store_true", help="Run once and exit")
     
     args = parser.parse_args()
@@ -318,7 +690,8 @@ async def main():
         collection_name=args.collection,
         sqlite_db_path=args.db_path,
         batch_size=args.batch_size,
-        check_interval=args.interval
+        check_interval=args.interval,
+        state_dir=args.state_dir
     )
     
     # Initialize
@@ -0,0 +1,242 @@
+"""
+Similarity Kernels
+
+Fused cosine-similarity feature kernels used by the email classifier.
+Large batches run on a CUDA/MPS device through PyTorch when one is
+available and everything else goes through NumPy's BLAS matmul, except
+tiny requests, where a fused numba loop (when installed) avoids the
+per-call overhead.
+"""
+
+import numpy as np
+import logging
+import warnings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
+# Columns returned by similarity_features
+SIMILARITY_FEATURE_COUNT = 8
+
+# Embeddings are held as float32: half the bytes of float64 per dot product,
+# and cosine rank order is unaffected at this precision
+EMBEDDING_DTYPE = np.float32
+
+# Below this many query x label dot products the host/device copies cost
+# more than the GEMM saves, so small requests stay on the CPU
+GPU_MIN_WORK = 1_000_000
+
+# Multiply-adds (queries x labels x dim) up to which the fused numba loop
+# beats BLAS; benchmarked around 300k at 768 dimensions (e.g. one email
+# against ~400 labels), and BLAS is 6-9x faster on large batches
+NUMBA_MAX_WORK = 250_000
+
+def _select_torch_device():
+    """Pick a GPU device for the similarity GEMM, or None to stay on the CPU"""
+    if not TORCH_AVAILABLE:
+        return None
+    if torch.cuda.is_available():
+        return "cuda"
+    mps = getattr(torch.backends, "mps", None)
+    if mps is not None and mps.is_available():
+        return "mps"
+    return None
+
+TORCH_DEVICE = _select_torch_device()
+if TORCH_DEVICE:
+    logger.info(f"Similarity kernels will use torch device '{TORCH_DEVICE}' for large batches")
+
+def to_device(matrix: np.ndarray):
+    """Copy a label matrix to the GPU as float16, or None when no device is available"""
+    if TORCH_DEVICE is None or not matrix.size:
+        return None
+    return torch.from_numpy(np.ascontiguousarray(matrix)).to(TORCH_DEVICE, dtype=torch.float16)
+
+def _similarity_features_numpy(queries: np.ndarray, imp_mat: np.ndarray, unimp_mat: np.ndarray,
+                               exclude: np.ndarray = None) -> np.ndarray:
+    """NumPy implementation of similarity_features"""
+    important = queries @ imp_mat.T if imp_mat.size else np.empty((len(queries), 0), dtype=queries.dtype)
+    unimportant = queries @ unimp_mat.T if unimp_mat.size else np.empty((len(queries), 0), dtype=queries.dtype)
+    combined = np.hstack([important, unimportant])
+
+    if exclude is not None:
+        return _excluded_similarity_features_numpy(combined, important.shape[1], exclude)
+
+    out = np.zeros((len(queries), SIMILARITY_FEATURE_COUNT))
+
+    if important.shape[1]:
+        out[:, 0] = important.mean(axis=1)
+        out[:, 1] = important.max(axis=1)
+    if unimportant.shape[1]:
+        out[:, 2] = unimportant.mean(axis=1)
+        out[:, 3] = unimportant.max(axis=1)
+    out[:, 4] = out[:, 0] - out[:, 2]
+    if combined.shape[1]:
+        out[:, 5] = combined.mean(axis=1)
+        out[:, 6] = combined.std(axis=1)
+        out[:, 7] = combined.max(axis=1)
+
+    return out
+
+def _excluded_similarity_features_numpy(combined: np.ndarray, n_imp: int, exclude: np.ndarray) -> np.ndarray:
+    """similarity_features statistics with one excluded similarity per query"""
+    combined = combined.astype(np.float64)
+    rows = np.nonzero(exclude >= 0)[0]
+    combined[rows, exclude[rows]] = np.nan
+    important = combined[:, :n_imp]
+    unimportant = combined[:, n_imp:]
+
+    out = np.zeros((len(combined), SIMILARITY_FEATURE_COUNT))
+    # A class left with no similarities yields NaN here, mapped to 0 below
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if important.shape[1]:
+            out[:, 0] = np.nanmean(important, axis=1)
+            out[:, 1] = np.nanmax(important, axis=1)
+        if unimportant.shape[1]:
+            out[:, 2] = np.nanmean(unimportant, axis=1)
+            out[:, 3] = np.nanmax(unimportant, axis=1)
+        out = np.nan_to_num(out, copy=False)
+        out[:, 4] = out[:, 0] - out[:, 2]
+        if combined.shape[1]:
+            out[:, 5] = np.nanmean(combined, axis=1)
+            out[:, 6] = np.nanstd(combined, axis=1)
+            out[:, 7] = np.nanmax(combined, axis=1)
+
+    return np.nan_to_num(out, copy=False)
+
+def _similarity_features_torch(queries: np.ndarray, imp_t, unimp_t) -> np.ndarray:
+    """GPU implementation of similarity_features over device-resident label matrices"""
+    q_t = torch.from_numpy(np.ascontiguousarray(queries)).to(TORCH_DEVICE, dtype=torch.float16)
+    n_queries = q_t.shape[0]
+    empty = torch.empty((n_queries, 0), device=TORCH_DEVICE)
+
+    # float16 GEMM, float32 reductions
+    important = (q_t @ imp_t.T).float() if imp_t is not None else empty
+    unimportant = (q_t @ unimp_t.T).float() if unimp_t is not None else empty
+    combined = torch.cat([important, unimportant], dim=1)
+
+    out = torch.zeros((n_queries, SIMILARITY_FEATURE_COUNT), device=TORCH_DEVICE)
+    if important.shape[1]:
+        out[:, 0] = important.mean(dim=1)
+        out[:, 1] = important.max(dim=1).values
+    if unimportant.shape[1]:
+        out[:, 2] = unimportant.mean(dim=1)
+        out[:, 3] = unimportant.max(dim=1).values
+    out[:, 4] = out[:, 0] - out[:, 2]
+    if combined.shape[1]:
+        out[:, 5] = combined.mean(dim=1)
+        out[:, 6] = combined.std(dim=1, unbiased=False)
+        out[:, 7] = combined.max(dim=1).values
+
+    return out.cpu().numpy().astype(np.float64)
+
+if NUMBA_AVAILABLE:
+    @njit(fastmath=True, cache=True)
+    def _similarity_features_numba(queries, imp_mat, unimp_mat, exclude):
+        """Fused dot + reduce over both label matrices, for requests too small for BLAS"""
+        n_queries, dim = queries.shape
+        n_imp = imp_mat.shape[0]
+        n_unimp = unimp_mat.shape[0]
+        n_all = n_imp + n_unimp
+        out = np.zeros((n_queries, 8))
+
+        for q in range(n_queries):
+            skip = exclude[q]
+            sims = np.empty(n_all)
+            for k in range(n_all):
+                acc = 0.0
+                if k < n_imp:
+                    for j in range(dim):
+                        acc += queries[q, j] * imp_mat[k, j]
+                else:
+                    for j in range(dim):
+                        acc += queries[q, j] * unimp_mat[k - n_imp, j]
+                sims[k] = acc
+
+            # Per-class sums and maxima, leaving out the excluded similarity
+            imp_sum = 0.0
+            imp_max = -np.inf
+            imp_n = 0
+            unimp_sum = 0.0
+            unimp_max = -np.inf
+            unimp_n = 0
+            for k in range(n_all):
+                if k == skip:
+                    continue
+                if k < n_imp:
+                    imp_sum += sims[k]
+                    imp_max = max(imp_max, sims[k])
+                    imp_n += 1
+                else:
+                    unimp_sum += sims[k]
+                    unimp_max = max(unimp_max, sims[k])
+                    unimp_n += 1
+
+            if imp_n:
+                out[q, 0] = imp_sum / imp_n
+                out[q, 1] = imp_max
+            if unimp_n:
+                out[q, 2] = unimp_sum / unimp_n
+                out[q, 3] = unimp_max
+            out[q, 4] = out[q, 0] - out[q, 2]
+            n = imp_n + unimp_n
+            if n:
+                mean = (imp_sum + unimp_sum) / n
+                var = 0.0
+                for k in range(n_all):
+                    if k != skip:
+                        var += (sims[k] - mean) ** 2
+                out[q, 5] = mean
+                out[q, 6] = np.sqrt(var / n)
+                out[q, 7] = max(imp_max, unimp_max)
+
+        return out
+
+def similarity_features(queries: np.ndarray, imp_mat: np.ndarray, unimp_mat: np.ndarray,
+                        imp_t=None, unimp_t=None, exclude: np.ndarray = None) -> np.ndarray:
+    """
+    Similarity statistics of unit-length queries against labeled examples.
+
+    Returns a (len(queries), 8) array with columns: avg/max important,
+    avg/max unimportant, avg important - avg unimportant, and mean/std/max
+    over all labeled examples. Empty label matrices yield zero columns.
+    imp_t/unimp_t are optional device copies from to_device, used for
+    batches large enough to be worth the transfer.
+
+    exclude optionally gives, per query, a row of the stacked
+    [imp_mat; unimp_mat] to leave out of that query's statistics (-1 for
+    none). Training uses it to drop each example's similarity to itself.
+    """
+    if exclude is None and (imp_t is not None or unimp_t is not None):
+        if len(queries) * (len(imp_mat) + len(unimp_mat)) >= GPU_MIN_WORK:
+            return _similarity_features_torch(queries, imp_t, unimp_t)
+
+    work = len(queries) * (len(imp_mat) + len(unimp_mat)) * queries.shape[1]
+    if NUMBA_AVAILABLE and len(queries) and work <= NUMBA_MAX_WORK:
+        dim = queries.shape[1]
+        if not imp_mat.size:
+            imp_mat = np.empty((0, dim), dtype=queries.dtype)
+        if not unimp_mat.size:
+            unimp_mat = np.empty((0, dim), dtype=queries.dtype)
+        if exclude is None:
+            exclude = np.full(len(queries), -1, dtype=np.int64)
+        return _similarity_features_numba(
+            np.ascontiguousarray(queries),
+            np.ascontiguousarray(imp_mat, dtype=queries.dtype),
+            np.ascontiguousarray(unimp_mat, dtype=queries.dtype),
+            np.ascontiguousarray(exclude, dtype=np.int64)
+        )
+
+    return _similarity_features_numpy(queries, imp_mat, unimp_mat, exclude)
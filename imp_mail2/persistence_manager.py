@@ -5,10 +5,11 @@ Handles persistence of application state across container restarts,
 including processed email tracking and service configuration.
 """
 
-import json
+import orjson
 import os
 import logging
-from typing import Set, Dict, Any, Optional
+import threading
+from typing import Iterable, Iterator, Set, Dict, Any, Optional
 from datetime import datetime
 import sqlite3
 
@@ -21,23 +22,87 @@ class PersistenceManager:
         self.data_dir = data_dir
         self.state_file = os.path.join(data_dir, "classifier_state.json")
         self.processed_emails_file = os.path.join(data_dir, "processed_emails.json")
+        self.processed_db_file = os.path.join(data_dir, "processed.db")
         
         # Ensure data directory exists
         os.makedirs(data_dir, exist_ok=True)
+        
+        # Processed email IDs live in SQLite so memory stays flat and adds are O(1).
+        # Opened on first use, so users of the manager that never track
+        # processed emails don't create the database.
+        self._processed_lock = threading.RLock()
+        self._processed_db: Optional[sqlite3.Connection] = None
     
-    def save_processed_emails(self, processed_emails: Set[str]) -> bool:
-        """Save processed emails set to persistent storage"""
+    @property
+    def _processed_conn(self) -> sqlite3.Connection:
+        """The processed email ID store, opened on first use"""
+        with self._processed_lock:
+            if self._processed_db is None:
+                self._processed_db = self._open_processed_store()
+            return self._processed_db
+    
+    def _open_processed_store(self) -> sqlite3.Connection:
+        """Open (and create if needed) the processed email ID store"""
+        conn = sqlite3.connect(self.processed_db_file, check_same_thread=False)
         try:
-            data = {
-                "processed_emails": list(processed_emails),
-                "last_updated": datetime.now().isoformat(),
-                "count": len(processed_emails)
-            }
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.Error as e:
+            logger.warning(f"Could not enable WAL for {self.processed_db_file}: {e}")
+        conn.execute("CREATE TABLE IF NOT EXISTS processed(id TEXT PRIMARY KEY) WITHOUT ROWID")
+        conn.commit()
+        self._import_processed_json(conn)
+        return conn
+    
+    def _import_processed_json(self, conn: sqlite3.Connection):
+        """Move IDs from the old processed_emails.json into the store, once"""
+        if not os.path.exists(self.processed_emails_file):
+            return
+        
+        try:
+            with open(self.processed_emails_file, 'rb') as f:
+                data = orjson.loads(f.read())
             
-            with open(self.processed_emails_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            email_ids = data.get("processed_emails", [])
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO processed VALUES (?)",
+                    ((email_id,) for email_id in email_ids)
+                )
+            
+            # Kept for reference, but never imported again
+            os.replace(self.processed_emails_file, self.processed_emails_file + ".imported")
+            logger.info(f"Imported {len(email_ids)} processed email IDs from {self.processed_emails_file}")
+            
+        except Exception as e:
+            logger.error(f"Failed to import processed emails from {self.processed_emails_file}: {e}")
+    
+    def _insert_processed(self, email_ids: Iterable[str]) -> int:
+        """Insert email IDs in one transaction, returning how many were new (raises on error)"""
+        with self._processed_lock:
+            conn = self._processed_conn
+            with conn:
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO processed VALUES (?)",
+                    ((email_id,) for email_id in email_ids)
+                )
+                return conn.total_changes - before
+    
+    def add_processed_emails(self, email_ids: Iterable[str]) -> int:
+        """Record email IDs as processed in one transaction, returning how many were new"""
+        try:
+            return self._insert_processed(email_ids)
             
-            logger.info(f"Saved {len(processed_emails)} processed email IDs to {self.processed_emails_file}")
+        except Exception as e:
+            logger.error(f"Failed to save processed emails: {e}")
+            return 0
+    
+    def save_processed_emails(self, processed_emails: Set[str]) -> bool:
+        """Save processed emails set to persistent storage (adds them to the store)"""
+        try:
+            added = self._insert_processed(processed_emails)
+            logger.info(f"Saved {added} new processed email IDs to {self.processed_db_file}")
             return True
             
         except Exception as e:
@@ -45,32 +110,93 @@ class PersistenceManager:
             return False
     
     def load_processed_emails(self) -> Set[str]:
-        """Load processed emails set from persistent storage"""
+        """
+        Load processed emails set from persistent storage.
+        
+        Materializes every ID; prefer is_processed or iter_processed_ids.
+        """
         try:
-            if not os.path.exists(self.processed_emails_file):
-                logger.info("No processed emails file found, starting fresh")
-                return set()
-            
-            with open(self.processed_emails_file, 'r') as f:
-                data = json.load(f)
-            
-            processed_emails = set(data.get("processed_emails", []))
-            last_updated = data.get("last_updated", "unknown")
-            
-            logger.info(f"Loaded {len(processed_emails)} processed email IDs (last updated: {last_updated})")
+            processed_emails = set(self.iter_processed_ids())
+            logger.info(f"Loaded {len(processed_emails)} processed email IDs")
             return processed_emails
             
         except Exception as e:
             logger.error(f"Failed to load processed emails: {e}")
             return set()
     
+    def is_processed(self, email_id: str) -> bool:
+        """Check whether an email ID has been recorded as processed"""
+        try:
+            with self._processed_lock:
+                row = self._processed_conn.execute(
+                    "SELECT 1 FROM processed WHERE id = ? LIMIT 1", (email_id,)
+                ).fetchone()
+            return row is not None
+            
+        except Exception as e:
+            logger.error(f"Failed to check processed email {email_id}: {e}")
+            return False
+    
+    def iter_processed_ids(self) -> Iterator[str]:
+        """Stream every processed email ID from the store"""
+        cursor = self._processed_conn.cursor()
+        cursor.arraysize = 4096
+        with self._processed_lock:
+            cursor.execute("SELECT id FROM processed")
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                for (email_id,) in rows:
+                    yield email_id
+    
+    def get_processed_count(self) -> int:
+        """Get the number of processed email IDs"""
+        try:
+            with self._processed_lock:
+                return self._processed_conn.execute("SELECT COUNT(*) FROM processed").fetchone()[0]
+            
+        except Exception as e:
+            logger.error(f"Failed to count processed emails: {e}")
+            return 0
+    
+    def compact_processed_store(self) -> bool:
+        """Fold the store's append-only WAL back into processed.db once it outgrows the database"""
+        if self._processed_db is None:
+            return False
+        
+        try:
+            wal_file = self.processed_db_file + "-wal"
+            wal_size = os.path.getsize(wal_file) if os.path.exists(wal_file) else 0
+            if wal_size <= 2 * os.path.getsize(self.processed_db_file):
+                return False
+            
+            with self._processed_lock:
+                self._processed_conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            
+            logger.info(f"Compacted processed email log ({wal_size} bytes)")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to compact processed emails: {e}")
+            return False
+    
+    def close(self):
+        """Close the processed email store, if it was opened"""
+        if self._processed_db is None:
+            return
+        self.compact_processed_store()
+        with self._processed_lock:
+            self._processed_db.close()
+            self._processed_db = None
+    
     def save_classifier_state(self, state: Dict[str, Any]) -> bool:
         """Save classifier state to persistent storage"""
         try:
             state["last_updated"] = datetime.now().isoformat()
             
-            with open(self.state_file, 'w') as f:
-                json.dump(state, f, indent=2)
+            with open(self.state_file, 'wb') as f:
+                f.write(orjson.dumps(state, option=orjson.OPT_APPEND_NEWLINE))
             
             logger.info(f"Saved classifier state to {self.state_file}")
             return True
@@ -86,8 +212,8 @@ class PersistenceManager:
                 logger.info("No classifier state file found, using defaults")
                 return {}
             
-            with open(self.state_file, 'r') as f:
-                state = json.load(f)
+            with open(self.state_file, 'rb') as f:
+                state = orjson.loads(f.read())
             
             last_updated = state.get("last_updated", "unknown")
             logger.info(f"Loaded classifier state (last updated: {last_updated})")
@@ -146,11 +272,12 @@ class PersistenceManager:
                 "data_dir": self.data_dir,
                 "state_file_exists": os.path.exists(self.state_file),
                 "processed_emails_file_exists": os.path.exists(self.processed_emails_file),
+                "processed_db_exists": os.path.exists(self.processed_db_file),
                 "files": {}
             }
             
             # Get file sizes
-            for filename in ["classifier_state.json", "processed_emails.json"]:
+            for filename in ["classifier_state.json", "processed_emails.json", "processed.db"]:
                 filepath = os.path.join(self.data_dir, filename)
                 if os.path.exists(filepath):
                     stats["files"][filename] = {
@@ -166,55 +293,30 @@ class PersistenceManager:
 
 
 class ProcessedEmailsTracker:
-    """Thread-safe tracker for processed emails with automatic persistence"""
+    """Thread-safe tracker for processed emails backed by the persistent SQLite store"""
     
-    def __init__(self, persistence_manager: PersistenceManager, auto_save_interval: int = 300):
+    def __init__(self, persistence_manager: PersistenceManager):
         self.persistence_manager = persistence_manager
-        self.auto_save_interval = auto_save_interval  # seconds
-        self.processed_emails: Set[str] = set()
-        self.last_save_time = datetime.now()
-        self.dirty = False
-        
-        # Load existing state
-        self.processed_emails = self.persistence_manager.load_processed_emails()
     
     def add_processed_email(self, email_id: str) -> bool:
         """Add email ID to processed set"""
-        if email_id not in self.processed_emails:
-            self.processed_emails.add(email_id)
-            self.dirty = True
-            
-            # Auto-save if interval has passed
-            if self._should_auto_save():
-                return self.save()
-            
-            return True
-        return False
+        return self.add_processed_emails([email_id]) > 0
+    
+    def add_processed_emails(self, email_ids: Iterable[str]) -> int:
+        """Add a batch of email IDs to the processed set in one transaction"""
+        return self.persistence_manager.add_processed_emails(email_ids)
     
     def is_processed(self, email_id: str) -> bool:
         """Check if email has been processed"""
-        return email_id in self.processed_emails
+        return self.persistence_manager.is_processed(email_id)
     
     def get_processed_count(self) -> int:
         """Get count of processed emails"""
-        return len(self.processed_emails)
+        return self.persistence_manager.get_processed_count()
     
     def save(self) -> bool:
-        """Force save to persistent storage"""
-        if self.dirty:
-            success = self.persistence_manager.save_processed_emails(self.processed_emails)
-            if success:
-                self.dirty = False
-                self.last_save_time = datetime.now()
-            return success
-        return True
-    
-    def _should_auto_save(self) -> bool:
-        """Check if auto-save should be triggered"""
-        return (
-            self.dirty and 
-            (datetime.now() - self.last_save_time).total_seconds() >= self.auto_save_interval
-        )
+        """Checkpoint the processed store (IDs are already committed)"""
+        return self.persistence_manager.compact_processed_store()
     
     def clear_old_entries(self, days_to_keep: int = 30) -> int:
         """Clear old processed entries (if we had timestamps)"""
@@ -29,17 +29,13 @@ def main():
         return 1
     
     try:
-        cursor = client.connection.cursor()
-        
-        # Get some unclassified emails
-        cursor.execute("""
-            SELECT id, subject, sender
+        # Only the id is needed for the update
+        unclassified = [row[0] for row in client.connection.execute("""
+            SELECT id
             FROM emails 
             WHERE importance = 'unclassified'
             LIMIT 5
-        """)
-        
-        unclassified = cursor.fetchall()
+        """)]
         
         if not unclassified:
             print("✅ No unclassified emails found!")
@@ -47,28 +43,26 @@ def main():
             
         print(f"📝 Found {len(unclassified)} unclassified emails")
         
-        # Update first 2 as important, next 2 as not important
-        for i, email in enumerate(unclassified):
-            email_id = email['id']
-            subject = email['subject'][:50] + "..."
-            
-            if i < 2:
-                importance = "important"
-                confidence = 0.85
-            else:
-                importance = "not_important" 
-                confidence = 0.75
+        # First 2 as important, the rest as not important: one UPDATE per group
+        groups = [
+            ("important", 0.85, unclassified[:2]),
+            ("not_important", 0.75, unclassified[2:]),
+        ]
+        
+        with client.transaction():
+            for importance, confidence, email_ids in groups:
+                if not email_ids:
+                    continue
+                placeholders = ",".join("?" * len(email_ids))
+                client.connection.execute(f"""
+                    UPDATE emails 
+                    SET importance = ?, importance_confidence = ?, user_labeled = 0
+                    WHERE id IN ({placeholders})
+                """, (importance, confidence, *email_ids))
                 
-            # Update the email
-            cursor.execute("""
-                UPDATE emails 
-                SET importance = ?, importance_confidence = ?, user_labeled = 0
-                WHERE id = ?
-            """, (importance, confidence, email_id))
-            
-            print(f"✅ Updated: {subject} → {importance} ({confidence})")
+                for email_id in email_ids:
+                    print(f"✅ Updated: {email_id} → {importance} ({confidence})")
         
-        client.connection.commit()
         print(f"\n🎯 Updated {len(unclassified)} emails!")
         print("Now check both /emails and /worth-it pages - they should show the same data!")
         
@@ -7,6 +7,7 @@ to all unclassified emails in the SQLite database.
 """
 
 import asyncio
+import logging
 import sys
 import os
 from pathlib import Path
@@ -16,6 +17,8 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from incremental_classifier import IncrementalEmailClassifier
 
+logger = logging.getLogger(__name__)
+
 async def main():
     """Run the incremental classifier once"""
     
@@ -24,46 +27,55 @@ async def main():
         'api_base_url': os.getenv('FASTAPI_URL', 'http://localhost:8000'),
         'qdrant_host': os.getenv('QDRANT_HOST', 'localhost'),
         'qdrant_port': int(os.getenv('QDRANT_PORT', '6333')),
+        'qdrant_grpc_port': int(os.getenv('QDRANT_GRPC_PORT', '6334')),
         'collection_name': os.getenv('QDRANT_COLLECTION', 'email_embeddings'),
         'sqlite_db_path': os.getenv('SQLITE_DB_PATH', '../data/emails.db'),
         'batch_size': 10
     }
     
-    print("🤖 Starting Incremental Email Classifier")
-    print(f"📊 FastAPI URL: {config['api_base_url']}")
-    print(f"🔍 Qdrant: {config['qdrant_host']}:{config['qdrant_port']}")
-    print(f"💾 SQLite DB: {config['sqlite_db_path']}")
-    print("=" * 50)
+    logger.info("🤖 Starting Incremental Email Classifier")
+    logger.info(f"📊 FastAPI URL: {config['api_base_url']}")
+    logger.info(f"🔍 Qdrant: {config['qdrant_host']}:{config['qdrant_port']}")
+    logger.info(f"💾 SQLite DB: {config['sqlite_db_path']}")
+    logger.info("=" * 50)
     
     # Create classifier
     classifier = IncrementalEmailClassifier(
         api_base_url=config['api_base_url'],
         qdrant_host=config['qdrant_host'],
         qdrant_port=config['qdrant_port'],
+        qdrant_grpc_port=config['qdrant_grpc_port'],
         collection_name=config['collection_name'],
         sqlite_db_path=config['sqlite_db_path'],
         batch_size=config['batch_size']
     )
     
     # Initialize
-    print("🔧 Initializing classifier...")
+    logger.info("🔧 Initializing classifier...")
     if not await classifier.initialize():
-        print("❌ Failed to initialize classifier")
+        logger.error("❌ Failed to initialize classifier")
         return 1
     
     try:
-        print("🚀 Running classification cycle...")
+        logger.info("🚀 Running classification cycle...")
         await classifier.run_once()
-        print("✅ Classification completed successfully!")
+        logger.info("✅ Classification completed successfully!")
         return 0
         
     except Exception as e:
-        print(f"❌ Classification failed: {e}")
+        logger.error(f"❌ Classification failed: {e}")
         return 1
         
     finally:
         await classifier.cleanup()
 
 if __name__ == "__main__":
+    try:
+        # libuv event loop: cheaper task switching with many HTTP/Qdrant calls in flight
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     exit_code = asyncio.run(main())
     sys.exit(exit_code)
@@ -5,264 +5,509 @@ Connects to the SQLite database to fetch actual email content
 (subject, sender, body, etc.) that complements the Qdrant embeddings.
 """
 
+import re
 import sqlite3
-import json
-from typing import Dict, List, Optional, Any
+import orjson
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from urllib.parse import quote
+from typing import Callable, Dict, Iterator, List, Optional, Any, Sequence, Set, Tuple
 from datetime import datetime
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+try:
+    from selectolax.parser import HTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+# Columns selected by the email getters, in _OUT_KEYS order
+_EMAIL_COLUMNS = """id, user_id, message_id, subject, sender, recipients,
+                    content, html_content, received_at, indexed_at,
+                    importance, importance_confidence, user_labeled,
+                    vector_id, has_attachments, thread_id, labels"""
+
+# Keys of the email dicts returned by the client, one per selected column
+_OUT_KEYS = ('id', 'userId', 'messageId', 'subject', 'sender', 'recipients',
+             'content', 'htmlContent', 'receivedAt', 'indexedAt',
+             'importance', 'importanceConfidence', 'userLabeled',
+             'vectorId', 'hasAttachments', 'threadId', 'labels')
+
+# Email dict key -> emails column, for getters asked for a subset of fields
+_KEY_COLUMNS = dict(zip(_OUT_KEYS, (column.strip() for column in _EMAIL_COLUMNS.split(','))))
+
+# PRAGMAs applied on connect. WAL lets readers run alongside the ingest writer
+# and leaves -wal/-shm files next to the database while connections are open;
+# mmap serves hot pages without read() syscalls; negative cache_size is in KiB
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'mmap_size': 268435456,
+    'cache_size': -65536,
+}
+
+# Indexes behind the getters' filters and sort orders, created on connect.
+# The labeled-only index is partial, so it stays as small as the label set
+_INDEX_DDL = """
+    CREATE INDEX IF NOT EXISTS idx_emails_user_time ON emails(user_id, received_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_emails_user_labeled ON emails(user_id, received_at DESC) WHERE user_labeled = 1;
+    CREATE INDEX IF NOT EXISTS idx_emails_importance ON emails(importance);
+"""
+
+# Seconds a get_database_stats result is reused before querying again
+STATS_CACHE_TTL = 30.0
+
+# (user, fields) result sets get_labeled_emails keeps, least recently used evicted first
+LABELED_CACHE_SIZE = 256
+
+# Rows fetched per step when streaming, bounding how many are decoded at once
+FETCH_ARRAYSIZE = 1000
+
+# IDs bound per IN (...) query, below SQLITE_MAX_VARIABLE_NUMBER on old builds (999)
+IN_CLAUSE_CHUNK = 900
+
+# Above this many IDs, get_emails_by_ids joins a temp table instead of binding IN lists
+TEMP_TABLE_MIN_IDS = 1000
+
+# Patterns used by clean_html_content
+_TAG_RE = re.compile(r'<[^>]+>')
+_WS_RE = re.compile(r'\s+')
+
+# Bodies at least this long are stripped with selectolax when installed;
+# below it the parser's setup costs more than the regex
+HTML_PARSER_MIN_LENGTH = 2048
+
+# Statement templates; {columns} is filled once per field selection by _select,
+# so sqlite3's per-connection statement cache finds each under the same text
+_SQL_BY_ID = "SELECT {columns} FROM emails WHERE id = ?"
+
+# LIMIT -1 means no limit, so one statement covers both cases
+_SQL_USER = """
+    SELECT {columns}
+    FROM emails 
+    WHERE user_id = ?
+    ORDER BY received_at DESC
+    LIMIT ?
+"""
+
+_SQL_LABELED = """
+    SELECT {columns}
+    FROM emails 
+    WHERE user_id = ? AND user_labeled = 1
+    ORDER BY received_at DESC
+"""
+
+# Just what /train needs, as plain tuples; served by the partial labeled index
+_SQL_LABELED_TRAINING_ROWS = """
+    SELECT id, importance
+    FROM emails 
+    WHERE user_id = ? AND user_labeled = 1 AND importance IN ('important', 'not_important')
+    ORDER BY received_at DESC
+"""
+
+_SQL_UNCLASSIFIED_USERS = """
+    SELECT DISTINCT user_id FROM emails 
+    WHERE importance IS NULL OR importance = 'unclassified'
+"""
+
+# All four counts in one pass over the table
+_SQL_DATABASE_STATS = """
+    SELECT COUNT(*),
+           COALESCE(SUM(user_labeled = 1), 0),
+           COALESCE(SUM(importance = 'important'), 0),
+           COUNT(DISTINCT user_id)
+    FROM emails
+"""
+
+# Large ID sets are joined against the temp table filled by _get_emails_by_id_table
+_SQL_BY_ID_TABLE = "SELECT {columns} FROM emails JOIN _ids USING (id)"
+
+@lru_cache(maxsize=64)
+def _sql_by_ids(count: int) -> str:
+    """SELECT template for `count` email IDs, built once per distinct count"""
+    return f"SELECT {{columns}} FROM emails WHERE id IN ({','.join('?' * count)})"
+
+@lru_cache(maxsize=256)
+def _select_cached(template: str, fields: Optional[Tuple[str, ...]]) -> Tuple[str, Tuple[str, ...]]:
+    """Fill a template's column list for the given fields; returns (sql, dict keys)"""
+    if fields is None:
+        return template.format(columns=_EMAIL_COLUMNS), _OUT_KEYS
+    
+    unknown = set(fields) - _KEY_COLUMNS.keys()
+    if unknown or not fields:
+        raise ValueError(f"Invalid email fields: {sorted(unknown) or 'none requested'}")
+    keys = tuple(key for key in _OUT_KEYS if key in fields)
+    return template.format(columns=', '.join(_KEY_COLUMNS[key] for key in keys)), keys
+
+def _select(template: str, fields: Optional[Sequence[str]]) -> Tuple[str, Tuple[str, ...]]:
+    """SQL and dict keys for a getter; fields=None selects every column"""
+    return _select_cached(template, None if fields is None else tuple(fields))
+
+def _row_to_email(row, keys: Tuple[str, ...] = _OUT_KEYS) -> Dict[str, Any]:
+    """Build an email dict from a row whose columns match `keys`"""
+    email = dict(zip(keys, row))
+    # JSON columns are only decoded when requested and non-empty
+    if 'recipients' in email:
+        email['recipients'] = orjson.loads(email['recipients']) if email['recipients'] else []
+    if 'labels' in email:
+        email['labels'] = orjson.loads(email['labels']) if email['labels'] else []
+    if 'userLabeled' in email:
+        email['userLabeled'] = bool(email['userLabeled'])
+    if 'hasAttachments' in email:
+        email['hasAttachments'] = bool(email['hasAttachments'])
+    return email
+
 class SQLiteEmailClient:
-    """Client for accessing email content from SQLite database"""
+    """
+    Client for accessing email content from SQLite database.
+    
+    With read_only=True the file is opened in SQLite's read-only URI mode,
+    which never takes write locks; writes (transaction(), importance
+    updates) must then go through a separate read/write client.
+    """
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, pragmas: Optional[Dict[str, Any]] = None, read_only: bool = False):
         self.db_path = db_path
+        self.read_only = read_only
         self.connection = None
+        self._cursor = None
+        # (monotonic timestamp, stats) from the last get_database_stats query
+        self._stats_cache = None
+        # (user_id, keys) -> (database version, emails) from get_labeled_emails
+        self._labeled_cache: "OrderedDict[Tuple[str, Tuple[str, ...]], Tuple[Tuple[int, int], List[Dict[str, Any]]]]" = OrderedDict()
+        # Per-client overrides of DEFAULT_PRAGMAS; a value of None skips that PRAGMA
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
     
     def connect(self):
         """Connect to SQLite database"""
         try:
-            self.connection = sqlite3.connect(self.db_path)
+            # Writes may run on a worker thread (one at a time) to keep event loops free
+            # Autocommit: reads don't open implicit transactions; writers use transaction()
+            if self.read_only:
+                self.connection = sqlite3.connect(f"file:{quote(self.db_path)}?mode=ro", uri=True,
+                                                  check_same_thread=False, isolation_level=None)
+            else:
+                self.connection = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
             self.connection.row_factory = sqlite3.Row  # Enable column access by name
+            self._apply_pragmas()
+            if not self.read_only:
+                self._ensure_indexes()
+            # Reused by every single-shot query on this connection
+            self._cursor = self.connection.cursor()
             logger.info(f"Connected to SQLite database: {self.db_path}")
             return True
         except Exception as e:
             logger.error(f"Failed to connect to SQLite database: {e}")
             return False
     
+    def _apply_pragmas(self):
+        """Apply the connection PRAGMAs, skipping any the database refuses"""
+        for name, value in self.pragmas.items():
+            # The journal mode is a property of the file; only a writer can change it
+            if value is None or (self.read_only and name == 'journal_mode'):
+                continue
+            try:
+                self.connection.execute(f"PRAGMA {name}={value}")
+            except sqlite3.Error as e:
+                # e.g. WAL on read-only or network filesystems, or mmap on some platforms;
+                # the defaults still work
+                logger.warning(f"Could not set PRAGMA {name}={value} for {self.db_path}: {e}")
+    
+    def _ensure_indexes(self):
+        """Create the indexes the getters rely on, if missing"""
+        try:
+            self.connection.executescript(_INDEX_DDL)
+        except sqlite3.Error as e:
+            # e.g. read-only databases; queries still work, just without the indexes
+            logger.warning(f"Could not create email indexes for {self.db_path}: {e}")
+    
     def disconnect(self):
         """Disconnect from SQLite database"""
         if self.connection:
             self.connection.close()
             self.connection = None
+            self._cursor = None
+            self._labeled_cache.clear()
+    
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed statements in one transaction, rolling back on error"""
+        self.connection.execute("BEGIN")
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.rollback()
+            raise
+        self.connection.commit()
+        self.invalidate_stats()
     
-    def get_email_by_id(self, email_id: str) -> Optional[Dict[str, Any]]:
+    def get_email_by_id(self, email_id: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
         """Get email content by email ID"""
+        sql, keys = _select(_SQL_BY_ID, fields)
         if not self.connection:
             if not self.connect():
                 return None
         
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT id, user_id, message_id, subject, sender, recipients, 
-                       content, html_content, received_at, indexed_at, 
-                       importance, importance_confidence, user_labeled, 
-                       vector_id, has_attachments, thread_id, labels
-                FROM emails 
-                WHERE id = ?
-            """, (email_id,))
-            
-            row = cursor.fetchone()
+            row = self._cursor.execute(sql, (email_id,)).fetchone()
             if row:
-                return {
-                    'id': row['id'],
-                    'userId': row['user_id'],
-                    'messageId': row['message_id'],
-                    'subject': row['subject'],
-                    'sender': row['sender'],
-                    'recipients': json.loads(row['recipients']) if row['recipients'] else [],
-                    'content': row['content'],
-                    'htmlContent': row['html_content'],
-                    'receivedAt': row['received_at'],
-                    'indexedAt': row['indexed_at'],
-                    'importance': row['importance'],
-                    'importanceConfidence': row['importance_confidence'],
-                    'userLabeled': bool(row['user_labeled']),
-                    'vectorId': row['vector_id'],
-                    'hasAttachments': bool(row['has_attachments']),
-                    'threadId': row['thread_id'],
-                    'labels': json.loads(row['labels']) if row['labels'] else []
-                }
+                return _row_to_email(row, keys)
             return None
             
         except Exception as e:
             logger.error(f"Error fetching email {email_id}: {e}")
             return None
     
-    def get_emails_by_ids(self, email_ids: List[str]) -> List[Dict[str, Any]]:
+    def get_emails_by_ids(self, email_ids: List[str], fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
         """Get multiple emails by IDs"""
         if not email_ids:
             return []
+        _select(_SQL_BY_ID, fields)  # reject unknown fields before touching the database
         
         if not self.connection:
             if not self.connect():
                 return []
         
         try:
-            cursor = self.connection.cursor()
-            placeholders = ','.join(['?' for _ in email_ids])
-            cursor.execute(f"""
-                SELECT id, user_id, message_id, subject, sender, recipients, 
-                       content, html_content, received_at, indexed_at, 
-                       importance, importance_confidence, user_labeled, 
-                       vector_id, has_attachments, thread_id, labels
-                FROM emails 
-                WHERE id IN ({placeholders})
-            """, email_ids)
+            if len(email_ids) > TEMP_TABLE_MIN_IDS:
+                return self._get_emails_by_id_table(email_ids, fields)
             
             emails = []
-            for row in cursor.fetchall():
-                emails.append({
-                    'id': row['id'],
-                    'userId': row['user_id'],
-                    'messageId': row['message_id'],
-                    'subject': row['subject'],
-                    'sender': row['sender'],
-                    'recipients': json.loads(row['recipients']) if row['recipients'] else [],
-                    'content': row['content'],
-                    'htmlContent': row['html_content'],
-                    'receivedAt': row['received_at'],
-                    'indexedAt': row['indexed_at'],
-                    'importance': row['importance'],
-                    'importanceConfidence': row['importance_confidence'],
-                    'userLabeled': bool(row['user_labeled']),
-                    'vectorId': row['vector_id'],
-                    'hasAttachments': bool(row['has_attachments']),
-                    'threadId': row['thread_id'],
-                    'labels': json.loads(row['labels']) if row['labels'] else []
-                })
-            
+            # Stay under SQLite's bound-variable limit; full chunks share one statement
+            for start in range(0, len(email_ids), IN_CLAUSE_CHUNK):
+                chunk = email_ids[start:start + IN_CLAUSE_CHUNK]
+                sql, keys = _select(_sql_by_ids(len(chunk)), fields)
+                emails.extend(_row_to_email(row, keys) for row in self._cursor.execute(sql, chunk))
             return emails
             
         except Exception as e:
             logger.error(f"Error fetching emails {email_ids}: {e}")
             return []
     
-    def get_user_emails(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    def get_emails_by_ids_map(self, email_ids: List[str], fields: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Get multiple emails by IDs as {id: email}, for ordered or membership lookups without sorting"""
+        if fields is not None and 'id' not in fields:
+            fields = (*fields, 'id')
+        return {email['id']: email for email in self.get_emails_by_ids(email_ids, fields)}
+    
+    def _get_emails_by_id_table(self, email_ids: List[str], fields: Optional[Sequence[str]]) -> List[Dict[str, Any]]:
+        """Fetch a large ID set by loading it into a temp table and joining on it"""
+        connection = self.connection
+        connection.execute("CREATE TEMP TABLE IF NOT EXISTS _ids (id TEXT PRIMARY KEY)")
+        # A savepoint batches the inserts whether or not a transaction is already open
+        connection.execute("SAVEPOINT load_ids")
+        try:
+            connection.execute("DELETE FROM _ids")
+            connection.executemany("INSERT OR IGNORE INTO _ids VALUES (?)", ((email_id,) for email_id in email_ids))
+        except Exception:
+            connection.execute("ROLLBACK TO load_ids")
+            raise
+        finally:
+            connection.execute("RELEASE load_ids")
+        
+        sql, keys = _select(_SQL_BY_ID_TABLE, fields)
+        return [_row_to_email(row, keys) for row in self._cursor.execute(sql)]
+    
+    def get_user_emails(self, user_id: str, limit: Optional[int] = None,
+                        fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
         """Get all emails for a specific user"""
+        return list(self.iter_user_emails(user_id, limit, fields))
+    
+    def iter_user_emails(self, user_id: str, limit: Optional[int] = None,
+                         fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream a user's emails, newest first, decoding FETCH_ARRAYSIZE rows at a time"""
+        sql, keys = _select(_SQL_USER, fields)
         if not self.connection:
             if not self.connect():
-                return []
+                return
         
         try:
+            # Own cursor: the shared one may be reused while this generator is suspended
             cursor = self.connection.cursor()
-            query = """
-                SELECT id, user_id, message_id, subject, sender, recipients, 
-                       content, html_content, received_at, indexed_at, 
-                       importance, importance_confidence, user_labeled, 
-                       vector_id, has_attachments, thread_id, labels
-                FROM emails 
-                WHERE user_id = ?
-                ORDER BY received_at DESC
-            """
+            cursor.arraysize = FETCH_ARRAYSIZE
+            cursor.execute(sql, (user_id, -1 if limit is None else limit))
             
-            if limit:
-                query += f" LIMIT {limit}"
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                for row in rows:
+                    yield _row_to_email(row, keys)
             
-            cursor.execute(query, (user_id,))
+        except Exception as e:
+            logger.error(f"Error fetching user emails for {user_id}: {e}")
+    
+    def get_labeled_emails(self, user_id: str, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Get emails that have been manually labeled by the user (cached until the database changes)"""
+        sql, keys = _select(_SQL_LABELED, fields)
+        if not self.connection:
+            if not self.connect():
+                return []
+        
+        try:
+            # data_version moves on commits from other connections, total_changes on our own
+            version = (self._cursor.execute("PRAGMA data_version").fetchone()[0], self.connection.total_changes)
+            cache_key = (user_id, keys)
+            cached = self._labeled_cache.get(cache_key)
+            if cached and cached[0] == version:
+                self._labeled_cache.move_to_end(cache_key)
+                return list(cached[1])
             
-            emails = []
-            for row in cursor.fetchall():
-                emails.append({
-                    'id': row['id'],
-                    'userId': row['user_id'],
-                    'messageId': row['message_id'],
-                    'subject': row['subject'],
-                    'sender': row['sender'],
-                    'recipients': json.loads(row['recipients']) if row['recipients'] else [],
-                    'content': row['content'],
-                    'htmlContent': row['html_content'],
-                    'receivedAt': row['received_at'],
-                    'indexedAt': row['indexed_at'],
-                    'importance': row['importance'],
-                    'importanceConfidence': row['importance_confidence'],
-                    'userLabeled': bool(row['user_labeled']),
-                    'vectorId': row['vector_id'],
-                    'hasAttachments': bool(row['has_attachments']),
-                    'threadId': row['thread_id'],
-                    'labels': json.loads(row['labels']) if row['labels'] else []
-                })
+            cursor = self._cursor.execute(sql, (user_id,))
+            emails = [_row_to_email(row, keys) for row in cursor]
             
-            return emails
+            # Entries from an older database version can never be served again
+            for stale_key in [key for key, (cached_version, _) in self._labeled_cache.items() if cached_version != version]:
+                del self._labeled_cache[stale_key]
+            self._labeled_cache[cache_key] = (version, emails)
+            while len(self._labeled_cache) > LABELED_CACHE_SIZE:
+                self._labeled_cache.popitem(last=False)
+            return list(emails)
             
         except Exception as e:
-            logger.error(f"Error fetching user emails for {user_id}: {e}")
+            logger.error(f"Error fetching labeled emails for {user_id}: {e}")
             return []
     
-    def get_labeled_emails(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get emails that have been manually labeled by the user"""
+    def get_labeled_training_rows(self, user_id: str) -> List[Tuple[str, str]]:
+        """Get (id, importance) tuples for a user's labeled emails"""
         if not self.connection:
             if not self.connect():
                 return []
         
         try:
             cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT id, user_id, message_id, subject, sender, recipients, 
-                       content, html_content, received_at, indexed_at, 
-                       importance, importance_confidence, user_labeled, 
-                       vector_id, has_attachments, thread_id, labels
-                FROM emails 
-                WHERE user_id = ? AND user_labeled = 1
-                ORDER BY received_at DESC
-            """, (user_id,))
-            
-            emails = []
-            for row in cursor.fetchall():
-                emails.append({
-                    'id': row['id'],
-                    'userId': row['user_id'],
-                    'messageId': row['message_id'],
-                    'subject': row['subject'],
-                    'sender': row['sender'],
-                    'recipients': json.loads(row['recipients']) if row['recipients'] else [],
-                    'content': row['content'],
-                    'htmlContent': row['html_content'],
-                    'receivedAt': row['received_at'],
-                    'indexedAt': row['indexed_at'],
-                    'importance': row['importance'],
-                    'importanceConfidence': row['importance_confidence'],
-                    'userLabeled': bool(row['user_labeled']),
-                    'vectorId': row['vector_id'],
-                    'hasAttachments': bool(row['has_attachments']),
-                    'threadId': row['thread_id'],
-                    'labels': json.loads(row['labels']) if row['labels'] else []
-                })
+            # Plain tuples, no per-row sqlite3.Row or dict
+            cursor.row_factory = None
+            return cursor.execute(_SQL_LABELED_TRAINING_ROWS, (user_id,)).fetchall()
             
-            return emails
+        except Exception as e:
+            logger.error(f"Error fetching labeled training rows for {user_id}: {e}")
+            return []
+    
+    def get_user_classified_ids(self, user_id: str) -> Set[str]:
+        """Get the IDs of a user's emails that already have an importance label, streaming the rows"""
+        return {
+            email['id'] for email in self.iter_user_emails(user_id, fields=('id', 'importance'))
+            if email['importance'] is not None and email['importance'] != 'unclassified'
+        }
+    
+    def get_unclassified_user_ids(self) -> List[str]:
+        """Get the IDs of users that still have unclassified emails"""
+        if not self.connection:
+            if not self.connect():
+                return []
+        
+        try:
+            return [row[0] for row in self._cursor.execute(_SQL_UNCLASSIFIED_USERS)]
             
         except Exception as e:
-            logger.error(f"Error fetching labeled emails for {user_id}: {e}")
+            logger.error(f"Error fetching users with unclassified emails: {e}")
             return []
     
     def get_database_stats(self) -> Dict[str, Any]:
-        """Get statistics about the email database"""
+        """Get statistics about the email database (cached for STATS_CACHE_TTL seconds)"""
+        if self._stats_cache and time.monotonic() - self._stats_cache[0] < STATS_CACHE_TTL:
+            return dict(self._stats_cache[1])
+        
         if not self.connection:
             if not self.connect():
                 return {}
         
         try:
-            cursor = self.connection.cursor()
+            total, labeled, important, users = self._cursor.execute(_SQL_DATABASE_STATS).fetchone()
             
-            # Total emails
-            cursor.execute("SELECT COUNT(*) as total FROM emails")
-            total = cursor.fetchone()['total']
-            
-            # Labeled emails
-            cursor.execute("SELECT COUNT(*) as labeled FROM emails WHERE user_labeled = 1")
-            labeled = cursor.fetchone()['labeled']
-            
-            # Important emails
-            cursor.execute("SELECT COUNT(*) as important FROM emails WHERE importance = 'important'")
-            important = cursor.fetchone()['important']
-            
-            # Users
-            cursor.execute("SELECT COUNT(DISTINCT user_id) as users FROM emails")
-            users = cursor.fetchone()['users']
-            
-            return {
+            stats = {
                 'total_emails': total,
                 'labeled_emails': labeled,
                 'important_emails': important,
                 'total_users': users,
                 'labeling_percentage': (labeled / total * 100) if total > 0 else 0
             }
+            self._stats_cache = (time.monotonic(), stats)
+            return dict(stats)
             
         except Exception as e:
             logger.error(f"Error getting database stats: {e}")
             return {}
+    
+    def invalidate_stats(self):
+        """Drop the cached database stats; called after writes"""
+        self._stats_cache = None
+
+class AsyncSQLiteEmailClient:
+    """Asyncio front end for SQLiteEmailClient that runs every call on one worker thread per connection"""
+    
+    def __init__(self, db_path: str, pragmas: Optional[Dict[str, Any]] = None, read_only: bool = False):
+        self.client = SQLiteEmailClient(db_path, pragmas, read_only)
+        # A single thread keeps the connection's calls serialized, like aiosqlite
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+    
+    @property
+    def db_path(self) -> str:
+        return self.client.db_path
+    
+    @property
+    def connection(self) -> Optional[sqlite3.Connection]:
+        return self.client.connection
+    
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run a blocking callable on the connection's worker thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+    
+    async def connect(self) -> bool:
+        """Connect to SQLite database"""
+        return await self.run(self.client.connect)
+    
+    async def disconnect(self):
+        """Disconnect from SQLite database and stop the worker thread"""
+        await self.run(self.client.disconnect)
+        self._executor.shutdown(wait=False)
+    
+    async def get_email_by_id(self, email_id: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        """Get a single email by ID"""
+        return await self.run(self.client.get_email_by_id, email_id, fields)
+    
+    async def get_emails_by_ids(self, email_ids: List[str], fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Get multiple emails by IDs"""
+        return await self.run(self.client.get_emails_by_ids, email_ids, fields)
+    
+    async def get_emails_by_ids_map(self, email_ids: List[str],
+                                    fields: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Get multiple emails by IDs as {id: email}"""
+        return await self.run(self.client.get_emails_by_ids_map, email_ids, fields)
+    
+    async def get_user_emails(self, user_id: str, limit: Optional[int] = None,
+                              fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Get all emails for a user"""
+        return await self.run(self.client.get_user_emails, user_id, limit, fields)
+    
+    async def get_labeled_emails(self, user_id: str, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Get emails that have been manually labeled by the user"""
+        return await self.run(self.client.get_labeled_emails, user_id, fields)
+    
+    async def get_user_classified_ids(self, user_id: str) -> Set[str]:
+        """Get the IDs of a user's emails that already have an importance label"""
+        return await self.run(self.client.get_user_classified_ids, user_id)
+    
+    async def get_unclassified_user_ids(self) -> List[str]:
+        """Get the IDs of users that still have unclassified emails"""
+        return await self.run(self.client.get_unclassified_user_ids)
+    
+    async def get_database_stats(self) -> Dict[str, Any]:
+        """Get statistics about the email database"""
+        return await self.run(self.client.get_database_stats)
+    
+    def invalidate_stats(self):
+        """Drop the cached database stats; called after writes"""
+        self.client.invalidate_stats()
 
 def truncate_text(text: str, max_length: int = 100) -> str:
     """Truncate text for display purposes"""
@@ -279,10 +524,13 @@ def clean_html_content(html_content: str) -> str:
     if not html_content:
         return ""
     
-    import re
-    # Remove HTML tags
-    clean_text = re.sub(r'<[^>]+>', ' ', html_content)
+    if SELECTOLAX_AVAILABLE and len(html_content) >= HTML_PARSER_MIN_LENGTH:
+        # Single pass through a C tokenizer, also robust to malformed markup
+        clean_text = HTMLParser(html_content).text(separator=' ')
+    else:
+        # Remove HTML tags
+        clean_text = _TAG_RE.sub(' ', html_content)
     # Remove extra whitespace
-    clean_text = re.sub(r'\s+', ' ', clean_text).strip()
+    clean_text = _WS_RE.sub(' ', clean_text).strip()
     
     return clean_text
\ No newline at end of file
@@ -5,11 +5,17 @@ Test script to demonstrate email classifier persistence functionality.
 This script shows how models and training data persist across service restarts.
 """
 
-import requests
+import asyncio
+import httpx
 import json
+import orjson
 import time
 import sys
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+# Seconds to wait on read-only calls and on calls that train or write models
+GET_TIMEOUT = 5
+POST_TIMEOUT = 30
 
 class ClassifierPersistenceTest:
     """Test persistence functionality of the email classifier service"""
@@ -17,27 +23,39 @@ class ClassifierPersistenceTest:
     def __init__(self, base_url: str = "http://localhost:8000"):
         self.base_url = base_url
         self.test_user_id = "test_user_persistence"
+        self.client: Optional[httpx.AsyncClient] = None
+    
+    async def __aenter__(self):
+        # One pooled client; concurrent calls share its kept-alive connections
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4)
+        )
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.client.aclose()
         
-    def check_service_health(self) -> bool:
+    async def check_service_health(self) -> bool:
         """Check if the service is running"""
         try:
-            response = requests.get(f"{self.base_url}/health")
+            response = await self.client.get("/health", timeout=GET_TIMEOUT)
             return response.status_code == 200
-        except requests.exceptions.RequestException:
+        except httpx.HTTPError:
             return False
     
-    def get_persistence_status(self) -> Dict[str, Any]:
+    async def get_persistence_status(self) -> Dict[str, Any]:
         """Get current persistence status"""
         try:
-            response = requests.get(f"{self.base_url}/persistence/status")
+            response = await self.client.get("/persistence/status", timeout=GET_TIMEOUT)
             if response.status_code == 200:
                 return response.json()
             else:
                 return {"status": "error", "message": f"HTTP {response.status_code}"}
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             return {"status": "error", "message": str(e)}
     
-    def bulk_label_emails(self, important_ids: list, unimportant_ids: list) -> Dict[str, Any]:
+    async def bulk_label_emails(self, important_ids: list, unimportant_ids: list) -> Dict[str, Any]:
         """Bulk label emails for training"""
         payload = {
             "user_id": self.test_user_id,
@@ -46,58 +64,64 @@ class ClassifierPersistenceTest:
         }
         
         try:
-            response = requests.post(f"{self.base_url}/bulk-label", json=payload)
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            # ID lists can run to thousands; orjson encodes/decodes them far faster than json
+            response = await self.client.post(
+                "/bulk-label",
+                content=orjson.dumps(payload),
+                headers={"Content-Type": "application/json"},
+                timeout=POST_TIMEOUT
+            )
+            return orjson.loads(response.content)
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
             return {"status": "error", "message": str(e)}
     
-    def get_model_stats(self) -> Dict[str, Any]:
+    async def get_model_stats(self) -> Dict[str, Any]:
         """Get model statistics"""
         try:
-            response = requests.get(f"{self.base_url}/stats/{self.test_user_id}")
+            response = await self.client.get(f"/stats/{self.test_user_id}", timeout=GET_TIMEOUT)
             if response.status_code == 200:
                 return response.json()
             else:
                 return {"status": "error", "message": f"HTTP {response.status_code}"}
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             return {"status": "error", "message": str(e)}
     
-    def reset_user_model(self) -> Dict[str, Any]:
+    async def reset_user_model(self) -> Dict[str, Any]:
         """Reset the test user's model"""
         try:
-            response = requests.post(f"{self.base_url}/reset/{self.test_user_id}")
+            response = await self.client.post(f"/reset/{self.test_user_id}", timeout=POST_TIMEOUT)
             return response.json()
-        except requests.exceptions.RequestException as e:
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
             return {"status": "error", "message": str(e)}
     
-    def save_all_models(self) -> Dict[str, Any]:
+    async def save_all_models(self) -> Dict[str, Any]:
         """Manually save all models"""
         try:
-            response = requests.post(f"{self.base_url}/persistence/save-all")
+            response = await self.client.post("/persistence/save-all", timeout=POST_TIMEOUT)
             return response.json()
-        except requests.exceptions.RequestException as e:
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
             return {"status": "error", "message": str(e)}
     
-    def run_persistence_test(self):
+    async def run_persistence_test(self):
         """Run the full persistence test"""
         print("🔬 Email Classifier Persistence Test")
         print("=" * 50)
         
-        # Check service health
+        # Health and initial persistence status are independent, so fetch them together
         print("1. Checking service health...")
-        if not self.check_service_health():
+        healthy, status = await asyncio.gather(self.check_service_health(), self.get_persistence_status())
+        if not healthy:
             print("❌ Service is not running. Please start the service first.")
             sys.exit(1)
         print("✅ Service is healthy")
         
         # Check initial persistence status
         print("\n2. Checking initial persistence status...")
-        status = self.get_persistence_status()
         print(f"📊 Persistence status: {json.dumps(status, indent=2)}")
         
         # Reset user model to start fresh
         print(f"\n3. Resetting model for user: {self.test_user_id}")
-        reset_result = self.reset_user_model()
+        reset_result = await self.reset_user_model()
         print(f"🔄 Reset result: {reset_result}")
         
         # Add some training data
@@ -118,22 +142,22 @@ class ClassifierPersistenceTest:
             "email_105_spam"
         ]
         
-        label_result = self.bulk_label_emails(important_emails, unimportant_emails)
+        label_result = await self.bulk_label_emails(important_emails, unimportant_emails)
         print(f"🏷️  Labeling result: {json.dumps(label_result, indent=2)}")
         
         # Check model stats after training
         print("\n5. Checking model stats after training...")
-        stats = self.get_model_stats()
+        stats = await self.get_model_stats()
         print(f"📈 Model stats: {json.dumps(stats, indent=2)}")
         
         # Force save all models
         print("\n6. Manually saving all models...")
-        save_result = self.save_all_models()
+        save_result = await self.save_all_models()
         print(f"💾 Save result: {json.dumps(save_result, indent=2)}")
         
         # Check persistence status after saving
         print("\n7. Checking persistence status after saving...")
-        final_status = self.get_persistence_status()
+        final_status = await self.get_persistence_status()
         print(f"📊 Final persistence status: {json.dumps(final_status, indent=2)}")
         
         # Instructions for testing restart
@@ -147,20 +171,22 @@ class ClassifierPersistenceTest:
         print("4. The model should load automatically with the same stats")
         print("\n✅ Test setup complete!")
 
-def main():
+async def main():
     """Main test function"""
     if len(sys.argv) > 1 and sys.argv[1] == "--verify":
         print("🔍 Verifying persistence after restart...")
-        test = ClassifierPersistenceTest()
+        async with ClassifierPersistenceTest() as test:
+            healthy, stats, status = await asyncio.gather(
+                test.check_service_health(), test.get_model_stats(), test.get_persistence_status()
+            )
         
-        if not test.check_service_health():
+        if not healthy:
             print("❌ Service is not running")
             sys.exit(1)
         
         print("✅ Service is healthy after restart")
         
         # Check if our test user's model is loaded
-        stats = test.get_model_stats()
         if stats.get("total_examples", 0) > 0:
             print(f"✅ Model persisted! Found {stats['total_examples']} training examples")
             print(f"📊 Model stats: {json.dumps(stats, indent=2)}")
@@ -168,13 +194,12 @@ def main():
             print("❌ Model did not persist - no training examples found")
         
         # Check persistence status
-        status = test.get_persistence_status()
         print(f"📊 Persistence status: {json.dumps(status, indent=2)}")
         
     else:
         # Run initial setup
-        test = ClassifierPersistenceTest()
-        test.run_persistence_test()
+        async with ClassifierPersistenceTest() as test:
+            await test.run_persistence_test()
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -8,38 +8,202 @@ workflow with real email data.
 import asyncio
 import httpx
 import json
+import os
 import random
+import sys
+import time
+import zlib
+import numpy as np
+import orjson
+from collections import defaultdict
 from typing import List, Dict, Any
 from datetime import datetime
 
+try:
+    import grpc  # noqa: F401
+    GRPC_AVAILABLE = True
+except ImportError:
+    GRPC_AVAILABLE = False
+
+try:
+    from vector_store_client import QdrantClient
+    from qdrant_client.http import models
+except ImportError:
+    QdrantClient = None
+    models = None
+
 # Configuration
 QDRANT_HOST = "localhost"
 QDRANT_PORT = 6333
+QDRANT_GRPC_PORT = 6334
 COLLECTION_NAME = "email_embeddings"
 API_BASE_URL = "http://localhost:8000"
 
+# Parallel gRPC channels to Qdrant; caps how many Qdrant calls can run at once
+QDRANT_POOL_SIZE = 32
+
+# Emails fetched from Qdrant to pick training and test emails from
+SAMPLE_SIZE = 20
+
+# The only payload keys the test reads
+SAMPLE_PAYLOAD_FIELDS = ['emailId', 'userId', 'createdAt', 'embeddingModel']
+
+# Print model statistics (step 2); set INTEGRATION_VERBOSE=0 to skip the /stats round-trip
+VERBOSE = os.environ.get("INTEGRATION_VERBOSE", "1") == "1"
+
+# User the workflow trains and classifies for
+TEST_USER_ID = "test_user_123"
+
+# Virtual users running the workflow concurrently; above 1 the run doubles as a load test
+VIRTUAL_USERS = int(os.environ.get("INTEGRATION_USERS", "1"))
+
+# Latency percentiles reported per endpoint
+LATENCY_QUANTILES = [0.5, 0.95, 0.99]
+
+# Seed for picking which training emails are labeled important, so reruns label the same emails
+LABEL_SEED = 0xE1AA1
+
+# Points per page when scrolling the collection
+SCROLL_PAGE_SIZE = 256
+
+# Emails per /classify request; larger test sets are split and sent concurrently
+CLASSIFY_CHUNK_SIZE = 16
+
+# Attempts per POST before a transient transport error is given up on
+RETRY_ATTEMPTS = 5
+
+# Backoff ceiling doubles from this base per attempt (seconds), full jitter below it
+RETRY_BASE_DELAY = 0.2
+
+# Upper bound on a single backoff (seconds)
+RETRY_MAX_DELAY = 5.0
+
+# Transport errors worth retrying: dropped or reset connections, not HTTP error statuses
+RETRY_EXCEPTIONS = (httpx.ReadError, httpx.ConnectError, httpx.RemoteProtocolError)
+
+# Seconds per successful request, by endpoint (retries included)
+LATENCIES: Dict[str, List[float]] = defaultdict(list)
+
+async def iter_emails(client, with_payload: Any = True, page_size: int = SCROLL_PAGE_SIZE, with_vectors: bool = False):
+    """Stream the collection's points in small scroll pages, each fetched on a worker thread"""
+    offset = None
+    while True:
+        points, offset = await asyncio.to_thread(
+            client.scroll,
+            collection_name=COLLECTION_NAME,
+            limit=page_size,
+            offset=offset,
+            with_payload=with_payload,
+            with_vectors=with_vectors
+        )
+        for point in points:
+            yield point
+        
+        if offset is None:
+            break
+
+def sample_points(client, vector_size: int, limit: int, with_payload: Any = True, with_vectors: bool = False):
+    """Nearest points to a random direction: a varied sample, unlike the first IDs in scroll order"""
+    query = np.random.default_rng().standard_normal(vector_size).astype(np.float32)
+    query /= np.linalg.norm(query)
+    
+    if hasattr(client, 'query_points'):
+        return client.query_points(
+            collection_name=COLLECTION_NAME,
+            query=query.tolist(),
+            limit=limit,
+            with_payload=with_payload,
+            with_vectors=with_vectors
+        ).points
+    # qdrant-client < 1.10
+    return client.search(
+        collection_name=COLLECTION_NAME,
+        query_vector=query.tolist(),
+        limit=limit,
+        with_payload=with_payload,
+        with_vectors=with_vectors
+    )
+
+class _Log:
+    """Buffers printed lines and writes them to stdout in one call per flush"""
+    
+    def __init__(self):
+        self.buf = []
+    
+    def __call__(self, *args, end: str = "\n"):
+        self.buf.append(" ".join(map(str, args)) + end)
+    
+    def flush(self):
+        if self.buf:
+            sys.stdout.write("".join(self.buf))
+            sys.stdout.flush()
+            self.buf.clear()
+
+async def post_with_retry(client: httpx.AsyncClient, url: str, payload: Dict[str, Any]) -> httpx.Response:
+    """POST a JSON payload, retrying transient transport errors with jittered exponential backoff"""
+    started = time.perf_counter()
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            # orjson encodes straight to bytes, much faster than httpx's json= for vector-laden bodies
+            response = await client.post(url, content=orjson.dumps(payload), headers={"Content-Type": "application/json"})
+        except RETRY_EXCEPTIONS as e:
+            if attempt == RETRY_ATTEMPTS - 1:
+                raise
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+            print(f"⚠️  {url} failed ({type(e).__name__}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            continue
+        LATENCIES[url].append(time.perf_counter() - started)
+        return response
+
+async def timed_get(client: httpx.AsyncClient, url: str, endpoint: str) -> httpx.Response:
+    """GET a URL, recording its latency under the endpoint name"""
+    started = time.perf_counter()
+    response = await client.get(url)
+    LATENCIES[endpoint].append(time.perf_counter() - started)
+    return response
+
+def print_latency_summary():
+    """Print request count and latency percentiles for each endpoint"""
+    if not LATENCIES:
+        return
+    print(f"\n⏱️  Latency over {VIRTUAL_USERS} virtual user(s):")
+    for endpoint, latencies in LATENCIES.items():
+        p50, p95, p99 = np.quantile(latencies, LATENCY_QUANTILES) * 1000
+        print(f"   {endpoint}: n={len(latencies)} p50={p50:.1f}ms p95={p95:.1f}ms p99={p99:.1f}ms")
+
 async def test_qdrant_connection():
     """Test connection to Qdrant and fetch sample emails"""
     print("🔍 Testing Qdrant connection...")
     
+    if QdrantClient is None or models is None:
+        print("❌ qdrant-client not installed. Install with: pip install qdrant-client")
+        return []
+    
     try:
-        from vector_store_client import QdrantClient
-        
-        # Initialize Qdrant client
-        qdrant_client = QdrantClient(
+        # Initialize Qdrant client; gRPC skips JSON encoding, REST is the fallback without grpcio.
+        # qdrant_client is synchronous, so its calls run on worker threads to keep the loop free
+        qdrant_client = await asyncio.to_thread(
+            QdrantClient,
             host=QDRANT_HOST,
             port=QDRANT_PORT,
+            grpc_port=QDRANT_GRPC_PORT,
+            prefer_grpc=GRPC_AVAILABLE,
+            pool_size=QDRANT_POOL_SIZE,
             collection_name=COLLECTION_NAME
         )
         
-        print(f"✅ Connected to Qdrant at {QDRANT_HOST}:{QDRANT_PORT}")
+        transport = f"gRPC :{QDRANT_GRPC_PORT}" if GRPC_AVAILABLE else "REST"
+        print(f"✅ Connected to Qdrant at {QDRANT_HOST}:{QDRANT_PORT} ({transport})")
         
         # Get collection info
+        vector_size = None
         try:
-            collection_info = qdrant_client.client.get_collection(COLLECTION_NAME)
+            collection_info = await asyncio.to_thread(qdrant_client.client.get_collection, COLLECTION_NAME)
+            vector_size = collection_info.config.params.vectors.size
             print(f"📊 Collection '{COLLECTION_NAME}' found:")
             print(f"   - Vectors count: {collection_info.vectors_count}")
-            print(f"   - Vector size: {collection_info.config.params.vectors.size}")
+            print(f"   - Vector size: {vector_size}")
         except Exception as e:
             print(f"⚠️  Could not get collection info: {e}")
         
@@ -48,19 +212,26 @@ async def test_qdrant_connection():
         
         # Get a random sample of emails
         sample_emails = []
+        # Skip decoding payload keys (bodies, headers) the test never reads
+        with_payload = models.PayloadSelectorInclude(include=SAMPLE_PAYLOAD_FIELDS)
         try:
-            # Use scroll to get some emails
-            scroll_result = qdrant_client.client.scroll(
-                collection_name=COLLECTION_NAME,
-                limit=20,  # Get 20 emails to choose from
-                with_payload=True,
-                with_vectors=False  # Don't need vectors for initial inspection
-            )
-            
-            points, _ = scroll_result
+            if vector_size:
+                points = await asyncio.to_thread(sample_points, qdrant_client.client, vector_size, SAMPLE_SIZE, with_payload, True)
+            else:
+                # Without the vector size, fall back to the first points in scroll order
+                points = []
+                async for point in iter_emails(qdrant_client.client, with_payload, min(SAMPLE_SIZE, SCROLL_PAGE_SIZE), with_vectors=True):
+                    points.append(point)
+                    if len(points) >= SAMPLE_SIZE:
+                        break
             
+            # A collection may hold several points per email; keep the first of each
+            seen_ids = set()
             for point in points:
                 email_id = point.payload.get('emailId')
+                if email_id in seen_ids:
+                    continue
+                seen_ids.add(email_id)
                 user_id = point.payload.get('userId')
                 created_at = point.payload.get('createdAt')
                 embedding_model = point.payload.get('embeddingModel')
@@ -70,7 +241,10 @@ async def test_qdrant_connection():
                     'email_id': email_id,
                     'user_id': user_id,
                     'created_at': created_at,
-                    'embedding_model': embedding_model
+                    'embedding_model': embedding_model,
+                    # Fetched once here and sent with the training labels, so /train needn't refetch it
+                    'vector': point.vector if isinstance(point.vector, list) else None,
+                    'payload': point.payload
                 })
             
             print(f"✅ Found {len(sample_emails)} sample emails")
@@ -98,196 +272,198 @@ async def test_qdrant_connection():
         print(f"❌ Error connecting to Qdrant: {e}")
         return []
 
-async def test_api_workflow(sample_emails: List[Dict[str, Any]]):
+async def test_api_workflow(sample_emails: List[Dict[str, Any]], client: httpx.AsyncClient, user_id: str = TEST_USER_ID):
     """Test the complete API workflow with real email data"""
+    log = _Log()
+    try:
+        await _run_api_workflow(sample_emails, client, log, user_id)
+    finally:
+        log.flush()
+
+async def _run_api_workflow(sample_emails: List[Dict[str, Any]], client: httpx.AsyncClient, log: _Log, user_id: str):
+    """API workflow steps, writing each step's output in one go"""
     
     if len(sample_emails) < 10:
-        print(f"❌ Need at least 10 emails for testing, found {len(sample_emails)}")
+        log(f"❌ Need at least 10 emails for testing, found {len(sample_emails)}")
         return
     
-    print("\n🧪 Testing Email Classification API Workflow")
-    print("=" * 60)
+    log("\n🧪 Testing Email Classification API Workflow")
+    log("=" * 60)
     
     # Select emails for training (5 important, 5 not important)
     training_emails = sample_emails[:10]
     test_emails = sample_emails[10:15] if len(sample_emails) > 10 else sample_emails[5:10]
     
-    # Simulate user preferences (randomly assign for testing)
-    important_emails = random.sample(training_emails, 5)
-    unimportant_emails = [e for e in training_emails if e not in important_emails]
+    # Simulate user preferences (randomly assign for testing, reproducibly across runs)
+    # A generator per user: concurrent workflows never share RNG state, and each
+    # user's picks are stable across runs (crc32, unlike hash(), isn't salted per process)
+    rng = np.random.default_rng([LABEL_SEED, zlib.crc32(user_id.encode())])
+    important_emails = [training_emails[i] for i in rng.choice(len(training_emails), size=5, replace=False)]
+    important_ids = {e['email_id'] for e in important_emails}
+    unimportant_emails = [e for e in training_emails if e['email_id'] not in important_ids]
+    
+    log(f"📚 Training with {len(training_emails)} emails:")
+    log(f"   - {len(important_emails)} marked as IMPORTANT")
+    log(f"   - {len(unimportant_emails)} marked as NOT IMPORTANT")
+    
+    log(f"\n🎯 Will test classification on {len(test_emails)} emails")
     
-    print(f"📚 Training with {len(training_emails)} emails:")
-    print(f"   - {len(important_emails)} marked as IMPORTANT")
-    print(f"   - {len(unimportant_emails)} marked as NOT IMPORTANT")
+    log.flush()
+    # Step 1: Train the classifier
+    log("\n1️⃣ Training the classifier...")
     
-    print(f"\n🎯 Will test classification on {len(test_emails)} emails")
+    # Prepare training data: important examples, then unimportant ones
+    labeled_examples = (
+        [{"email_id": email['email_id'], "is_important": True, "confidence": 1.0,
+          "vector": email['vector'], "metadata": email['payload']} for email in important_emails] +
+        [{"email_id": email['email_id'], "is_important": False, "confidence": 1.0,
+          "vector": email['vector'], "metadata": email['payload']} for email in unimportant_emails]
+    )
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    training_request = {
+        "user_id": user_id,
+        "labeled_examples": labeled_examples,
+        "retrain": False
+    }
+    
+    try:
+        train_response = await post_with_retry(client, "/train", training_request)
         
-        # Step 1: Check API health
-        print("\n1️⃣ Checking API health...")
-        try:
-            health_response = await client.get(f"{API_BASE_URL}/health")
-            if health_response.status_code == 200:
-                print("✅ API is healthy")
-            else:
-                print(f"❌ API health check failed: {health_response.status_code}")
-                return
-        except Exception as e:
-            print(f"❌ Cannot connect to API: {e}")
-            print("Make sure the service is running: python email_classifier_service.py")
+        if train_response.status_code == 200:
+            result = train_response.json()
+            log(f"✅ Training completed successfully!")
+            log(f"   - Status: {result['status']}")
+            log(f"   - Examples used: {result['examples_count']}")
+            log(f"   - Emails found: {result['emails_found']}")
+            log(f"   - Model version: {result['model_version']}")
+        else:
+            log(f"❌ Training failed: {train_response.status_code}")
+            log(f"   Response: {train_response.text}")
             return
-        
-        # Step 2: Train the classifier
-        print("\n2️⃣ Training the classifier...")
-        
-        # Prepare training data
-        labeled_examples = []
-        
-        # Add important examples
-        for email in important_emails:
-            labeled_examples.append({
-                "email_id": email['email_id'],
-                "is_important": True,
-                "confidence": 1.0
-            })
-        
-        # Add unimportant examples
-        for email in unimportant_emails:
-            labeled_examples.append({
-                "email_id": email['email_id'],
-                "is_important": False,
-                "confidence": 1.0
-            })
-        
-        training_request = {
-            "user_id": "test_user_123",
-            "labeled_examples": labeled_examples,
-            "retrain": False
-        }
-        
-        try:
-            train_response = await client.post(
-                f"{API_BASE_URL}/train",
-                json=training_request
-            )
             
-            if train_response.status_code == 200:
-                result = train_response.json()
-                print(f"✅ Training completed successfully!")
-                print(f"   - Status: {result['status']}")
-                print(f"   - Examples used: {result['examples_count']}")
-                print(f"   - Emails found: {result['emails_found']}")
-                print(f"   - Model version: {result['model_version']}")
-            else:
-                print(f"❌ Training failed: {train_response.status_code}")
-                print(f"   Response: {train_response.text}")
-                return
-                
-        except Exception as e:
-            print(f"❌ Training request failed: {e}")
-            return
-        
-        # Step 3: Get model statistics
-        print("\n3️⃣ Checking model statistics...")
+    except httpx.ConnectError as e:
+        # /train doubles as the health check: a refused connection means the service is down
+        log(f"❌ Cannot connect to API: {e}")
+        log("Make sure the service is running: python email_classifier_service.py")
+        return
+    except Exception as e:
+        log(f"❌ Training request failed: {e}")
+        return
+    
+    test_email_ids = list(dict.fromkeys(email['email_id'] for email in test_emails))
+    
+    classification_request = {
+        "user_id": user_id,
+        "email_ids": test_email_ids,
+        "return_confidence": True
+    }
+    
+    # Steps 2 and 3 only need training to have finished, so both requests go out together
+    stats_task = asyncio.create_task(timed_get(client, f"/stats/{user_id}", "/stats")) if VERBOSE else None
+    classify_task = asyncio.gather(*[
+        post_with_retry(client, "/classify", {**classification_request, "email_ids": test_email_ids[i:i + CLASSIFY_CHUNK_SIZE]})
+        for i in range(0, len(test_email_ids), CLASSIFY_CHUNK_SIZE)
+    ])
+    
+    log.flush()
+    # Step 2: Get model statistics
+    if VERBOSE:
+        log("\n2️⃣ Checking model statistics...")
         try:
-            stats_response = await client.get(f"{API_BASE_URL}/stats/test_user_123")
-            
+            stats_response = await stats_task
+        
             if stats_response.status_code == 200:
                 stats = stats_response.json()
-                print(f"📊 Model Statistics:")
-                print(f"   - Total examples: {stats['total_examples']}")
-                print(f"   - Last trained: {stats['last_trained']}")
-                print(f"   - Model version: {stats['model_version']}")
+                log(f"📊 Model Statistics:")
+                log(f"   - Total examples: {stats['total_examples']}")
+                log(f"   - Last trained: {stats['last_trained']}")
+                log(f"   - Model version: {stats['model_version']}")
             else:
-                print(f"⚠️  Could not get stats: {stats_response.status_code}")
+                log(f"⚠️  Could not get stats: {stats_response.status_code}")
         except Exception as e:
-            print(f"⚠️  Stats request failed: {e}")
-        
-        # Step 4: Classify test emails
-        print("\n4️⃣ Classifying test emails...")
+            log(f"⚠️  Stats request failed: {e}")
+    
+    log.flush()
+    # Step 3: Classify test emails
+    log("\n3️⃣ Classifying test emails...")
+    
+    try:
+        classify_responses = await classify_task
+        classify_response = next((r for r in classify_responses if r.status_code != 200), classify_responses[0])
         
-        test_email_ids = [email['email_id'] for email in test_emails]
+        if classify_response.status_code == 200:
+            # Merge the per-chunk results back into one response, in request order
+            parts = [r.json() for r in classify_responses]
+            results = {
+                "results": [result for part in parts for result in part['results']],
+                "model_version": parts[0]['model_version']
+            }
+            log(f"✅ Classification completed!")
+            log(f"   - Processed: {len(results['results'])} emails")
+            log(f"   - Model version: {results['model_version']}")
+            
+            log(f"\n📊 Classification Results:")
+            # One write for the whole table
+            log("".join(
+                f"   {i+1}. {result['email_id']}\n"
+                f"      → {'🔴 IMPORTANT' if result['is_important'] else '⚪ Not Important'} "
+                f"(confidence: {result['confidence']:.3f})\n"
+                f"      → {result.get('reasoning', 'No reasoning provided')}\n\n"
+                for i, result in enumerate(results['results'])
+            ), end="")
+            
+        else:
+            log(f"❌ Classification failed: {classify_response.status_code}")
+            log(f"   Response: {classify_response.text}")
+            return
+            
+    except Exception as e:
+        log(f"❌ Classification request failed: {e}")
+        return
+    
+    log.flush()
+    # Step 4: Test feedback mechanism
+    log("\n4️⃣ Testing feedback mechanism...")
+    
+    if results['results']:
+        # Simulate user correcting a prediction
+        first_result = results['results'][0]
         
-        classification_request = {
-            "user_id": "test_user_123",
-            "email_ids": test_email_ids,
-            "return_confidence": True
+        feedback_request = {
+            "user_id": user_id,
+            "email_id": first_result['email_id'],
+            "actual_label": not first_result['is_important'],  # Opposite of prediction
+            "predicted_label": first_result['is_important'],
+            "confidence": first_result['confidence']
         }
         
         try:
-            classify_response = await client.post(
-                f"{API_BASE_URL}/classify",
-                json=classification_request
-            )
+            # Not retried: /feedback appends a labeled example, so a retry after the
+            # server already handled the request would record the correction twice
+            started = time.perf_counter()
+            feedback_response = await client.post("/feedback", json=feedback_request)
+            LATENCIES["/feedback"].append(time.perf_counter() - started)
             
-            if classify_response.status_code == 200:
-                results = classify_response.json()
-                print(f"✅ Classification completed!")
-                print(f"   - Processed: {len(results['results'])} emails")
-                print(f"   - Model version: {results['model_version']}")
-                
-                print(f"\n📊 Classification Results:")
-                for i, result in enumerate(results['results']):
-                    importance = "🔴 IMPORTANT" if result['is_important'] else "⚪ Not Important"
-                    confidence = result['confidence']
-                    email_id = result['email_id']
-                    reasoning = result.get('reasoning', 'No reasoning provided')
-                    
-                    print(f"   {i+1}. {email_id}")
-                    print(f"      → {importance} (confidence: {confidence:.3f})")
-                    print(f"      → {reasoning}")
-                    print()
-                
+            if feedback_response.status_code == 200:
+                log(f"✅ Feedback submitted successfully!")
+                log(f"   - Corrected prediction for: {first_result['email_id']}")
+                log(f"   - Model will learn from this feedback")
             else:
-                print(f"❌ Classification failed: {classify_response.status_code}")
-                print(f"   Response: {classify_response.text}")
-                return
+                log(f"⚠️  Feedback submission failed: {feedback_response.status_code}")
                 
         except Exception as e:
-            print(f"❌ Classification request failed: {e}")
-            return
-        
-        # Step 5: Test feedback mechanism
-        print("\n5️⃣ Testing feedback mechanism...")
-        
-        if results['results']:
-            # Simulate user correcting a prediction
-            first_result = results['results'][0]
-            
-            feedback_request = {
-                "user_id": "test_user_123",
-                "email_id": first_result['email_id'],
-                "actual_label": not first_result['is_important'],  # Opposite of prediction
-                "predicted_label": first_result['is_important'],
-                "confidence": first_result['confidence']
-            }
-            
-            try:
-                feedback_response = await client.post(
-                    f"{API_BASE_URL}/feedback",
-                    json=feedback_request
-                )
-                
-                if feedback_response.status_code == 200:
-                    print(f"✅ Feedback submitted successfully!")
-                    print(f"   - Corrected prediction for: {first_result['email_id']}")
-                    print(f"   - Model will learn from this feedback")
-                else:
-                    print(f"⚠️  Feedback submission failed: {feedback_response.status_code}")
-                    
-            except Exception as e:
-                print(f"⚠️  Feedback request failed: {e}")
+            log(f"⚠️  Feedback request failed: {e}")
     
-    print("\n" + "=" * 60)
-    print("🎉 Integration test completed!")
-    print("\nThe microservice successfully:")
-    print("✅ Connected to your Qdrant database")
-    print("✅ Fetched real email embeddings")
-    print("✅ Trained a classification model")
-    print("✅ Classified emails with confidence scores")
-    print("✅ Provided reasoning for decisions")
-    print("✅ Accepted feedback for improvement")
+    log.flush()
+    log("\n" + "=" * 60)
+    log("🎉 Integration test completed!")
+    log("\nThe microservice successfully:")
+    log("✅ Connected to your Qdrant database")
+    log("✅ Fetched real email embeddings")
+    log("✅ Trained a classification model")
+    log("✅ Classified emails with confidence scores")
+    log("✅ Provided reasoning for decisions")
+    log("✅ Accepted feedback for improvement")
 
 async def main():
     """Main test function"""
@@ -305,8 +481,22 @@ async def main():
         print("3. qdrant-client is installed: pip install qdrant-client")
         return
     
-    # Test the API workflow
-    await test_api_workflow(sample_emails)
+    # One client for the whole run, so every step reuses its kept-alive connections;
+    # the pool grows with the virtual users so they don't queue for connections
+    async with httpx.AsyncClient(
+        base_url=API_BASE_URL,
+        timeout=httpx.Timeout(30.0, connect=5.0),
+        limits=httpx.Limits(max_connections=max(100, VIRTUAL_USERS * 4), max_keepalive_connections=max(20, VIRTUAL_USERS))
+    ) as client:
+        # Test the API workflow
+        if VIRTUAL_USERS == 1:
+            await test_api_workflow(sample_emails, client)
+        else:
+            await asyncio.gather(*[
+                test_api_workflow(sample_emails, client, f"user_{i}") for i in range(VIRTUAL_USERS)
+            ])
+    
+    print_latency_summary()
 
 if __name__ == "__main__":
     print("Starting integration test...")
@@ -5,51 +5,275 @@ Interface for interacting with the email vector store.
 Supports various vector databases (Pinecone, Weaviate, Chroma, etc.)
 """
 
+import asyncio
+import hashlib
+import json
+import math
+import time
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional, Any, Tuple
+from collections import OrderedDict
+from typing import AsyncIterator, List, Dict, Optional, Any, Tuple, Union
 import numpy as np
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    import simsimd
+    SIMSIMD_AVAILABLE = True
+except ImportError:
+    SIMSIMD_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 class VectorSearchResult(BaseModel):
     """Result from vector similarity search"""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
     email_id: str
     score: float
     metadata: Dict[str, Any]
-    embedding: Optional[List[float]] = None
+    # float32 row view into the search's embedding matrix
+    embedding: Optional[np.ndarray] = None
+    # int8 form of embedding for cheap candidate scoring; embedding ~= embedding_q8 * embedding_scale
+    embedding_q8: Optional[np.ndarray] = None
+    embedding_scale: Optional[float] = None
+    # L2 norm of embedding, computed once per search so similarity reducers can skip it
+    norm: Optional[float] = None
+
+# Column-oriented search results: email IDs, scores, an (N, D) float32 embedding
+# matrix (D is 0 when the store returned no vectors) and per-result metadata
+SearchArrays = Tuple[List[str], np.ndarray, np.ndarray, List[Dict[str, Any]]]
+
+# Payload keys QdrantClient.iter_user_emails returns unless asked for more
+USER_EMAIL_PAYLOAD_FIELDS = ['emailId', 'userId', 'createdAt']
+
+# Points per scroll page when streaming a user's emails
+USER_SCROLL_PAGE_SIZE = 1000
+
+# Pinecone queries in flight at once for a batch search (the SDK has no batch query)
+PINECONE_QUERY_CONCURRENCY = 8
+
+# Query vectors may be plain lists or NumPy arrays
+Embedding = Union[List[float], np.ndarray]
+
+# Dimension assumed for Pinecone indexes whose stats can't be read
+PINECONE_DEFAULT_DIMENSION = 768
+
+def _query_list(query_embedding: Embedding) -> List[float]:
+    """Query vector as the float32-valued list the SDKs serialize, converted once"""
+    return np.ascontiguousarray(query_embedding, dtype=np.float32).tolist()
+
+def _stack_embeddings(vectors: List[Any]) -> np.ndarray:
+    """Pack result vectors into one contiguous (N, D) float32 matrix; missing vectors stay zero"""
+    dim = next((len(vector) for vector in vectors if vector is not None and len(vector)), 0)
+    embeddings = np.zeros((len(vectors), dim), dtype=np.float32)
+    for i, vector in enumerate(vectors):
+        if vector is not None and len(vector):
+            embeddings[i] = vector
+    return embeddings
+
+def _search_arrays(ids: List[str], scores: List[float], vectors: List[Any], metadatas: List[Dict[str, Any]]) -> SearchArrays:
+    """Build SearchArrays from per-result columns"""
+    return ids, np.asarray(scores, dtype=np.float64), _stack_embeddings(vectors), metadatas
+
+def _empty_search_arrays() -> SearchArrays:
+    """SearchArrays with no results"""
+    return _search_arrays([], [], [], [])
+
+# Similarity search results cached per client; repeated verification and
+# classification runs issue the same queries within minutes of each other
+SEARCH_CACHE_SIZE = 4096
+SEARCH_CACHE_TTL = 300  # seconds
+
+# Cosine similarity at which a cached search for a different query vector may
+# answer a new one (e.g. 0.98); None only serves exact repeats
+SEARCH_CACHE_SIMILARITY = None
+
+class SearchCache:
+    """LRU/TTL cache of similarity search results keyed by query vector, top_k and filters"""
+    
+    def __init__(self, max_size: int = SEARCH_CACHE_SIZE, ttl: float = SEARCH_CACHE_TTL,
+                 similarity: Optional[float] = SEARCH_CACHE_SIMILARITY):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity = similarity
+        # key -> (stored at, unit query vector, results)
+        self._store: "OrderedDict[Tuple[bytes, int, str, bool], Tuple[float, np.ndarray, List[VectorSearchResult]]]" = OrderedDict()
+    
+    @staticmethod
+    def _key(query: np.ndarray, top_k: int, filters: Optional[Dict[str, Any]], with_vectors: bool) -> Tuple[bytes, int, str, bool]:
+        """Digest of the float32 query bytes plus the search parameters"""
+        return hashlib.sha256(query.tobytes()).digest(), top_k, json.dumps(filters, sort_keys=True, default=str), with_vectors
+    
+    @staticmethod
+    def _unit(query: np.ndarray) -> np.ndarray:
+        """Query scaled to unit length for cosine comparison"""
+        norm = np.linalg.norm(query)
+        return query / norm if norm > 0 else query
+    
+    def get(self, query_embedding: Any, top_k: int, filters: Optional[Dict[str, Any]],
+            with_vectors: bool = False) -> Optional[List[VectorSearchResult]]:
+        """Cached results for this search, or for a near-identical query when similarity is set"""
+        query = np.ascontiguousarray(query_embedding, dtype=np.float32)
+        key = self._key(query, top_k, filters, with_vectors)
+        now = time.monotonic()
+        
+        entry = self._store.get(key)
+        if entry is not None and now - entry[0] < self.ttl:
+            self._store.move_to_end(key)
+            return entry[2]
+        
+        if self.similarity is None:
+            return None
+        
+        # Nearest fresh cached query with the same top_k and filters
+        candidates = [
+            (cached_key, cached) for cached_key, cached in self._store.items()
+            if cached_key[1:] == key[1:] and now - cached[0] < self.ttl and cached[1].shape == query.shape
+        ]
+        if not candidates:
+            return None
+        similarities = np.stack([cached[1] for _, cached in candidates]) @ self._unit(query)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity:
+            return None
+        best_key, best_entry = candidates[best]
+        self._store.move_to_end(best_key)
+        return best_entry[2]
+    
+    def put(self, query_embedding: Any, top_k: int, filters: Optional[Dict[str, Any]], results: List[VectorSearchResult],
+            with_vectors: bool = False):
+        """Store results, evicting the least recently used beyond max_size"""
+        query = np.ascontiguousarray(query_embedding, dtype=np.float32)
+        key = self._key(query, top_k, filters, with_vectors)
+        self._store[key] = (time.monotonic(), self._unit(query), results)
+        self._store.move_to_end(key)
+        while len(self._store) > self.max_size:
+            self._store.popitem(last=False)
 
 class VectorStoreClient(ABC):
     """Abstract base class for vector store clients"""
     
+    # Created on first search; assign a SearchCache to change its limits
+    search_cache: Optional[SearchCache] = None
+    
     @abstractmethod
     async def get_email_by_id(self, email_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve email data by ID"""
         pass
     
-    @abstractmethod
     async def get_emails_by_ids(self, email_ids: List[str]) -> List[Dict[str, Any]]:
-        """Retrieve multiple emails by IDs"""
-        pass
+        """
+        Retrieve multiple emails by IDs.
+
+        Defaults to concurrent get_email_by_id lookups; stores with a real
+        batch fetch override this with a single request.
+        """
+        emails = await asyncio.gather(*[self.get_email_by_id(email_id) for email_id in email_ids])
+        return [email for email in emails if email is not None]
     
     @abstractmethod
+    async def search_similar_emails_arrays(
+        self, 
+        query_embedding: Embedding, 
+        top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
+    ) -> SearchArrays:
+        """Search for similar emails, returning results as column arrays"""
+        pass
+    
     async def search_similar_emails(
         self, 
-        query_embedding: List[float], 
+        query_embedding: Embedding, 
         top_k: int = 10,
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
     ) -> List[VectorSearchResult]:
         """Search for similar emails using vector similarity"""
-        pass
+        if self.search_cache is None:
+            self.search_cache = SearchCache()
+        cached = self.search_cache.get(query_embedding, top_k, filters, with_vectors)
+        if cached is not None:
+            return list(cached)
+        
+        ids, scores, embeddings, metadatas = await self.search_similar_emails_arrays(query_embedding, top_k, filters, with_vectors)
+        has_embeddings = embeddings.shape[1] > 0
+        if has_embeddings:
+            embeddings_q8, scales = quantize_int8(embeddings)
+            norms = np.linalg.norm(embeddings, axis=1)
+        results = [
+            VectorSearchResult(
+                email_id=email_id,
+                score=float(scores[i]),
+                metadata=metadatas[i],
+                embedding=embeddings[i] if has_embeddings else None,
+                embedding_q8=embeddings_q8[i] if has_embeddings else None,
+                embedding_scale=float(scales[i]) if has_embeddings else None,
+                norm=float(norms[i]) if has_embeddings else None
+            )
+            for i, email_id in enumerate(ids)
+        ]
+        
+        # Failed searches come back empty too, so only non-empty results are cached
+        if results:
+            self.search_cache.put(query_embedding, top_k, filters, results, with_vectors)
+        return list(results)
+    
+    async def search_similar_emails_batch(
+        self, 
+        query_embeddings: np.ndarray, 
+        top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
+    ) -> List[SearchArrays]:
+        """Search for similar emails to each row of an (N, D) query matrix, one result set per query"""
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        return list(await asyncio.gather(*[
+            self.search_similar_emails_arrays(query, top_k, filters, with_vectors) for query in queries
+        ]))
+    
+    def prefetch_vectors(self, email_ids: List[str]) -> "asyncio.Task[Dict[str, np.ndarray]]":
+        """
+        Start fetching full vectors for email_ids in the background.
+        
+        Searches skip vectors by default; await the returned task only when
+        re-ranking actually needs them, so the fetch overlaps other work.
+        """
+        return asyncio.create_task(self._fetch_vectors(list(email_ids)))
+    
+    async def _fetch_vectors(self, email_ids: List[str]) -> Dict[str, np.ndarray]:
+        """float32 vectors by email ID for the emails the store has"""
+        emails = await self.get_emails_by_ids(email_ids)
+        return {
+            email['email_id']: np.asarray(email['embedding'], dtype=np.float32)
+            for email in emails if email.get('embedding') is not None
+        }
+    
+    async def hydrate_embeddings(self, emails: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fill in embeddings for emails fetched without vectors with one batch lookup, in place"""
+        missing = [email['email_id'] for email in emails if email.get('embedding') is None]
+        if missing:
+            vectors = await self._fetch_vectors(missing)
+            for email in emails:
+                if email.get('embedding') is None:
+                    email['embedding'] = vectors.get(email['email_id'])
+        return emails
     
     @abstractmethod
     async def get_user_emails(
         self, 
         user_id: str, 
-        limit: Optional[int] = None
+        limit: Optional[int] = None,
+        with_vectors: bool = False
     ) -> List[Dict[str, Any]]:
-        """Get all emails for a specific user"""
+        """Get all emails for a specific user; embeddings are None unless with_vectors is set"""
         pass
 
 class PineconeClient(VectorStoreClient):
@@ -61,6 +285,13 @@ class PineconeClient(VectorStoreClient):
         pinecone.init(api_key=api_key, environment=environment)
         self.index = pinecone.Index(index_name)
         self.index_name = index_name
+        
+        # Needed for the zero vector get_user_emails queries with
+        try:
+            self.dim = int(self.index.describe_index_stats()['dimension'])
+        except Exception as e:
+            logger.warning(f"Could not read dimension of Pinecone index {index_name}, assuming {PINECONE_DEFAULT_DIMENSION}: {e}")
+            self.dim = PINECONE_DEFAULT_DIMENSION
     
     async def get_email_by_id(self, email_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve email data by ID from Pinecone"""
@@ -98,40 +329,66 @@ class PineconeClient(VectorStoreClient):
             logger.error(f"Error fetching emails {email_ids}: {str(e)}")
             return []
     
-    async def search_similar_emails(
+    async def search_similar_emails_arrays(
         self, 
-        query_embedding: List[float], 
+        query_embedding: Embedding, 
         top_k: int = 10,
-        filters: Optional[Dict[str, Any]] = None
-    ) -> List[VectorSearchResult]:
+        filters: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
+    ) -> SearchArrays:
         """Search for similar emails using Pinecone"""
+        return self._query_arrays(query_embedding, top_k, filters, with_vectors)
+    
+    async def search_similar_emails_batch(
+        self, 
+        query_embeddings: np.ndarray, 
+        top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
+    ) -> List[SearchArrays]:
+        """Search for similar emails to each query, running a bounded number of Pinecone queries on worker threads"""
+        semaphore = asyncio.Semaphore(PINECONE_QUERY_CONCURRENCY)
+        
+        async def query_one(query: np.ndarray) -> SearchArrays:
+            async with semaphore:
+                return await asyncio.to_thread(self._query_arrays, query, top_k, filters, with_vectors)
+        
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        return list(await asyncio.gather(*[query_one(query) for query in queries]))
+    
+    def _query_arrays(
+        self, 
+        query_embedding: Embedding, 
+        top_k: int,
+        filters: Optional[Dict[str, Any]],
+        with_vectors: bool
+    ) -> SearchArrays:
+        """Run one Pinecone query (blocking)"""
         try:
             response = self.index.query(
-                vector=query_embedding,
+                vector=_query_list(query_embedding),
                 top_k=top_k,
                 filter=filters,
                 include_metadata=True,
-                include_values=True
+                include_values=with_vectors
             )
             
-            results = []
-            for match in response['matches']:
-                results.append(VectorSearchResult(
-                    email_id=match['id'],
-                    score=match['score'],
-                    metadata=match.get('metadata', {}),
-                    embedding=match.get('values', [])
-                ))
-            
-            return results
+            matches = response['matches']
+            return _search_arrays(
+                [match['id'] for match in matches],
+                [match['score'] for match in matches],
+                [match.get('values') for match in matches],
+                [match.get('metadata', {}) for match in matches]
+            )
         except Exception as e:
             logger.error(f"Error searching similar emails: {str(e)}")
-            return []
+            return _empty_search_arrays()
     
     async def get_user_emails(
         self, 
         user_id: str, 
-        limit: Optional[int] = None
+        limit: Optional[int] = None,
+        with_vectors: bool = False
     ) -> List[Dict[str, Any]]:
         """Get all emails for a specific user from Pinecone"""
         try:
@@ -140,21 +397,21 @@ class PineconeClient(VectorStoreClient):
             
             # Pinecone doesn't have a direct "get all" method, so we'll use a dummy query
             # In practice, you might need to maintain a separate index or use query with filters
-            dummy_vector = [0.0] * 768  # Assuming 768-dim embeddings
+            dummy_vector = np.zeros(self.dim, dtype=np.float32).tolist()
             
             response = self.index.query(
                 vector=dummy_vector,
                 top_k=limit or 10000,  # Large number to get all
                 filter=filter_dict,
                 include_metadata=True,
-                include_values=True
+                include_values=with_vectors
             )
             
             emails = []
             for match in response['matches']:
                 emails.append({
                     'email_id': match['id'],
-                    'embedding': match.get('values', []),
+                    'embedding': match.get('values', []) if with_vectors else None,
                     'metadata': match.get('metadata', {})
                 })
             
@@ -166,14 +423,23 @@ class PineconeClient(VectorStoreClient):
 class QdrantClient(VectorStoreClient):
     """Qdrant vector store client for email embeddings"""
     
-    def __init__(self, host: str = "localhost", port: int = 6333, collection_name: str = "email_embeddings"):
+    def __init__(self, host: str = "localhost", port: int = 6333, collection_name: str = "email_embeddings",
+                 grpc_port: int = 6334, prefer_grpc: bool = False, pool_size: Optional[int] = None,
+                 timeout: Optional[int] = None):
         try:
-            from qdrant_client import QdrantClient as QdrantClientLib
+            from qdrant_client import QdrantClient as QdrantClientLib, AsyncQdrantClient
             from qdrant_client.models import Distance, VectorParams
         except ImportError:
             raise ImportError("qdrant-client is required. Install with: pip install qdrant-client")
         
-        self.client = QdrantClientLib(host=host, port=port)
+        # pool_size (parallel gRPC channels / HTTP connections) needs qdrant-client >= 1.10, so only pass it when set
+        pool_kwargs = {'pool_size': pool_size} if pool_size is not None else {}
+        self.client = QdrantClientLib(host=host, port=port, grpc_port=grpc_port, prefer_grpc=prefer_grpc,
+                                      timeout=timeout, **pool_kwargs)
+        # The async methods below use their own client so concurrent coroutines spread over
+        # the pool instead of blocking the event loop; self.client stays for synchronous callers
+        self.async_client = AsyncQdrantClient(host=host, port=port, grpc_port=grpc_port, prefer_grpc=prefer_grpc,
+                                              timeout=timeout, **pool_kwargs)
         self.collection_name = collection_name
         
         # Ensure collection exists with correct configuration
@@ -182,35 +448,35 @@ class QdrantClient(VectorStoreClient):
             logger.info(f"Connected to existing Qdrant collection: {collection_name}")
         except Exception:
             logger.info(f"Collection {collection_name} not found, but assuming it exists")
+            return
+        
+        # Keyword indexes make emailId/userId filters touch only the matching points instead of
+        # scanning; lookups filter on emailId because point IDs aren't derived from it at ingest
+        from qdrant_client import models
+        for field_name in ('emailId', 'userId'):
+            try:
+                self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=models.PayloadSchemaType.KEYWORD
+                )
+            except Exception as e:
+                logger.warning(f"Could not create payload index on {field_name}: {e}")
     
     async def get_email_by_id(self, email_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve email data by email ID from Qdrant"""
         try:
             # Search for points with matching emailId in payload
-            search_result = self.client.scroll(
+            search_result = await self.async_client.scroll(
                 collection_name=self.collection_name,
-                scroll_filter={
-                    "must": [
-                        {
-                            "key": "emailId",
-                            "match": {"value": email_id}
-                        }
-                    ]
-                },
+                scroll_filter=self._must_match({"emailId": email_id}),
                 limit=1,
                 with_payload=True,
                 with_vectors=True
             )
             
-            if search_result[0]:  # points, next_page_offset
-                point = search_result[0][0]
-                return {
-                    'email_id': email_id,
-                    'embedding': point.vector,
-                    'metadata': point.payload,
-                    'qdrant_id': point.id
-                }
-            return None
+            emails = self._points_to_emails(search_result[0])  # points, next_page_offset
+            return emails[0] if emails else None
         except Exception as e:
             logger.error(f"Error fetching email {email_id}: {str(e)}")
             return None
@@ -218,128 +484,173 @@ class QdrantClient(VectorStoreClient):
     async def get_emails_by_ids(self, email_ids: List[str]) -> List[Dict[str, Any]]:
         """Retrieve multiple emails by email IDs from Qdrant"""
         try:
-            emails = []
-            
             # Search for points with matching emailIds
-            search_result = self.client.scroll(
+            search_result = await self.async_client.scroll(
                 collection_name=self.collection_name,
-                scroll_filter={
-                    "must": [
-                        {
-                            "key": "emailId",
-                            "match": {"any": email_ids}
-                        }
-                    ]
-                },
+                scroll_filter=self._must_match({"emailId": email_ids}),
                 limit=len(email_ids),
                 with_payload=True,
                 with_vectors=True
             )
             
-            for point in search_result[0]:  # points from (points, next_page_offset)
-                email_id = point.payload.get('emailId')
-                if email_id in email_ids:
-                    emails.append({
-                        'email_id': email_id,
-                        'embedding': point.vector,
-                        'metadata': point.payload,
-                        'qdrant_id': point.id
-                    })
-            
-            return emails
+            wanted = set(email_ids)
+            return [
+                email for email in self._points_to_emails(search_result[0])  # points from (points, next_page_offset)
+                if email['email_id'] in wanted
+            ]
         except Exception as e:
             logger.error(f"Error fetching emails {email_ids}: {str(e)}")
             return []
     
-    async def search_similar_emails(
+    async def search_similar_emails_arrays(
         self, 
-        query_embedding: List[float], 
+        query_embedding: Embedding, 
         top_k: int = 10,
-        filters: Optional[Dict[str, Any]] = None
-    ) -> List[VectorSearchResult]:
+        filters: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
+    ) -> SearchArrays:
         """Search for similar emails using Qdrant"""
         try:
-            # Build filter conditions
-            filter_conditions = []
-            if filters:
-                for key, value in filters.items():
-                    filter_conditions.append({
-                        "key": key,
-                        "match": {"value": value}
-                    })
-            
-            search_filter = {"must": filter_conditions} if filter_conditions else None
-            
-            search_results = self.client.search(
+            search_results = await self.async_client.search(
                 collection_name=self.collection_name,
-                query_vector=query_embedding,
-                query_filter=search_filter,
+                query_vector=_query_list(query_embedding),
+                query_filter=self._search_filter(filters),
                 limit=top_k,
                 with_payload=True,
-                with_vectors=True
+                with_vectors=with_vectors
             )
             
-            results = []
-            for result in search_results:
-                results.append(VectorSearchResult(
-                    email_id=result.payload.get('emailId', str(result.id)),
-                    score=result.score,
-                    metadata=result.payload,
-                    embedding=result.vector
-                ))
-            
-            return results
+            return self._points_to_arrays(search_results)
         except Exception as e:
             logger.error(f"Error searching similar emails: {str(e)}")
-            return []
+            return _empty_search_arrays()
     
-    async def get_user_emails(
+    async def search_similar_emails_batch(
         self, 
-        user_id: str, 
-        limit: Optional[int] = None
-    ) -> List[Dict[str, Any]]:
-        """Get all emails for a specific user from Qdrant"""
+        query_embeddings: np.ndarray, 
+        top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
+    ) -> List[SearchArrays]:
+        """Search for similar emails to each query in a single Qdrant batch request"""
+        queries = np.asarray(query_embeddings, dtype=np.float32).tolist()
         try:
-            emails = []
-            offset = None
-            batch_size = min(limit or 1000, 1000)
+            from qdrant_client import models
             
-            while True:
-                search_result = self.client.scroll(
+            search_filter = self._search_filter(filters)
+            if hasattr(self.async_client, 'query_batch_points'):
+                responses = await self.async_client.query_batch_points(
                     collection_name=self.collection_name,
-                    scroll_filter={
-                        "must": [
-                            {
-                                "key": "userId",
-                                "match": {"value": user_id}
-                            }
-                        ]
-                    },
-                    limit=batch_size,
-                    offset=offset,
-                    with_payload=True,
-                    with_vectors=True
+                    requests=[
+                        models.QueryRequest(query=query, filter=search_filter, limit=top_k, with_payload=True, with_vector=with_vectors)
+                        for query in queries
+                    ]
+                )
+                batches = [response.points for response in responses]
+            else:
+                # qdrant-client < 1.10
+                batches = await self.async_client.search_batch(
+                    collection_name=self.collection_name,
+                    requests=[
+                        models.SearchRequest(vector=query, filter=search_filter, limit=top_k, with_payload=True, with_vector=with_vectors)
+                        for query in queries
+                    ]
                 )
-                
-                points, next_offset = search_result
-                
-                for point in points:
-                    emails.append({
-                        'email_id': point.payload.get('emailId'),
-                        'embedding': point.vector,
-                        'metadata': point.payload,
-                        'qdrant_id': point.id
-                    })
-                
-                if not next_offset or (limit and len(emails) >= limit):
-                    break
-                    
-                offset = next_offset
             
-            return emails[:limit] if limit else emails
+            return [self._points_to_arrays(points) for points in batches]
+        except Exception as e:
+            logger.error(f"Error batch searching similar emails: {str(e)}")
+            return [_empty_search_arrays() for _ in queries]
+    
+    @staticmethod
+    def _must_match(conditions: Dict[str, Any]):
+        """Qdrant filter requiring each key to equal its value, or any value of a list"""
+        from qdrant_client import models
+        
+        # Typed models rather than dicts: the gRPC transport only converts models.Filter
+        return models.Filter(must=[
+            models.FieldCondition(
+                key=key,
+                match=models.MatchAny(any=value) if isinstance(value, list) else models.MatchValue(value=value)
+            )
+            for key, value in conditions.items()
+        ])
+    
+    @classmethod
+    def _search_filter(cls, filters: Optional[Dict[str, Any]]):
+        """Qdrant filter requiring an exact match on every filters key"""
+        return cls._must_match(filters) if filters else None
+    
+    @staticmethod
+    def _points_to_arrays(points: List[Any]) -> SearchArrays:
+        """SearchArrays from scored Qdrant points"""
+        return _search_arrays(
+            [point.payload.get('emailId', str(point.id)) for point in points],
+            [point.score for point in points],
+            [point.vector for point in points],
+            [point.payload for point in points]
+        )
+    
+    @staticmethod
+    def _points_to_emails(points: List[Any]) -> List[Dict[str, Any]]:
+        """Email dicts from Qdrant points, built in one comprehension"""
+        return [
+            {'email_id': point.payload.get('emailId'), 'embedding': point.vector, 'metadata': point.payload, 'qdrant_id': point.id}
+            for point in points
+        ]
+    
+    async def get_user_emails(
+        self, 
+        user_id: str, 
+        limit: Optional[int] = None,
+        with_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Get all emails for a specific user from Qdrant"""
+        try:
+            return [
+                email async for email in self.iter_user_emails(user_id, limit, with_vectors=with_vectors, payload_fields=None)
+            ]
         except Exception as e:
             logger.error(f"Error fetching user emails for {user_id}: {str(e)}")
             return []
+    
+    async def iter_user_emails(
+        self, 
+        user_id: str, 
+        limit: Optional[int] = None,
+        with_vectors: bool = False,
+        payload_fields: Optional[List[str]] = USER_EMAIL_PAYLOAD_FIELDS
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a user's emails from Qdrant one scroll page at a time.
+        
+        Only payload_fields are decoded (None for the whole payload) and
+        vectors are skipped unless with_vectors is set. Errors propagate.
+        """
+        from qdrant_client import models
+        
+        with_payload = models.PayloadSelectorInclude(include=payload_fields) if payload_fields is not None else True
+        offset = None
+        remaining = limit
+        
+        while remaining is None or remaining > 0:
+            points, next_offset = await self.async_client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=self._must_match({"userId": user_id}),
+                limit=min(remaining, USER_SCROLL_PAGE_SIZE) if remaining is not None else USER_SCROLL_PAGE_SIZE,
+                offset=offset,
+                with_payload=with_payload,
+                with_vectors=with_vectors
+            )
+            
+            for email in self._points_to_emails(points):
+                yield email
+            
+            if remaining is not None:
+                remaining -= len(points)
+            if next_offset is None:
+                break
+            offset = next_offset
 
 class ChromaClient(VectorStoreClient):
     """ChromaDB vector store client"""
@@ -354,100 +665,108 @@ class ChromaClient(VectorStoreClient):
     async def get_email_by_id(self, email_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve email data by ID from ChromaDB"""
         try:
-            results = self.collection.get(
-                ids=[email_id],
-                include=['embeddings', 'metadatas', 'documents']
-            )
-            
-            if results['ids']:
-                return {
-                    'email_id': email_id,
-                    'embedding': results['embeddings'][0] if results['embeddings'] else None,
-                    'metadata': results['metadatas'][0] if results['metadatas'] else {},
-                    'content': results['documents'][0] if results['documents'] else ""
-                }
-            return None
+            emails = self._results_to_emails(*self._get_with_matrix(ids=[email_id]))
+            return emails[0] if emails else None
         except Exception as e:
             logger.error(f"Error fetching email {email_id}: {str(e)}")
             return None
     
+    def _get_with_matrix(self, with_vectors: bool = True, **kwargs) -> Tuple[Dict[str, Any], np.ndarray]:
+        """collection.get results plus their embeddings packed once into an (N, D) float32 matrix"""
+        include = ['embeddings', 'metadatas', 'documents'] if with_vectors else ['metadatas', 'documents']
+        results = self.collection.get(include=include, **kwargs)
+        embeddings = results['embeddings']
+        if embeddings is not None and len(embeddings):
+            matrix = np.asarray(embeddings, dtype=np.float32)
+        else:
+            matrix = np.zeros((len(results['ids']), 0), dtype=np.float32)
+        return results, matrix
+    
+    @staticmethod
+    def _results_to_emails(results: Dict[str, Any], embeddings: np.ndarray) -> List[Dict[str, Any]]:
+        """Email dicts whose embeddings are row views into the shared matrix"""
+        has_embeddings = embeddings.shape[1] > 0
+        return [
+            {
+                'email_id': email_id,
+                'embedding': embeddings[i] if has_embeddings else None,
+                'metadata': results['metadatas'][i] if results['metadatas'] else {},
+                'content': results['documents'][i] if results['documents'] else ""
+            }
+            for i, email_id in enumerate(results['ids'])
+        ]
+    
     async def get_emails_by_ids(self, email_ids: List[str]) -> List[Dict[str, Any]]:
         """Retrieve multiple emails by IDs from ChromaDB"""
         try:
-            results = self.collection.get(
-                ids=email_ids,
-                include=['embeddings', 'metadatas', 'documents']
-            )
-            
-            emails = []
-            for i, email_id in enumerate(results['ids']):
-                emails.append({
-                    'email_id': email_id,
-                    'embedding': results['embeddings'][i] if results['embeddings'] else None,
-                    'metadata': results['metadatas'][i] if results['metadatas'] else {},
-                    'content': results['documents'][i] if results['documents'] else ""
-                })
-            
-            return emails
+            return self._results_to_emails(*self._get_with_matrix(ids=email_ids))
         except Exception as e:
             logger.error(f"Error fetching emails {email_ids}: {str(e)}")
             return []
     
-    async def search_similar_emails(
+    async def get_emails_matrix_by_ids(self, email_ids: List[str]) -> Tuple[List[str], np.ndarray, List[Dict[str, Any]]]:
+        """Found email IDs, their (N, D) float32 embedding matrix and metadata, for bulk similarity work"""
+        try:
+            results, embeddings = self._get_with_matrix(ids=email_ids)
+            ids = results['ids']
+            return ids, embeddings, results['metadatas'] if results['metadatas'] else [{}] * len(ids)
+        except Exception as e:
+            logger.error(f"Error fetching emails {email_ids}: {str(e)}")
+            return [], np.zeros((0, 0), dtype=np.float32), []
+    
+    async def search_similar_emails_arrays(
         self, 
-        query_embedding: List[float], 
+        query_embedding: Embedding, 
         top_k: int = 10,
-        filters: Optional[Dict[str, Any]] = None
-    ) -> List[VectorSearchResult]:
+        filters: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
+    ) -> SearchArrays:
         """Search for similar emails using ChromaDB"""
+        return (await self.search_similar_emails_batch([query_embedding], top_k, filters, with_vectors))[0]
+    
+    async def search_similar_emails_batch(
+        self, 
+        query_embeddings: np.ndarray, 
+        top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False
+    ) -> List[SearchArrays]:
+        """Search for similar emails to each query in a single ChromaDB query"""
+        queries = np.asarray(query_embeddings, dtype=np.float32).tolist()
         try:
             results = self.collection.query(
-                query_embeddings=[query_embedding],
+                query_embeddings=queries,
                 n_results=top_k,
                 where=filters,
-                include=['embeddings', 'metadatas', 'documents', 'distances']
+                include=['embeddings', 'metadatas', 'documents', 'distances'] if with_vectors else ['metadatas', 'documents', 'distances']
             )
             
-            search_results = []
-            for i in range(len(results['ids'][0])):
-                search_results.append(VectorSearchResult(
-                    email_id=results['ids'][0][i],
-                    score=1.0 - results['distances'][0][i],  # Convert distance to similarity
-                    metadata=results['metadatas'][0][i] if results['metadatas'] else {},
-                    embedding=results['embeddings'][0][i] if results['embeddings'] else None
+            batches = []
+            for q, ids in enumerate(results['ids']):
+                batches.append(_search_arrays(
+                    ids,
+                    [1.0 - distance for distance in results['distances'][q]],  # Convert distance to similarity
+                    results['embeddings'][q] if results['embeddings'] else [None] * len(ids),
+                    results['metadatas'][q] if results['metadatas'] else [{}] * len(ids)
                 ))
             
-            return search_results
+            return batches
         except Exception as e:
             logger.error(f"Error searching similar emails: {str(e)}")
-            return []
+            return [_empty_search_arrays() for _ in queries]
     
     async def get_user_emails(
         self, 
         user_id: str, 
-        limit: Optional[int] = None
+        limit: Optional[int] = None,
+        with_vectors: bool = False
     ) -> List[Dict[str, Any]]:
         """Get all emails for a specific user from ChromaDB"""
         try:
             # Use where clause to filter by user_id
             where_clause = {"user_id": user_id}
             
-            results = self.collection.get(
-                where=where_clause,
-                limit=limit,
-                include=['embeddings', 'metadatas', 'documents']
-            )
-            
-            emails = []
-            for i, email_id in enumerate(results['ids']):
-                emails.append({
-                    'email_id': email_id,
-                    'embedding': results['embeddings'][i] if results['embeddings'] else None,
-                    'metadata': results['metadatas'][i] if results['metadatas'] else {},
-                    'content': results['documents'][i] if results['documents'] else ""
-                })
-            
-            return emails
+            return self._results_to_emails(*self._get_with_matrix(with_vectors, where=where_clause, limit=limit))
         except Exception as e:
             logger.error(f"Error fetching user emails for {user_id}: {str(e)}")
             return []
@@ -463,7 +782,11 @@ class VectorStoreFactory:
             return QdrantClient(
                 host=kwargs.get("host", "localhost"),
                 port=kwargs.get("port", 6333),
-                collection_name=kwargs.get("collection_name", "email_embeddings")
+                collection_name=kwargs.get("collection_name", "email_embeddings"),
+                grpc_port=kwargs.get("grpc_port", 6334),
+                prefer_grpc=kwargs.get("prefer_grpc", False),
+                pool_size=kwargs.get("pool_size"),
+                timeout=kwargs.get("timeout")
             )
         elif store_type.lower() == "pinecone":
             return PineconeClient(
@@ -501,17 +824,49 @@ def extract_email_features(email_data: Dict[str, Any]) -> Dict[str, Any]:
     
     return features
 
+if NUMBA_AVAILABLE:
+    @njit(fastmath=True, cache=True)
+    def _cosine(a, b):
+        """Dot product and both norms in a single pass, no temporaries"""
+        dot = 0.0
+        norm1 = 0.0
+        norm2 = 0.0
+        for i in range(a.shape[0]):
+            dot += a[i] * b[i]
+            norm1 += a[i] * a[i]
+            norm2 += b[i] * b[i]
+        if norm1 == 0.0 or norm2 == 0.0:
+            return 0.0
+        return dot / math.sqrt(norm1 * norm2)
+
 def calculate_email_similarity(email1: Dict[str, Any], email2: Dict[str, Any]) -> float:
-    """Calculate similarity between two emails"""
-    emb1 = email1.get('embedding', [])
-    emb2 = email2.get('embedding', [])
+    """Calculate similarity between two emails, reusing 'norm' values the dicts carry"""
+    emb1 = email1.get('embedding')
+    emb2 = email2.get('embedding')
     
-    if not emb1 or not emb2:
+    if emb1 is None or emb2 is None or not len(emb1) or not len(emb2):
         return 0.0
     
     # Cosine similarity
-    emb1 = np.array(emb1)
-    emb2 = np.array(emb2)
+    emb1 = np.asarray(emb1, dtype=np.float32)
+    emb2 = np.asarray(emb2, dtype=np.float32)
+    
+    # Precomputed norms (e.g. from VectorSearchResult) leave only the dot product
+    norm1 = email1.get('norm')
+    norm2 = email2.get('norm')
+    if norm1 is not None and norm2 is not None:
+        if norm1 == 0 or norm2 == 0:
+            return 0.0
+        return float(np.dot(emb1, emb2) / (norm1 * norm2))
+    
+    if SIMSIMD_AVAILABLE:
+        # simsimd returns cosine distance; zero vectors keep the 0.0 similarity below
+        if not emb1.any() or not emb2.any():
+            return 0.0
+        return 1.0 - float(simsimd.cosine(emb1, emb2))
+    
+    if NUMBA_AVAILABLE and emb1.ndim == 1 and emb1.shape == emb2.shape:
+        return float(_cosine(np.ascontiguousarray(emb1), np.ascontiguousarray(emb2)))
     
     dot_product = np.dot(emb1, emb2)
     norm1 = np.linalg.norm(emb1)
@@ -520,4 +875,50 @@ def calculate_email_similarity(email1: Dict[str, Any], email2: Dict[str, Any]) -
     if norm1 == 0 or norm2 == 0:
         return 0.0
     
-    return dot_product / (norm1 * norm2)
+    return float(dot_product / (norm1 * norm2))
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, Union[float, np.ndarray]]:
+    """
+    Per-vector max-abs int8 quantization.
+    
+    Returns (int8 vectors, scales) with vectors ~= int8 * scale: a float for
+    a single vector, one scale per row for an (N, D) matrix.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.shape[-1]:
+        scales = np.abs(vectors).max(axis=-1, keepdims=True) / 127.0
+    else:
+        scales = np.zeros(vectors.shape[:-1] + (1,), dtype=np.float32)
+    # All-zero vectors quantize to zeros with scale 1
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    quantized = np.rint(vectors / scales).astype(np.int8)
+    
+    if vectors.ndim == 1:
+        return quantized, float(scales[0])
+    return quantized, scales[..., 0]
+
+def calculate_quantized_similarity(q8_a: np.ndarray, q8_b: np.ndarray) -> float:
+    """Cosine similarity of two int8-quantized vectors; per-vector scales cancel out"""
+    if not q8_a.any() or not q8_b.any():
+        return 0.0
+    
+    if SIMSIMD_AVAILABLE:
+        return 1.0 - float(simsimd.cosine(q8_a, q8_b))
+    
+    # Widen before multiplying so products and sums can't overflow int8
+    a = q8_a.astype(np.int32)
+    b = q8_b.astype(np.int32)
+    return int(a @ b) / math.sqrt(int(a @ a) * int(b @ b))
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Rows of an (N, D) matrix scaled to unit length, so A @ B.T of normalized matrices is cosine similarity"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    
+    # Zero vectors stay zero, giving similarity 0 to everything as in calculate_email_similarity
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+def calculate_email_similarity_matrix(embeddings: np.ndarray) -> np.ndarray:
+    """Pairwise cosine similarities between the rows of an (N, D) embedding matrix"""
+    unit = normalize_rows(embeddings)
+    return np.clip(unit @ unit.T, -1.0, 1.0)
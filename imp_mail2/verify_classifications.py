@@ -6,27 +6,48 @@ whether the model's classifications are accurate.
 """
 
 import asyncio
+import os
 import httpx
-import json
+import numpy as np
+import orjson
 from typing import List, Dict, Any
 from datetime import datetime
 
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 # Configuration
 QDRANT_HOST = "localhost"
 QDRANT_PORT = 6333
 COLLECTION_NAME = "email_embeddings"
 API_BASE_URL = "http://localhost:8000"
+SQLITE_DB_PATH = os.getenv('SQLITE_DB_PATH', '../data/emails.db')
+
+# Seed for the important/unimportant training split so runs are reproducible
+LABEL_SEED = 0xE1AA1
 
 async def get_email_content_from_sqlite(email_ids: List[str]) -> Dict[str, Dict]:
     """
-    Fetch actual email content from SQLite database
-    Note: This is a placeholder - you'll need to adapt this to your SQLite setup
+    Fetch subject and sender for each email from the SQLite database, keyed by email ID.
+    Returns an empty dict when the database isn't available (Qdrant metadata is shown either way).
     """
-    # This would connect to your SQLite database to get full email content
-    # For now, we'll return empty dict and rely on Qdrant metadata
-    return {}
+    if not os.path.exists(SQLITE_DB_PATH):
+        return {}
+    
+    from sqlite_client import AsyncSQLiteEmailClient
+    
+    sqlite_client = AsyncSQLiteEmailClient(SQLITE_DB_PATH, read_only=True)
+    try:
+        if not await sqlite_client.connect():
+            return {}
+        return await sqlite_client.get_emails_by_ids_map(email_ids, fields=('subject', 'sender'))
+    finally:
+        await sqlite_client.disconnect()
 
-async def verify_email_classifications():
+async def verify_email_classifications(client: httpx.AsyncClient):
     """Verify the accuracy of email classifications"""
     
     print("🔍 Email Classification Verification")
@@ -83,130 +104,147 @@ async def verify_email_classifications():
         print(f"🎯 Verifying {len(test_emails)} classified emails")
         
         # First, let's train the model (same as test script)
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            
-            # Simulate training (5 important, 5 not important)
-            import random
-            important_emails = random.sample(training_emails, 5)
-            unimportant_emails = [e for e in training_emails if e not in important_emails]
-            
-            labeled_examples = []
-            for email in important_emails:
-                labeled_examples.append({
-                    "email_id": email['email_id'],
-                    "is_important": True,
-                    "confidence": 1.0
-                })
-            
-            for email in unimportant_emails:
-                labeled_examples.append({
-                    "email_id": email['email_id'],
-                    "is_important": False,
-                    "confidence": 1.0
-                })
-            
-            # Train the model
-            training_request = {
-                "user_id": "verification_user",
-                "labeled_examples": labeled_examples,
-                "retrain": True
-            }
-            
-            print("\n🤖 Training model for verification...")
-            train_response = await client.post(f"{API_BASE_URL}/train", json=training_request)
-            
-            if train_response.status_code != 200:
-                print(f"❌ Training failed: {train_response.text}")
-                return
+        # Simulate training (5 important, 5 not important)
+        rng = np.random.default_rng(LABEL_SEED)
+        order = rng.permutation(len(training_emails))
+        important_emails = [training_emails[i] for i in order[:5]]
+        unimportant_emails = [training_emails[i] for i in order[5:]]
+        
+        labeled_examples = []
+        for email in important_emails:
+            labeled_examples.append({
+                "email_id": email['email_id'],
+                "is_important": True,
+                "confidence": 1.0
+            })
+        
+        for email in unimportant_emails:
+            labeled_examples.append({
+                "email_id": email['email_id'],
+                "is_important": False,
+                "confidence": 1.0
+            })
+        
+        # Train the model
+        training_request = {
+            "user_id": "verification_user",
+            "labeled_examples": labeled_examples,
+            "retrain": True
+        }
+        
+        print("\n🤖 Training model for verification...")
+        train_response = await client.post(
+            "/train", content=orjson.dumps(training_request), headers={"Content-Type": "application/json"}
+        )
+        
+        if train_response.status_code != 200:
+            print(f"❌ Training failed: {train_response.text}")
+            return
+        
+        print("✅ Model trained successfully")
+        
+        # Now classify the test emails
+        test_email_ids = [email['email_id'] for email in test_emails]
+        
+        classification_request = {
+            "user_id": "verification_user",
+            "email_ids": test_email_ids,
+            "return_confidence": True
+        }
+        
+        print("\n🔮 Classifying test emails...")
+        classify_response = await client.post(
+            "/classify", content=orjson.dumps(classification_request), headers={"Content-Type": "application/json"}
+        )
+        
+        if classify_response.status_code != 200:
+            print(f"❌ Classification failed: {classify_response.text}")
+            return
+        
+        results = orjson.loads(classify_response.content)
+        
+        print(f"\n📊 VERIFICATION RESULTS")
+        print("=" * 60)
+        
+        # Fetch Qdrant details and SQLite content for every classified email up
+        # front (one request each, run together), so the display loop does no I/O
+        classified_ids = [result['email_id'] for result in results['results']]
+        details, contents = await asyncio.gather(
+            qdrant_client.get_emails_by_ids(classified_ids),
+            get_email_content_from_sqlite(classified_ids)
+        )
+        details_by_id = {email['email_id']: email for email in details}
+        
+        # Now let's get detailed information about each classified email
+        for i, result in enumerate(results['results']):
+            email_id = result['email_id']
+            is_important = result['is_important']
+            confidence = result['confidence']
+            reasoning = result.get('reasoning', 'No reasoning provided')
             
-            print("✅ Model trained successfully")
+            # Find the corresponding email data
+            email_data = next((e for e in test_emails if e['email_id'] == email_id), None)
             
-            # Now classify the test emails
-            test_email_ids = [email['email_id'] for email in test_emails]
+            print(f"\n📧 EMAIL {i+1}: {email_id}")
+            print("-" * 40)
             
-            classification_request = {
-                "user_id": "verification_user",
-                "email_ids": test_email_ids,
-                "return_confidence": True
-            }
+            if email_data:
+                print(f"👤 User ID: {email_data['user_id']}")
+                print(f"📅 Created: {email_data['created_at']}")
+                print(f"🤖 Embedding Model: {email_data['embedding_model']}")
             
-            print("\n🔮 Classifying test emails...")
-            classify_response = await client.post(f"{API_BASE_URL}/classify", json=classification_request)
+            content = contents.get(email_id)
+            if content:
+                print(f"✉️  Subject: {content['subject']}")
+                print(f"📨 From: {content['sender']}")
             
-            if classify_response.status_code != 200:
-                print(f"❌ Classification failed: {classify_response.text}")
-                return
+            # Get additional details from Qdrant
+            try:
+                email_details = details_by_id.get(email_id)
+                if email_details and email_details.get('metadata'):
+                    metadata = email_details['metadata']
+                    print(f"📍 Qdrant ID: {email_details.get('qdrant_id', 'N/A')}")
+                    
+                    # Show any additional metadata
+                    for key, value in metadata.items():
+                        if key not in ['emailId', 'userId', 'createdAt', 'embeddingModel']:
+                            print(f"📋 {key}: {value}")
             
-            results = classify_response.json()
+            except Exception as e:
+                print(f"⚠️  Could not fetch additional details: {e}")
             
-            print(f"\n📊 VERIFICATION RESULTS")
-            print("=" * 60)
+            # Show classification result
+            importance_icon = "🔴" if is_important else "⚪"
+            importance_text = "IMPORTANT" if is_important else "NOT IMPORTANT"
             
-            # Now let's get detailed information about each classified email
-            for i, result in enumerate(results['results']):
-                email_id = result['email_id']
-                is_important = result['is_important']
-                confidence = result['confidence']
-                reasoning = result.get('reasoning', 'No reasoning provided')
-                
-                # Find the corresponding email data
-                email_data = next((e for e in test_emails if e['email_id'] == email_id), None)
-                
-                print(f"\n📧 EMAIL {i+1}: {email_id}")
-                print("-" * 40)
-                
-                if email_data:
-                    print(f"👤 User ID: {email_data['user_id']}")
-                    print(f"📅 Created: {email_data['created_at']}")
-                    print(f"🤖 Embedding Model: {email_data['embedding_model']}")
-                
-                # Get additional details from Qdrant
-                try:
-                    email_details = await qdrant_client.get_email_by_id(email_id)
-                    if email_details and email_details.get('metadata'):
-                        metadata = email_details['metadata']
-                        print(f"📍 Qdrant ID: {email_details.get('qdrant_id', 'N/A')}")
-                        
-                        # Show any additional metadata
-                        for key, value in metadata.items():
-                            if key not in ['emailId', 'userId', 'createdAt', 'embeddingModel']:
-                                print(f"📋 {key}: {value}")
-                
-                except Exception as e:
-                    print(f"⚠️  Could not fetch additional details: {e}")
-                
-                # Show classification result
-                importance_icon = "🔴" if is_important else "⚪"
-                importance_text = "IMPORTANT" if is_important else "NOT IMPORTANT"
-                
-                print(f"\n🎯 CLASSIFICATION:")
-                print(f"   {importance_icon} {importance_text}")
-                print(f"   🎲 Confidence: {confidence:.3f}")
-                print(f"   💭 Reasoning: {reasoning}")
-                
-                # Ask for manual verification
-                print(f"\n❓ MANUAL VERIFICATION:")
-                print(f"   Based on the information above, does this classification seem accurate?")
-                
-                # You could add interactive input here if desired
-                # user_input = input("   Enter 'y' for correct, 'n' for incorrect, 's' to skip: ")
-                
-                print("\n" + "="*60)
+            print(f"\n🎯 CLASSIFICATION:")
+            print(f"   {importance_icon} {importance_text}")
+            print(f"   🎲 Confidence: {confidence:.3f}")
+            print(f"   💭 Reasoning: {reasoning}")
             
-            # Summary
-            print(f"\n📈 SUMMARY:")
-            print(f"   • Total emails classified: {len(results['results'])}")
-            print(f"   • Important: {sum(1 for r in results['results'] if r['is_important'])}")
-            print(f"   • Not Important: {sum(1 for r in results['results'] if not r['is_important'])}")
-            print(f"   • Average Confidence: {sum(r['confidence'] for r in results['results']) / len(results['results']):.3f}")
-            print(f"   • Model Version: {results['model_version']}")
+            # Ask for manual verification
+            print(f"\n❓ MANUAL VERIFICATION:")
+            print(f"   Based on the information above, does this classification seem accurate?")
             
-            print(f"\n💡 TO IMPROVE ACCURACY:")
-            print(f"   1. Provide more training examples (currently using 10)")
-            print(f"   2. Use actual email content/subject for better context")
-            print(f"   3. Add domain-specific features (sender reputation, keywords)")
-            print(f"   4. Collect user feedback on these classifications")
+            # You could add interactive input here if desired
+            # user_input = input("   Enter 'y' for correct, 'n' for incorrect, 's' to skip: ")
             
+            print("\n" + "="*60)
+        
+        # Summary
+        print(f"\n📈 SUMMARY:")
+        print(f"   • Total emails classified: {len(results['results'])}")
+        print(f"   • Important: {sum(1 for r in results['results'] if r['is_important'])}")
+        print(f"   • Not Important: {sum(1 for r in results['results'] if not r['is_important'])}")
+        print(f"   • Average Confidence: {sum(r['confidence'] for r in results['results']) / len(results['results']):.3f}")
+        print(f"   • Model Version: {results['model_version']}")
+        
+        print(f"\n💡 TO IMPROVE ACCURACY:")
+        print(f"   1. Provide more training examples (currently using 10)")
+        print(f"   2. Use actual email content/subject for better context")
+        print(f"   3. Add domain-specific features (sender reputation, keywords)")
+        print(f"   4. Collect user feedback on these classifications")
+        
     except ImportError:
         print("❌ qdrant-client not installed. Install with: pip install qdrant-client")
     except Exception as e:
@@ -222,7 +260,15 @@ async def interactive_verification():
     print("This will show you each classified email and let you verify accuracy.")
     print()
     
-    await verify_email_classifications()
+    # One client for the whole session so /train and /classify share
+    # pooled connections instead of reconnecting per run
+    async with httpx.AsyncClient(
+        base_url=API_BASE_URL,
+        timeout=30.0,
+        http2=HTTP2_AVAILABLE,  # multiplexed requests when h2 is installed
+        limits=httpx.Limits(max_keepalive_connections=100, max_connections=100)
+    ) as client:
+        await verify_email_classifications(client)
 
 if __name__ == "__main__":
     print("🔍 Starting Email Classification Verification...")